@@ -0,0 +1,101 @@
+"""Бенчмарк скорости чтения котировок в колоночном формате и в формате pickle.
+
+Синтетическое хранилище содержит котировки 250 тикеров за 20 лет. Сравнивается чтение всех котировок
+при хранении в pickle, в колоночном формате с копированием и в колоночном формате без копирования.
+
+Запуск из корня репозитория: python -m benchmarks.codec_read
+"""
+import pathlib
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from poptimizer.store import lmbd, utils
+
+CATEGORY = "quotes"
+TICKERS = [f"T{i:03}" for i in range(250)]
+YEARS = 20
+ROUNDS = 5
+MAX_SIZE = 2 ** 30
+MAX_DBS = 3
+
+
+def make_quotes():
+    """Синтетические котировки для всех тикеров."""
+    index = pd.bdate_range(end="2019-05-10", periods=YEARS * 252, name="DATE")
+    index = pd.DatetimeIndex(index.values, name="DATE")
+    return {
+        ticker: utils.Datum(
+            pd.DataFrame(
+                np.random.rand(len(index), 2), index=index, columns=["CLOSE", "TURNOVER"]
+            )
+        )
+        for ticker in TICKERS
+    }
+
+
+def read_pickle(db: lmbd.DataStore):
+    """Чтение всех котировок из pickle."""
+    # noinspection PyProtectedMember
+    env, category_db = db._env, db._category_db(CATEGORY)
+    with env.begin(buffers=True) as txn:
+        return {
+            ticker: pickle.loads(txn.get(ticker.encode(), db=category_db))
+            for ticker in TICKERS
+        }
+
+
+def read_columnar(db: lmbd.DataStore):
+    """Чтение всех котировок в колоночном формате с копированием."""
+    return db.get_many(TICKERS, CATEGORY)
+
+
+def read_columnar_view(db: lmbd.DataStore):
+    """Чтение всех котировок в колоночном формате без копирования.
+
+    Значения действительны только внутри транзакции и в реальном коде должны использоваться там же.
+    """
+    with db.view(CATEGORY) as get:
+        return {ticker: get(ticker) for ticker in TICKERS}
+
+
+def measure(func, db: lmbd.DataStore, size: int):
+    """Печатает лучшее время из нескольких повторов."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(db)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"{func.__name__:>18}: {best * 1000:7.1f} мс, "
+        f"{len(TICKERS) / best:9,.0f} тикеров/с, "
+        f"{size / best / 2 ** 20:7,.0f} МБ/с"
+    )
+
+
+def main():
+    """Печатает результаты сравнения."""
+    quotes = make_quotes()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = pathlib.Path(temp_dir)
+        with lmbd.DataStore(path / "pickle", MAX_SIZE, MAX_DBS) as db:
+            # noinspection PyProtectedMember
+            env, category_db = db._env, db.create_category(CATEGORY)
+            raw_values = {key: pickle.dumps(value) for key, value in quotes.items()}
+            with env.begin(write=True) as txn:
+                for key, raw_value in raw_values.items():
+                    txn.put(key.encode(), raw_value, db=category_db)
+            size = sum(len(raw_value) for raw_value in raw_values.values())
+            print(f"{len(TICKERS)} тикеров x {YEARS} лет, {size / 2 ** 20:.1f} МБ")
+            measure(read_pickle, db, size)
+        with lmbd.DataStore(path / "columnar", MAX_SIZE, MAX_DBS) as db:
+            db.put_many(quotes, CATEGORY)
+            measure(read_columnar, db, size)
+            measure(read_columnar_view, db, size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Бенчмарк алгоритмов сжатия значений хранилища.
+
+Для котировок, похожих на реальные (случайное блуждание цен с точностью до копейки и обороты в формате
+float32, как после загрузки с MOEX), и закешированного прогноза с ковариационной матрицей печатается
+размер сохраненных значений, время записи и время чтения для каждого алгоритма сжатия.
+
+Запуск из корня репозитория: python -m benchmarks.compression
+"""
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from poptimizer.store import codec, lmbd, utils
+
+CATEGORY = "quotes"
+TICKERS = [f"T{i:03}" for i in range(250)]
+YEARS = 20
+FORECAST_TICKERS = 60
+ROUNDS = 3
+MAX_SIZE = 2 ** 30
+MAX_DBS = 3
+CODECS = dict(none=None, zlib=codec.ZLIB, lzma=codec.LZMA)
+
+
+def make_quotes():
+    """Синтетические котировки для всех тикеров."""
+    index = pd.bdate_range(end="2019-05-10", periods=YEARS * 252, name="DATE")
+    index = pd.DatetimeIndex(index.values, name="DATE")
+    quotes = {}
+    for ticker in TICKERS:
+        returns = np.random.normal(0, 0.02, len(index))
+        close = np.round(100 * np.exp(np.cumsum(returns)), 2)
+        turnover = np.round(np.random.lognormal(15, 1, len(index)), -3)
+        df = pd.DataFrame(
+            {"CLOSE": close, "TURNOVER": turnover}, index=index, dtype="float32"
+        )
+        quotes[ticker] = utils.Datum(df)
+    return quotes
+
+
+def make_forecast():
+    """Синтетический прогноз с ковариационной матрицей."""
+    tickers = tuple(TICKERS[:FORECAST_TICKERS])
+    returns = np.random.normal(0, 0.02, (252, len(tickers)))
+    cov = np.cov(returns, rowvar=False)
+    mean = pd.Series(returns.mean(axis=0), index=tickers)
+    return dict(tickers=tickers, mean=mean, cov=cov)
+
+
+def measure(func):
+    """Лучшее время из нескольких повторов."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(path: pathlib.Path, name: str, quotes: dict, forecast: dict):
+    """Печатает размер и время записи и чтения для алгоритма сжатия."""
+    compressor = CODECS[name]
+    compression = {CATEGORY: compressor, None: compressor}
+    with lmbd.DataStore(path / name, MAX_SIZE, MAX_DBS, compression) as db:
+        write_quotes = measure(lambda: db.put_many(quotes, CATEGORY))
+        read_quotes = measure(lambda: db.get_many(TICKERS, CATEGORY))
+        write_forecast = measure(lambda: db.put("forecast", forecast))
+        read_forecast = measure(lambda: db.get("forecast"))
+        metas = db.get_meta_many(TICKERS, CATEGORY)
+        quotes_size = sum(meta.size for meta in metas.values())
+        forecast_size = len(codec.compress(codec.dumps(forecast), compressor))
+    print(
+        f"{name:>5}: котировки {quotes_size / 2 ** 20:6.1f} МБ, "
+        f"запись {write_quotes * 1000:6.1f} мс, чтение {read_quotes * 1000:6.1f} мс | "
+        f"прогноз {forecast_size / 2 ** 10:5.1f} КБ, "
+        f"запись {write_forecast * 1000:5.2f} мс, чтение {read_forecast * 1000:5.2f} мс"
+    )
+
+
+def main():
+    """Печатает результаты сравнения."""
+    quotes = make_quotes()
+    forecast = make_forecast()
+    print(f"{len(TICKERS)} тикеров x {YEARS} лет, прогноз для {FORECAST_TICKERS} тикеров")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in CODECS:
+            run(pathlib.Path(temp_dir), name, quotes, forecast)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Бенчмарк скорости разбора html-таблиц с дивидендами.
+
+Сравнивается разбор страницы с построением полного дерева BeautifulSoup и потоковый разбор с помощью
+lxml, а также проверяется совпадение получаемых DataFrame. Страницы сохраняются в браузере с
+сайтов dohod.ru, conomy.ru и smart-lab.ru и передаются через параметр --pages в виде каталога с
+файлами dohod.html, conomy.html и smart_lab.html. Для отсутствующих файлов используются синтетические
+страницы с аналогичной структурой - таблица с данными расположена среди меню, скриптов и других
+таблиц, а после нее следует объемная часть страницы с комментариями.
+
+Запуск из корня репозитория: python -m benchmarks.html_tables [--pages DIR]
+"""
+import argparse
+import pathlib
+import time
+
+from poptimizer.store import conomy, dohod, parser, smart_lab
+
+ROUNDS = 5
+ROWS = 40
+FILLER_BLOCKS = 300
+
+SOURCES = dict(
+    dohod=(
+        dohod.TABLE_INDEX,
+        [dohod.DATE_COLUMN, dohod.DIVIDENDS_COLUMN],
+        dohod.HEADER_SIZE,
+        0,
+    ),
+    conomy=(
+        conomy.TABLE_INDEX,
+        [conomy.DATE_COLUMN, conomy.COMMON_COLUMN],
+        conomy.HEADER_SIZE,
+        0,
+    ),
+    smart_lab=(
+        smart_lab.TABLE_INDEX,
+        [smart_lab.TICKER_COLUMN, smart_lab.DATE_COLUMN, smart_lab.DIVIDENDS_COLUMN],
+        smart_lab.HEADER_SIZE,
+        smart_lab.FOOTER_SIZE,
+    ),
+)
+
+
+def filler(blocks: int) -> str:
+    """Меню, скрипты и текст, окружающие таблицу."""
+    block = (
+        "<div class='menu'><ul>"
+        + "".join(f"<li><a href='/page{i}'>Раздел {i}</a></li>" for i in range(10))
+        + "</ul><script>var x = {'a': [1, 2, 3]};</script>"
+        "<p>Текст <b>новости</b> с <i>разметкой</i>, <!-- комментарием --> "
+        "и ссылками.</p></div>"
+    )
+    return block * blocks
+
+
+def small_table(rows: int = 5) -> str:
+    """Вспомогательная таблица до таблицы с данными."""
+    body = "".join(f"<tr><td>{i}</td><td>Показатель {i}</td></tr>" for i in range(rows))
+    return f"<table>{body}</table>"
+
+
+def page(tables_before: int, table: str) -> str:
+    """Страница с таблицей заданным номером."""
+    before = "".join(small_table() for _ in range(tables_before))
+    return (
+        f"<html><head><title>Дивиденды</title></head><body>{filler(FILLER_BLOCKS // 3)}"
+        f"{before}{table}{filler(FILLER_BLOCKS)}</body></html>"
+    )
+
+
+def dohod_page() -> str:
+    """Синтетическая страница dohod.ru."""
+    rows = "".join(
+        f"<tr><td>{10 + i % 18:02}.07.{2018 - i}</td><td>{2019 - i}</td>"
+        f"<td>{i + 1},{i:02} (рек.)</td></tr>"
+        for i in range(ROWS)
+    )
+    table = (
+        "<table><tr><th>Дата закрытия реестра</th><th>Год для учета</th>"
+        f"<th>Дивиденд (руб.)</th></tr>{rows}</table>"
+    )
+    return page(dohod.TABLE_INDEX, table)
+
+
+def conomy_page() -> str:
+    """Синтетическая страница conomy.ru с многоуровневым заголовком."""
+    header = (
+        "<tr><td colspan=9>Дивиденды</td></tr>"
+        "<tr><td rowspan=2>Период</td><td rowspan=2>Решение</td><td rowspan=2>Дата</td>"
+        "<td rowspan=2>Собрание</td><td rowspan=2>Объявление</td>"
+        "<td>Дата закрытия реестра акционеров</td><td rowspan=2>Выплата</td>"
+        "<td colspan=2>Размер дивидендов</td></tr>"
+        "<tr><td>Под выплату дивидендов</td><td>АОИ</td><td>АПИ</td></tr>"
+    )
+    rows = "".join(
+        f"<tr><td>{2018 - i}</td><td>ГОСА</td><td>-</td><td>-</td><td>-</td>"
+        f"<td>{10 + i % 18:02}.07.{2018 - i}</td><td>-</td>"
+        f"<td>{i + 1},{i:02}</td><td>-</td></tr>"
+        for i in range(ROWS)
+    )
+    return page(conomy.TABLE_INDEX, f"<table>{header}{rows}</table>")
+
+
+def smart_lab_page() -> str:
+    """Синтетическая страница smart-lab.ru."""
+    header = (
+        "<tr><th>Название</th><th>Тикер</th><th>Доходность</th><th>Период</th>"
+        "<th>дата отсечки</th><th>Купить до</th><th>Цена</th><th>дивиденд,руб</th></tr>"
+    )
+    rows = "".join(
+        f"<tr><td>Компания {i}</td><td>T{i:03}</td><td>{i % 9}%</td><td>2019</td>"
+        f"<td>{10 + i % 18:02}.07.2019</td><td>-</td><td>100</td>"
+        f"<td>{i + 1},{i:02}</td></tr>"
+        for i in range(ROWS)
+    )
+    footer = (
+        "<tr>"
+        + "<td>\n+добавить дивиденды\nИстория выплаченных дивидендов\n</td>" * 8
+        + "</tr>"
+    )
+    return page(smart_lab.TABLE_INDEX, f"<table>{header}{rows}{footer}</table>")
+
+
+SYNTHETIC = dict(dohod=dohod_page, conomy=conomy_page, smart_lab=smart_lab_page)
+
+
+def load_pages(path: pathlib.Path = None):
+    """Сохраненные или синтетические страницы для всех источников."""
+    pages = {}
+    for source, make_page in SYNTHETIC.items():
+        file = path and path / f"{source}.html"
+        if file and file.exists():
+            pages[source] = (file.read_text(encoding="utf-8"), "сохраненная")
+        else:
+            pages[source] = (make_page(), "синтетическая")
+    return pages
+
+
+def parse(html: str, source: str, method: str):
+    """Разбор страницы и формирование DataFrame."""
+    table_index, columns, header, footer = SOURCES[source]
+    table = parser.HTMLTableParser(html, table_index, method)
+    return table.make_df(columns, header, footer)
+
+
+def measure(html: str, source: str, method: str) -> float:
+    """Лучшее время разбора из нескольких повторов."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        parse(html, source, method)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Печатает результаты сравнения."""
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument(
+        "--pages", type=pathlib.Path, help="Каталог с сохраненными страницами"
+    )
+    args = arg_parser.parse_args()
+    for source, (html, kind) in load_pages(args.pages).items():
+        size = len(html.encode("utf-8")) / 2 ** 20
+        df = parse(html, source, parser.SOUP)
+        if not df.equals(parse(html, source, parser.STREAM)):
+            raise ValueError(f"Результаты разбора {source} не совпадают")
+        print(f"{source} - {kind} страница {size:.2f} МБ")
+        for method in (parser.SOUP, parser.STREAM):
+            best = measure(html, source, method)
+            print(f"{method:>8}: {best * 1000:7.1f} мс, {size / best:6.1f} МБ/с")
+
+
+if __name__ == "__main__":
+    main()
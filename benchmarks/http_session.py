@@ -0,0 +1,120 @@
+"""Бенчмарк загрузки страниц с отдельной сессией для каждого тикера и с общей сессией клиента.
+
+Сравнивается загрузка всех страниц при создании новой aiohttp.ClientSession для каждого тикера и при
+использовании общей сессии с пулом соединений из client.open_http_session.
+
+Локальный HTTP-сервер имитирует сайт с таблицами дивидендов для 200 тикеров и добавляет к первому
+запросу в каждом новом соединении задержку, сопоставимую с установкой TCP и TLS соединения с удаленным
+сайтом. Помимо времени печатается количество соединений - без общей сессии их число не ограничено, и
+на реальном сайте каждое из них требует отдельного TLS-рукопожатия.
+
+Запуск из корня репозитория: python -m benchmarks.http_session
+"""
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from poptimizer.store import client
+
+HOST = "127.0.0.1"
+TICKERS = [f"T{i:03}" for i in range(200)]
+ROWS = 20
+# Имитация задержки на установку соединения с удаленным сайтом в секундах
+HANDSHAKE_DELAY = 0.05
+ROUNDS = 3
+
+
+def make_page(ticker: str) -> str:
+    """Страница с таблицей дивидендов, похожая на страницы dohod.ru."""
+    rows = "".join(
+        f"<tr><td>10.05.{2000 + year}</td><td>{year}</td><td>{year + 0.1:.2f}</td></tr>"
+        for year in range(ROWS)
+    )
+    header = "<tr><th>Дата закрытия реестра</th><th>Год</th><th>Дивиденд (руб.)</th></tr>"
+    return f"<html><body><h1>{ticker}</h1><table>{header}{rows}</table></body></html>"
+
+
+async def start_server(pages: dict, connections: set):
+    """Запускает локальный сервер и возвращает его и адрес.
+
+    Первый запрос в каждом новом соединении обрабатывается с задержкой, а соединения запоминаются.
+    """
+
+    async def handler(request: web.Request):
+        transport = request.transport
+        if transport not in connections:
+            connections.add(transport)
+            await asyncio.sleep(HANDSHAKE_DELAY)
+        return web.Response(text=pages[request.match_info["ticker"]], content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{ticker}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{HOST}:{port}"
+
+
+async def fetch(session: aiohttp.ClientSession, url: str) -> str:
+    """Загружает страницу."""
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+        return await resp.text()
+
+
+async def session_per_ticker(base_url: str):
+    """Новая сессия для каждого тикера, как в менеджерах до появления общей сессии."""
+
+    async def fetch_one(ticker):
+        async with aiohttp.ClientSession() as session:
+            return await fetch(session, f"{base_url}/{ticker}")
+
+    return await asyncio.gather(*[fetch_one(ticker) for ticker in TICKERS])
+
+
+async def shared_session(base_url: str):
+    """Общая сессия с пулом соединений."""
+    async with client.open_http_session() as session:
+        return await asyncio.gather(
+            *[fetch(session, f"{base_url}/{ticker}") for ticker in TICKERS]
+        )
+
+
+async def measure(func, base_url: str, size: int, connections: set):
+    """Печатает лучшее время из нескольких повторов и количество открытых за повтор соединений."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        connections.clear()
+        start = time.perf_counter()
+        pages = await func(base_url)
+        best = min(best, time.perf_counter() - start)
+        assert sum(len(page) for page in pages) == size
+    print(
+        f"{func.__name__:>18}: {best * 1000:7.1f} мс, {len(TICKERS) / best:7,.0f} страниц/с, "
+        f"{len(connections):3} соединений"
+    )
+
+
+async def main():
+    """Печатает результаты сравнения."""
+    pages = {ticker: make_page(ticker) for ticker in TICKERS}
+    size = sum(len(page) for page in pages.values())
+    connections = set()
+    runner, base_url = await start_server(pages, connections)
+    try:
+        print(
+            f"{len(TICKERS)} страниц, задержка нового соединения {HANDSHAKE_DELAY * 1000:.0f} мс, "
+            f"соединений с сайтом не более {client.HTTP_LIMIT_PER_HOST}"
+        )
+        await measure(session_per_ticker, base_url, size, connections)
+        await measure(shared_session, base_url, size, connections)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
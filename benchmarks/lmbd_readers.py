@@ -0,0 +1,119 @@
+"""Бенчмарк параллельного чтения из хранилища несколькими процессами во время записи.
+
+Сравнивается чтение в транзакциях только на чтение с кэшированными дескрипторами баз и чтение в
+транзакциях на запись, которые сериализуются блокировкой единственного писателя LMDB. Чтение
+выполняется как без записи, так и во время работы отдельного процесса, периодически удерживающего
+транзакцию на запись, как при сохранении обновления данных. В обоих случаях значения десериализуются
+одинаково, а кэш десериализованных значений отключен.
+
+Запуск из корня репозитория: python -m benchmarks.lmbd_readers
+"""
+import multiprocessing
+import pathlib
+import tempfile
+import time
+from concurrent import futures
+
+import numpy as np
+import pandas as pd
+
+from poptimizer.store import codec, lmbd
+
+CATEGORY = "quotes"
+TICKERS = 100
+ROWS = 2500
+READS = 2000
+WORKERS = 4
+MAX_SIZE = 200 * 2 ** 20
+MAX_DBS = 3
+# Время удержания транзакции на запись и пауза между транзакциями писателя в секундах
+WRITE_HOLD = 0.02
+WRITE_PAUSE = 0.005
+
+
+def make_store(path: pathlib.Path):
+    """Заполняет хранилище синтетическими котировками."""
+    # Индекс без freq, как у загруженных котировок, чтобы значения сохранялись по столбцам, а не
+    # через pickle
+    index = pd.bdate_range(end="2019-05-10", periods=ROWS, name="DATE")
+    index = pd.DatetimeIndex(index.values, name=index.name)
+    with lmbd.DataStore(path, MAX_SIZE, MAX_DBS) as db:
+        for i in range(TICKERS):
+            df = pd.DataFrame(
+                np.random.rand(ROWS, 2), index=index, columns=["CLOSE", "TURNOVER"]
+            )
+            db[f"T{i:03}", CATEGORY] = df
+
+
+def read_only(path: str):
+    """Чтение через DataStore.get в транзакциях только на чтение."""
+    with lmbd.DataStore(path, MAX_SIZE, MAX_DBS) as db:
+        start = time.perf_counter()
+        for i in range(READS):
+            db.get(f"T{i % TICKERS:03}", CATEGORY)
+        return time.perf_counter() - start
+
+
+def read_write_txn(path: str):
+    """Чтение в транзакциях на запись, как было до кэширования дескрипторов баз."""
+    with lmbd.DataStore(path, MAX_SIZE, MAX_DBS) as db:
+        # noinspection PyProtectedMember
+        env = db._env
+        start = time.perf_counter()
+        for i in range(READS):
+            with env.begin(write=True, buffers=True) as txn:
+                category_db = env.open_db(f"__db_{CATEGORY}".encode(), txn=txn)
+                codec.loads(txn.get(f"T{i % TICKERS:03}".encode(), db=category_db))
+        return time.perf_counter() - start
+
+
+def write(path: str, stop):
+    """Периодически удерживает транзакцию на запись до сигнала остановки."""
+    with lmbd.DataStore(path, MAX_SIZE, MAX_DBS) as db:
+        # noinspection PyProtectedMember
+        env = db._env
+        value = codec.dumps(np.random.rand(ROWS, 2))
+        while not stop.is_set():
+            with env.begin(write=True) as txn:
+                txn.put(b"writer", value)
+                time.sleep(WRITE_HOLD)
+            time.sleep(WRITE_PAUSE)
+
+
+def run(func, path: pathlib.Path, with_writer: bool):
+    """Запускает функцию чтения одновременно в нескольких процессах."""
+    stop = multiprocessing.Event()
+    writer = multiprocessing.Process(target=write, args=(str(path), stop))
+    if with_writer:
+        writer.start()
+    try:
+        with futures.ProcessPoolExecutor(WORKERS) as pool:
+            start = time.perf_counter()
+            times = list(pool.map(func, [str(path)] * WORKERS))
+            wall = time.perf_counter() - start
+    finally:
+        stop.set()
+        if with_writer:
+            writer.join()
+    reads = READS * WORKERS
+    print(
+        f"{func.__name__:>15}: {wall:.2f} с всего, "
+        f"{reads / wall:,.0f} чтений/с, "
+        f"максимум на процесс {max(times):.2f} с"
+    )
+
+
+def main():
+    """Печатает результаты сравнения."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = pathlib.Path(temp_dir)
+        make_store(path)
+        print(f"{WORKERS} процесса по {READS} чтений из {TICKERS} тикеров")
+        for with_writer in (False, True):
+            print("Во время записи" if with_writer else "Без записи")
+            run(read_write_txn, path, with_writer)
+            run(read_only, path, with_writer)
+
+
+if __name__ == "__main__":
+    main()
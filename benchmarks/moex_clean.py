@@ -0,0 +1,83 @@
+"""Бенчмарк времени очистки котировок одного тикера, загруженных с MOEX ISS.
+
+Синтетическая история дневных свечей за 20 лет в формате записей aiomoex. Сравнивается прежнее
+поэлементное приведение типов с помощью Series.apply и формирование DataFrame с приведением целых
+столбцов.
+
+Запуск из корня репозитория: python -m benchmarks.moex_clean
+"""
+import functools
+import time
+
+import numpy as np
+import pandas as pd
+
+from poptimizer.store import moex
+from poptimizer.store.utils import DATE, CLOSE, TURNOVER
+
+YEARS = 20
+ROUNDS = 5
+
+FUNC_FLOAT = functools.partial(pd.to_numeric, downcast="float")
+FUNC_DATE = functools.partial(pd.to_datetime, format="%Y-%m-%d", exact=False)
+
+
+def make_candles():
+    """Синтетические дневные свечи в формате aiomoex."""
+    index = pd.bdate_range(end="2019-05-10", periods=YEARS * 252)
+    closes = np.random.rand(len(index)) * 100
+    values = np.random.rand(len(index)) * 1e9
+    return [
+        dict(
+            open=close,
+            close=close,
+            high=close,
+            low=close,
+            value=value,
+            volume=int(value / close),
+            begin=f"{date:%Y-%m-%d} 00:00:00",
+            end=f"{date:%Y-%m-%d} 23:59:59",
+        )
+        for date, close, value in zip(index, closes, values)
+    ]
+
+
+def clean_apply(data):
+    """Прежняя очистка с поэлементным приведением типов."""
+    df = pd.DataFrame(data)
+    df = df.loc[:, ["begin", "close", "value"]]
+    df.columns = [DATE, CLOSE, TURNOVER]
+    df[DATE] = df[DATE].apply(FUNC_DATE)
+    df[CLOSE] = df[CLOSE].apply(FUNC_FLOAT)
+    df[TURNOVER] = df[TURNOVER].apply(FUNC_FLOAT)
+    return df.set_index(DATE)
+
+
+def clean_vectorized(data):
+    """Очистка с приведением типов целых столбцов."""
+    # noinspection PyProtectedMember
+    return moex.Quotes._clean_df(data)
+
+
+def measure(func, data):
+    """Печатает лучшее время из нескольких повторов."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    print(f"{func.__name__:>16}: {best * 1000:7.1f} мс на тикер")
+
+
+def main():
+    """Печатает результаты сравнения."""
+    data = make_candles()
+    print(f"{len(data)} свечей за {YEARS} лет")
+    if not np.allclose(clean_apply(data).values, clean_vectorized(data).values):
+        raise ValueError("Результаты очистки не совпадают")
+    measure(clean_apply, data)
+    measure(clean_vectorized, data)
+
+
+if __name__ == "__main__":
+    main()
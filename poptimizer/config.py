@@ -20,6 +20,10 @@ pd.set_option("display.width", None)
 # Путь к директории с данными
 DATA_PATH = pathlib.Path(__file__).parents[1] / "data"
 
+# Работа только с локальными данными без обновления из интернета - позволяет продолжать расчеты при
+# недоступности источников данных
+OFFLINE = False
+
 # Путь к директории с отчетам
 REPORTS_PATH = pathlib.Path(__file__).parents[1] / "reports"
 
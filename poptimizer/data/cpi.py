@@ -1,17 +1,7 @@
 """Данные индексу потребительских цен."""
-import asyncio
-
 import pandas as pd
 
-from poptimizer import store
-
-
-async def _cpi() -> pd.Series:
-    """Месячные данные индексу потребительских цен."""
-    async with store.Client() as client:
-        db = client.cpi()
-        df = await db.get()
-    return df
+from poptimizer.data.service import get_service
 
 
 def monthly_cpi(date: pd.Timestamp) -> pd.Series:
@@ -22,5 +12,5 @@ def monthly_cpi(date: pd.Timestamp) -> pd.Series:
     :return:
         Месячная инфляция.
     """
-    df = asyncio.run(_cpi())
+    df = get_service().load("cpi")
     return df[:date]
@@ -1,16 +1,25 @@
 """Основные функции агрегации данных по котировкам акций."""
-import asyncio
-from typing import Tuple, Optional, List
+from typing import Tuple, Optional
 
-import numpy as np
 import pandas as pd
 
 from poptimizer import store
-
-__all__ = ["lot_size", "prices", "turnovers", "securities_with_reg_number", "index"]
-
-
-async def _securities(tickers: Optional[Tuple[str, ...]] = None) -> pd.Series:
+from poptimizer.store.trading_calendar import TradingCalendar
+from poptimizer.data.panel import market_panel
+from poptimizer.data.service import get_service
+
+__all__ = [
+    "lot_size",
+    "prices",
+    "turnovers",
+    "securities_with_reg_number",
+    "index",
+    "trading_calendar",
+    "data_age",
+]
+
+
+def _securities(tickers: Optional[Tuple[str, ...]] = None) -> pd.Series:
     """Информация о размере лотов для тикеров.
 
     :param tickers:
@@ -19,9 +28,7 @@ async def _securities(tickers: Optional[Tuple[str, ...]] = None) -> pd.Series:
     :return:
         Информация о размере лотов.
     """
-    async with store.Client() as client:
-        db = client.securities()
-        df = await db.get()
+    df = get_service().load("securities")
     if tickers:
         return df.loc[list(tickers)]
     return df
@@ -29,7 +36,7 @@ async def _securities(tickers: Optional[Tuple[str, ...]] = None) -> pd.Series:
 
 def securities_with_reg_number() -> pd.Index:
     """Все ценные акции с регистрационным номером."""
-    df = asyncio.run(_securities())
+    df = _securities()
     return df.dropna(axis=0).index
 
 
@@ -42,21 +49,10 @@ def lot_size(tickers: Optional[Tuple[str, ...]] = None) -> pd.Series:
     :return:
         Информация о размере лотов.
     """
-    df = asyncio.run(_securities(tickers))
+    df = _securities(tickers)
     return df[store.LOT_SIZE]
 
 
-async def _index() -> pd.DataFrame:
-    """Загрузка данных по индексу полной доходности с учетом российских налогов - MCFTRR.
-
-    :return:
-        История цен закрытия индекса.
-    """
-    async with store.Client() as client:
-        db = client.index()
-        return await db.get()
-
-
 def index(last_date: pd.Timestamp) -> pd.DataFrame:
     """Загрузка данных по индексу полной доходности с учетом российских налогов - MCFTRR.
 
@@ -65,21 +61,13 @@ def index(last_date: pd.Timestamp) -> pd.DataFrame:
     :return:
         История цен закрытия индекса.
     """
-    df = asyncio.run(_index())
+    df = get_service().load("index")
     return df[:last_date]
 
 
-async def _quotes(tickers: Tuple[str, ...]) -> List[pd.DataFrame]:
-    """Информация о котировках для заданных тикеров (цена закрытия и объем).
-
-    :param tickers:
-        Перечень тикеров, для которых нужна информация.
-    :return:
-        Список с котировками.
-    """
-    async with store.Client() as client:
-        db = client.quotes(tickers)
-        return await db.get()
+def trading_calendar() -> TradingCalendar:
+    """Торговый календарь MOEX с прогнозом торговых дней с учетом известных праздников."""
+    return get_service().load("calendar")
 
 
 def prices(tickers: tuple, last_date: pd.Timestamp) -> pd.DataFrame:
@@ -94,11 +82,7 @@ def prices(tickers: tuple, last_date: pd.Timestamp) -> pd.DataFrame:
     :return:
         Цены закрытия.
     """
-    quotes_list = asyncio.run(_quotes(tickers))
-    df = pd.concat([df[store.CLOSE] for df in quotes_list], axis=1)
-    df = df.loc[:last_date]
-    df.columns = tickers
-    return df.replace(to_replace=[np.nan, 0], method="ffill")
+    return market_panel(tickers, last_date).prices
 
 
 def turnovers(tickers: tuple, last_date: pd.Timestamp) -> pd.DataFrame:
@@ -113,8 +97,16 @@ def turnovers(tickers: tuple, last_date: pd.Timestamp) -> pd.DataFrame:
     :return:
         Обороты.
     """
-    quotes_list = asyncio.run(_quotes(tickers))
-    df = pd.concat([df[store.TURNOVER] for df in quotes_list], axis=1)
-    df = df.loc[:last_date]
-    df.columns = tickers
-    return df.fillna(0, axis=0)
+    return market_panel(tickers, last_date).turnovers
+
+
+def data_age() -> Optional[pd.Timedelta]:
+    """Возраст локальных данных.
+
+    Данные могут устареть при работе без обновления или недоступности источников данных.
+
+    :return:
+        Нулевой интервал для актуальных данных или None, если актуальность данных ни разу не
+        проверялась.
+    """
+    return get_service().data_age
@@ -0,0 +1,313 @@
+"""Выровненная панель рыночных данных.
+
+Цены, обороты и дивиденды всех тикеров хранятся в непрерывных массивах NumPy с общим индексом
+торговых дней и общим индексом тикеров. Панель загружается один раз для набора тикеров и версии
+локальных данных, а срезы на дату и по подмножеству тикеров не требуют повторной загрузки и
+выравнивания данных.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from poptimizer.config import AFTER_TAX
+from poptimizer.data.service import get_service
+from poptimizer.store import CLOSE, DATE, TURNOVER
+from poptimizer.store.cache import LRUCache
+from poptimizer.store.trading_calendar import TradingCalendar
+
+__all__ = ["MarketPanel", "market_panel", "panel_cache_info"]
+
+# Поля панели
+PRICES = "prices"
+TURNOVERS = "turnovers"
+DIVIDENDS = "dividends"
+FIELDS = (PRICES, TURNOVERS, DIVIDENDS)
+# Производное поле, рассчитываемое при создании панели
+LOG_RETURNS = "log_returns"
+
+# Максимальный объем кэша панелей в байтах
+PANEL_CACHE_SIZE = 512 * 2 ** 20
+
+_PANEL_CACHE = LRUCache(PANEL_CACHE_SIZE)
+
+# Календарь бизнес дней для дат за пределами истории котировок при отсутствии торгового календаря
+BUSINESS_DAYS = np.busdaycalendar()
+
+
+class MarketPanel:
+    """Рыночные данные в виде массивов NumPy (даты x тикеры) с общими индексами.
+
+    Массивы доступны только для чтения, поэтому панель и ее срезы можно безопасно разделять между
+    потребителями. Срез на дату не копирует данные, как и срез по тикерам, идущим в панели подряд в
+    том же порядке, - для остальных наборов тикеров значения копируются.
+
+    * prices - цены закрытия, пропуски и нулевые значения заполнены предыдущими ценами.
+    * turnovers - обороты, пропуски заполнены нулями.
+    * dividends - посленалоговые дивиденды, привязанные к эксдивидендной дате в режиме T-2.
+    * log_returns - логарифмы дневных доходностей с учетом дивидендов, рассчитываемые однократно при
+      создании панели, - для первого дня не определены.
+    """
+
+    def __init__(
+        self, dates: pd.DatetimeIndex, tickers: pd.Index, arrays: Dict[str, np.ndarray]
+    ):
+        """Массивы должны иметь форму (len(dates), len(tickers)).
+
+        :param dates:
+            Торговые дни.
+        :param tickers:
+            Тикеры.
+        :param arrays:
+            Массивы для всех полей панели. Доходности рассчитываются, если их нет среди массивов.
+        """
+        self._dates = dates
+        self._tickers = tickers
+        if LOG_RETURNS not in arrays:
+            arrays = dict(arrays)
+            arrays[LOG_RETURNS] = _log_returns(arrays[PRICES], arrays[DIVIDENDS])
+        self._arrays = arrays
+
+    def __len__(self):
+        return len(self._dates)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """Торговые дни."""
+        return self._dates
+
+    @property
+    def tickers(self) -> pd.Index:
+        """Тикеры."""
+        return self._tickers
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        """Последний торговый день панели."""
+        if len(self._dates):
+            return self._dates[-1]
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        """Объем массивов панели в байтах."""
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def values(self, field: str) -> np.ndarray:
+        """Массив значений поля панели, доступный только для чтения."""
+        return self._arrays[field]
+
+    def frame(self, field: str) -> pd.DataFrame:
+        """Значения поля панели в виде DataFrame без копирования данных."""
+        return pd.DataFrame(
+            self._arrays[field], index=self._dates, columns=self._tickers, copy=False
+        )
+
+    @property
+    def prices(self) -> pd.DataFrame:
+        """Цены закрытия."""
+        return self.frame(PRICES)
+
+    @property
+    def turnovers(self) -> pd.DataFrame:
+        """Обороты."""
+        return self.frame(TURNOVERS)
+
+    @property
+    def dividends(self) -> pd.DataFrame:
+        """Посленалоговые дивиденды на эксдивидендную дату."""
+        return self.frame(DIVIDENDS)
+
+    def log_returns(self) -> pd.DataFrame:
+        """Логарифмы дневных доходностей с учетом посленалоговых дивидендов без копирования данных.
+
+        Для первого дня панели доходность не рассчитывается.
+        """
+        return pd.DataFrame(
+            self._arrays[LOG_RETURNS][1:],
+            index=self._dates[1:],
+            columns=self._tickers,
+            copy=False,
+        )
+
+    def as_of(self, date: pd.Timestamp) -> "MarketPanel":
+        """Срез панели по указанную дату включительно без копирования данных."""
+        end = self._dates.searchsorted(pd.Timestamp(date), side="right")
+        arrays = {field: array[:end] for field, array in self._arrays.items()}
+        return MarketPanel(self._dates[:end], self._tickers, arrays)
+
+    def select(self, tickers: Tuple[str, ...]) -> "MarketPanel":
+        """Срез панели по тикерам в заданном порядке.
+
+        Данные копируются, только если тикеры не идут в панели подряд в том же порядке.
+        """
+        positions = self._tickers.get_indexer(list(tickers))
+        if (positions < 0).any():
+            missing = [ticker for ticker, pos in zip(tickers, positions) if pos < 0]
+            raise KeyError(f"В панели нет тикеров {', '.join(missing)}")
+        start = positions[0] if len(positions) else 0
+        if np.array_equal(positions, np.arange(start, start + len(positions))):
+            cols = slice(start, start + len(positions))
+        else:
+            cols = positions
+        arrays = {
+            field: _read_only(array[:, cols]) for field, array in self._arrays.items()
+        }
+        return MarketPanel(self._dates, pd.Index(tickers), arrays)
+
+
+def market_panel(
+    tickers: Tuple[str, ...], last_date: Optional[pd.Timestamp] = None
+) -> MarketPanel:
+    """Панель рыночных данных для тикеров.
+
+    Полная панель кэшируется для набора тикеров и версии локальных данных, а срез на дату
+    выполняется без копирования данных.
+
+    :param tickers:
+        Тикеры, для которых нужна информация.
+    :param last_date:
+        Последняя дата панели. По умолчанию - вся имеющаяся история.
+    :return:
+        Панель рыночных данных.
+    """
+    tickers = tuple(tickers)
+    service = get_service()
+    panel = _PANEL_CACHE.get((tickers, service.data_version))
+    if panel is None:
+        panel = _make_panel(tickers)
+        _PANEL_CACHE.put((tickers, service.data_version), panel, panel.nbytes)
+    if last_date is None:
+        return panel
+    return panel.as_of(last_date)
+
+
+def panel_cache_info() -> dict:
+    """Статистика кэша панелей.
+
+    :return:
+        Статистика в виде словаря:
+
+        * hits - количество попаданий в кэш.
+        * misses - количество промахов.
+        * entries - количество значений в кэше.
+        * size - объем значений в кэше в байтах.
+        * max_size - максимальный объем кэша в байтах.
+    """
+    return _PANEL_CACHE.info()
+
+
+def _make_panel(tickers: Tuple[str, ...]) -> MarketPanel:
+    """Загружает котировки и дивиденды и выравнивает их по общим индексам."""
+    quotes = _as_list(get_service().load("quotes", tickers))
+    close = pd.concat([df[CLOSE] for df in quotes], axis=1)
+    close.columns = tickers
+    turnover = pd.concat([df[TURNOVER] for df in quotes], axis=1)
+    turnover.columns = tickers
+    dates = close.index
+    prices = close.mask(close == 0).ffill()
+    div = dividends_all(tickers)
+    calendar = get_service().load("calendar")
+    div.index = t2_ex_dates(div.index, dates, calendar)
+    # Может образоваться несколько дат, если часть дивидендов приходится на выходные
+    div = div.groupby(by=DATE).sum().reindex(index=dates, fill_value=0)
+    arrays = {
+        PRICES: _to_array(prices),
+        TURNOVERS: _to_array(turnover.fillna(0)),
+        DIVIDENDS: _to_array(div),
+    }
+    return MarketPanel(dates, pd.Index(tickers), arrays)
+
+
+def _log_returns(prices: np.ndarray, dividends: np.ndarray) -> np.ndarray:
+    """Логарифмы дневных доходностей, доступные только для чтения, - NaN для первого дня."""
+    returns = np.full(prices.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = np.log((prices[1:] + dividends[1:]) / prices[:-1])
+    return _read_only(returns)
+
+
+def _as_list(values) -> list:
+    """Данные менеджера для одного наименования возвращаются без списка."""
+    if isinstance(values, list):
+        return values
+    return [values]
+
+
+def _to_array(df: pd.DataFrame) -> np.ndarray:
+    """Непрерывный массив float64, доступный только для чтения."""
+    return _read_only(np.ascontiguousarray(df.to_numpy(dtype=np.float64, copy=True)))
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """Запрещает изменение массива или его представления."""
+    array.flags.writeable = False
+    return array
+
+
+def dividends_all(tickers: tuple) -> pd.DataFrame:
+    """Дивиденды по заданным тикерам после уплаты налогов.
+
+    Значения для дат, в которые нет дивидендов у данного тикера (есть у какого-то другого),
+    заполняются 0.
+
+    :param tickers:
+        Тикеры, для которых нужна информация.
+    :return:
+        Дивиденды.
+    """
+    div_list = _as_list(get_service().load("dividends", tickers))
+    df = pd.concat([df for df in div_list], axis=1)
+    return df.fillna(0, axis=0) * AFTER_TAX
+
+
+def t2_shift(
+    date: pd.Timestamp,
+    index: pd.DatetimeIndex,
+    calendar: Optional[TradingCalendar] = None,
+):
+    """Рассчитывает эксдивидендную дату для режима T-2 на основании даты закрытия реестра.
+
+    Если дата не содержится в индексе цен, то необходимо найти предыдущую из индекса цен. После этого
+    взять сдвинутую на 1 назад дату. Если дата находится в будущем за пределом истории котировок, то
+    нужно сдвинуться на 1 торговый день назад по торговому календарю, а без него - на 1 бизнес день
+    назад, что может не корректно работать из-за праздников.
+    """
+    return t2_ex_dates(pd.DatetimeIndex([date]), index, calendar)[0]
+
+
+def t2_ex_dates(
+    dates: pd.DatetimeIndex,
+    index: pd.DatetimeIndex,
+    calendar: Optional[TradingCalendar] = None,
+) -> pd.DatetimeIndex:
+    """Рассчитывает эксдивидендные даты для режима T-2 сразу для всех дат закрытия реестра.
+
+    Для дат в пределах истории котировок предыдущая дата из индекса цен находится бинарным поиском,
+    а за пределами истории - сдвигом по торговому календарю или, если его нет или дата находится за
+    пределами прогноза, по календарю бизнес дней. Даты, для которых эксдивидендная дата предшествует
+    истории котировок, преобразуются в NaT.
+
+    :param dates:
+        Даты закрытия реестра.
+    :param index:
+        Упорядоченный индекс торговых дней.
+    :param calendar:
+        Торговый календарь для дат после окончания истории котировок.
+    :return:
+        Эксдивидендные даты.
+    """
+    days = dates.values.astype("datetime64[D]")
+    # Часть дивидендов приходится на выходной, поэтому нельзя просто сдвинуться на один бизнес день
+    # назад - сначала нужно перейти на предыдущий бизнес день
+    ex_dates = np.busday_offset(days, -1, roll="backward", busdaycal=BUSINESS_DAYS)
+    ex_dates = ex_dates.astype("datetime64[ns]")
+    if calendar is not None:
+        future = (dates > index[-1]) & (dates < calendar.end)
+        ex_dates[future] = calendar.shift_index(dates[future], -1).values
+    historic = dates <= index[-1]
+    position = index.searchsorted(dates[historic], side="right") - 2
+    ex_dates[historic] = np.where(
+        position >= 0, index.values[position.clip(0)], np.datetime64("NaT")
+    )
+    return pd.DatetimeIndex(ex_dates, name=dates.name)
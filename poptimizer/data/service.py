@@ -0,0 +1,156 @@
+"""Долгоживущий сервис доступа к данным.
+
+Открытие клиентской сессии требует создания цикла событий, сессий для загрузки данных и открытия
+хранилища, поэтому все синхронные функции модуля используют один сервис, который открывается при
+первом обращении и закрывается при завершении работы программы.
+"""
+import asyncio
+import atexit
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from poptimizer.store import Client, lmbd, utils
+
+__all__ = ["DataService", "get_service", "close_service"]
+
+
+class DataService:
+    """Сервис с собственным циклом событий и клиентской сессией, открытыми между обращениями.
+
+    Асинхронный интерфейс - метод get, который выполняется в цикле событий сервиса, а синхронный -
+    методы load и run, выполняющие корутины в цикле событий сервиса. После окончания торгового дня
+    результаты загрузок, общие для клиентской сессии, и режим работы без обновления сбрасываются,
+    чтобы долгоживущий сервис предоставлял актуальные данные.
+    """
+
+    def __init__(self, offline: Optional[bool] = None):
+        """Цикл событий и клиентская сессия создаются при первом обращении.
+
+        :param offline:
+            Предоставлять локальные данные без обновления. По умолчанию - config.OFFLINE.
+        """
+        self._offline = offline
+        self._loop = None
+        self._client = None
+        self._end_of_trading_day = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def client(self) -> Client:
+        """Открытая клиентская сессия сервиса."""
+        self._open()
+        return self._client
+
+    @property
+    def store(self) -> lmbd.DataStore:
+        """Открытое хранилище клиентской сессии сервиса."""
+        return self.client.store
+
+    @property
+    def data_age(self) -> Optional[pd.Timedelta]:
+        """Возраст локальных данных - нулевой интервал для актуальных данных.
+
+        None, если актуальность данных ни разу не проверялась.
+        """
+        return self.client.data_age
+
+    @property
+    def data_version(self) -> Tuple:
+        """Версия локальных данных - изменяется при их возможном изменении."""
+        return self.client.data_version
+
+    async def get(self, name: str, *args):
+        """Асинхронно предоставляет данные менеджера клиентской сессии.
+
+        :param name:
+            Наименование менеджера данных - атрибута store.Client.
+        :param args:
+            Параметры менеджера данных.
+        :return:
+            Данные менеджера.
+        """
+        db = getattr(self.client, name)(*args)
+        return await db.get()
+
+    def load(self, name: str, *args):
+        """Синхронно предоставляет данные менеджера клиентской сессии.
+
+        :param name:
+            Наименование менеджера данных - атрибута store.Client.
+        :param args:
+            Параметры менеджера данных.
+        :return:
+            Данные менеджера.
+        """
+        return self.run(self.get(name, *args))
+
+    def run(self, coroutine):
+        """Выполняет корутину в цикле событий сервиса и возвращает ее результат."""
+        self._open()
+        self._reset_after_end_of_trading_day()
+        return self._loop.run_until_complete(coroutine)
+
+    def close(self):
+        """Закрывает клиентскую сессию и цикл событий, если они были открыты."""
+        if self._loop is None:
+            return
+        loop, client = self._loop, self._client
+        self._loop = None
+        self._client = None
+        try:
+            loop.run_until_complete(client.__aexit__(None, None, None))
+        finally:
+            loop.close()
+
+    def _open(self):
+        """Создает цикл событий и открывает в нем клиентскую сессию."""
+        if self._loop is not None:
+            return
+        loop = asyncio.new_event_loop()
+        try:
+            self._client = loop.run_until_complete(self._open_client())
+        except BaseException:
+            loop.close()
+            raise
+        self._loop = loop
+        self._end_of_trading_day = utils.end_of_trading_day()
+
+    async def _open_client(self) -> Client:
+        """Клиент создается внутри цикла событий, чтобы сессии были к нему привязаны."""
+        client = Client(self._offline)
+        return await client.__aenter__()
+
+    def _reset_after_end_of_trading_day(self):
+        """Сбрасывает общие для клиентской сессии данные после окончания торгового дня."""
+        end_of_trading_day = utils.end_of_trading_day()
+        if end_of_trading_day != self._end_of_trading_day:
+            self._end_of_trading_day = end_of_trading_day
+            self._client.reset()
+
+
+_SERVICE = None
+
+
+def get_service() -> DataService:
+    """Общий для модуля сервис данных, который закрывается при завершении работы программы."""
+    global _SERVICE
+    if _SERVICE is None:
+        _SERVICE = DataService()
+    return _SERVICE
+
+
+def close_service():
+    """Закрывает общий сервис данных - при следующем обращении будет открыт новый."""
+    global _SERVICE
+    if _SERVICE is not None:
+        service, _SERVICE = _SERVICE, None
+        service.close()
+
+
+atexit.register(close_service)
@@ -1,28 +1,22 @@
 """Проверка статуса актуальности данных по дивидендам."""
 import asyncio
-from typing import Tuple
+from typing import Tuple, Union
 
 import numpy as np
 import pandas as pd
 
 from poptimizer import store
 from poptimizer.config import AFTER_TAX
-from poptimizer.data import div
+from poptimizer.data import panel
+from poptimizer.data.service import get_service
 from poptimizer.store import TICKER, DIVIDENDS, DIVIDENDS_START
 
 __all__ = ["smart_lab_status", "dividends_status"]
 
 
-async def _smart_lab() -> pd.DataFrame:
-    """Информация о ближайших дивидендах на https://www.smart-lab.ru"""
-    async with store.Client() as client:
-        db = client.smart_lab()
-        return await db.get()
-
-
 def smart_lab() -> pd.DataFrame:
     """Информация о ближайших дивидендах на https://www.smart-lab.ru"""
-    return asyncio.run(_smart_lab())
+    return get_service().load("smart_lab")
 
 
 def smart_lab_status(tickers: Tuple[str, ...]):
@@ -32,7 +26,7 @@ def smart_lab_status(tickers: Tuple[str, ...]):
         Тикеры, для которых нужно проверить актуальность данных.
     """
     web = smart_lab()
-    local = div.dividends_all(tuple(set(web[TICKER].values))) / AFTER_TAX
+    local = panel.dividends_all(tuple(set(web[TICKER].values))) / AFTER_TAX
     status = ([], [])
     for i in range(len(web)):
         date = web.index[i]
@@ -51,32 +45,58 @@ def smart_lab_status(tickers: Tuple[str, ...]):
         print(", ".join(status[1]))
 
 
-async def _gather_div_data(ticker: str):
-    """Информация о дивидендах из основной базы и альтернативных источников."""
-    async with store.Client() as client:
+async def _gather_div_data(client: store.Client, tickers: Tuple[str, ...]):
+    """Информация о дивидендах из основной базы и альтернативных источников.
+
+    Данные для всех тикеров загружаются в рамках одной клиентской сессии, поэтому браузер для загрузки
+    с https://www.conomy.ru/ запускается один раз, а данные с https://www.smart-lab.ru загружаются
+    однократно.
+    """
+    for ticker in tickers:
         await client.dividends(ticker).create(ticker)
-        data_sources = [
-            client.dividends(ticker),
-            client.dohod(ticker),
-            client.conomy(ticker),
-            client.smart_lab(),
-        ]
-        names = [i.__class__.__name__ for i in data_sources]
-        aws = [i.get() for i in data_sources]
-        dfs = await asyncio.gather(*aws, return_exceptions=True)
-        return list(zip(names, dfs))
+    data_sources = {
+        ticker: [client.dividends(ticker), client.dohod(ticker), client.conomy(ticker)]
+        for ticker in tickers
+    }
+    smart_lab_source = client.smart_lab()
+    aws = [i.get() for sources in data_sources.values() for i in sources]
+    aws.append(smart_lab_source.get())
+    *dfs, smart_lab_df = await asyncio.gather(*aws, return_exceptions=True)
+    dfs = iter(dfs)
+    result = {}
+    for ticker, sources in data_sources.items():
+        result[ticker] = [(i.__class__.__name__, next(dfs)) for i in sources]
+        result[ticker].append((smart_lab_source.__class__.__name__, smart_lab_df))
+    return result
 
 
-def dividends_status(ticker: str):
-    """Проверяет необходимость обновления данных для тикера.
+def dividends_status(ticker: Union[str, Tuple[str, ...]]):
+    """Проверяет необходимость обновления данных для тикера или нескольких тикеров.
 
     Сравнивает основные данные по дивидендам с альтернативными источниками и распечатывает результаты
-    сравнения.
+    сравнения. Для проверки всего портфеля следует передавать кортеж тикеров - данные загружаются в
+    рамках одной клиентской сессии с однократным запуском браузера.
 
     :param ticker:
-        Тикер.
+        Тикер или кортеж тикеров.
+    :return:
+        Список результатов сравнения с альтернативными источниками, а для кортежа тикеров - список таких
+        списков для каждого тикера.
     """
-    dfs = asyncio.run(_gather_div_data(ticker))
+    service = get_service()
+    if isinstance(ticker, str):
+        data = service.run(_gather_div_data(service.client, (ticker,)))
+        return _compare_div_data(ticker, data[ticker])
+    data = service.run(_gather_div_data(service.client, ticker))
+    result = []
+    for one_ticker in ticker:
+        print(f"\nТИКЕР {one_ticker}")
+        result.append(_compare_div_data(one_ticker, data[one_ticker]))
+    return result
+
+
+def _compare_div_data(ticker: str, dfs: list):
+    """Сравнивает основные данные по дивидендам с альтернативными источниками."""
     _, main_df = dfs[0]
 
     result = []
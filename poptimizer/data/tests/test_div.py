@@ -4,9 +4,7 @@ import pytest
 
 from poptimizer.config import AFTER_TAX
 from poptimizer.data import moex, log_total_returns
-
-# noinspection PyProtectedMember
-from poptimizer.data.div import t2_shift, dividends_all
+from poptimizer.data.panel import dividends_all, t2_shift
 
 
 def test_dividends_all():
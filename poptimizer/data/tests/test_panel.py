@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from poptimizer import config
+from poptimizer.config import AFTER_TAX
+from poptimizer.data import div, panel, service
+from poptimizer.store import CLOSE, DATE, TURNOVER
+from poptimizer.store.trading_calendar import TradingCalendar
+
+TICKERS = ("AKRN", "GMKN", "MTSS")
+DATES = pd.DatetimeIndex(
+    ["2018-10-15", "2018-10-16", "2018-10-17", "2018-10-18"], name=DATE
+)
+
+
+def make_panel():
+    prices = np.array(
+        [[10.0, 20.0, 30.0], [11.0, 22.0, 30.0], [12.0, 22.0, 33.0], [12.0, 20.0, 36.0]]
+    )
+    turnovers = np.arange(12, dtype=np.float64).reshape(4, 3)
+    dividends = np.zeros((4, 3))
+    dividends[2, 1] = 2.0
+    arrays = dict(prices=prices, turnovers=turnovers, dividends=dividends)
+    # noinspection PyProtectedMember
+    arrays = {field: panel._read_only(array) for field, array in arrays.items()}
+    return panel.MarketPanel(DATES, pd.Index(TICKERS), arrays)
+
+
+def test_frames():
+    market = make_panel()
+    assert len(market) == 4
+    assert market.last_date == pd.Timestamp("2018-10-18")
+    df = market.prices
+    assert df.index.equals(DATES)
+    assert list(df.columns) == list(TICKERS)
+    assert df.loc["2018-10-17", "MTSS"] == 33
+    assert np.shares_memory(df.to_numpy(), market.values(panel.PRICES))
+    assert market.turnovers.loc["2018-10-16", "AKRN"] == 3
+    assert market.dividends.loc["2018-10-17", "GMKN"] == 2
+
+
+def test_read_only():
+    market = make_panel()
+    with pytest.raises(ValueError):
+        market.values(panel.PRICES)[0, 0] = 1
+    with pytest.raises(ValueError):
+        market.as_of(DATES[1]).values(panel.TURNOVERS)[0, 0] = 1
+
+
+def test_log_returns_computed_once():
+    market = make_panel()
+    returns = market.log_returns()
+    assert np.shares_memory(returns.to_numpy(), market.log_returns().to_numpy())
+    assert np.shares_memory(
+        market.as_of(DATES[2]).log_returns().to_numpy(), returns.to_numpy()
+    )
+    with pytest.raises(ValueError):
+        returns.iloc[0, 0] = 1
+
+
+def test_as_of():
+    market = make_panel()
+    sliced = market.as_of(pd.Timestamp("2018-10-17"))
+    assert sliced.last_date == pd.Timestamp("2018-10-17")
+    assert len(sliced) == 3
+    assert np.shares_memory(sliced.values(panel.PRICES), market.values(panel.PRICES))
+    # Выходной день
+    assert market.as_of(pd.Timestamp("2018-10-14")).last_date is None
+    assert market.as_of(pd.Timestamp("2018-10-20")).last_date == DATES[-1]
+
+
+def test_select():
+    market = make_panel()
+    view = market.select(("GMKN", "MTSS"))
+    assert list(view.tickers) == ["GMKN", "MTSS"]
+    assert np.shares_memory(view.values(panel.PRICES), market.values(panel.PRICES))
+    assert view.prices.loc["2018-10-18", "MTSS"] == 36
+
+    copy = market.select(("MTSS", "AKRN"))
+    assert not np.shares_memory(copy.values(panel.PRICES), market.values(panel.PRICES))
+    assert copy.prices.iloc[0].tolist() == [30, 10]
+    with pytest.raises(ValueError):
+        copy.values(panel.PRICES)[0, 0] = 1
+
+    with pytest.raises(KeyError):
+        market.select(("GMKN", "LKOH"))
+
+
+def test_log_returns():
+    returns = make_panel().log_returns()
+    assert returns.index.equals(DATES[1:])
+    assert returns.loc["2018-10-16", "AKRN"] == pytest.approx(np.log(1.1))
+    assert returns.loc["2018-10-17", "GMKN"] == pytest.approx(np.log(24 / 22))
+    assert returns.loc["2018-10-18", "GMKN"] == pytest.approx(np.log(20 / 22))
+
+
+@pytest.fixture(name="fake_service")
+def make_fake_service(tmp_path, monkeypatch):
+    # Сессия MOEX ISS одна на процесс, поэтому общий сервис закрывается
+    service.close_service()
+    monkeypatch.setattr(config, "DATA_PATH", tmp_path)
+    data_service = service.DataService(offline=True)
+    monkeypatch.setattr(service, "_SERVICE", data_service)
+    calls = []
+
+    def fake_load(name, tickers=None):
+        calls.append((name, tickers))
+        if name == "calendar":
+            return None
+        if name == "quotes":
+            close = [[1, 0], [np.nan, 5], [2, np.nan], [0, 6]]
+            turnover = [[1, np.nan], [2, 3], [np.nan, 4], [5, 6]]
+            return [
+                pd.DataFrame(
+                    {
+                        CLOSE: [row[i] for row in close],
+                        TURNOVER: [row[i] for row in turnover],
+                    },
+                    index=DATES,
+                )
+                for i in range(len(tickers))
+            ]
+        index = pd.DatetimeIndex(["2018-10-17", "2018-10-20"], name=DATE)
+        return [
+            pd.Series([1.0, 2.0], index=index, name=ticker).iloc[i : i + 1]
+            for i, ticker in enumerate(tickers)
+        ]
+
+    monkeypatch.setattr(data_service, "load", fake_load)
+    # noinspection PyProtectedMember
+    panel._PANEL_CACHE.clear()
+    yield calls
+    data_service.close()
+
+
+def test_market_panel(fake_service):
+    tickers = ("AKRN", "GMKN")
+    market = panel.market_panel(tickers)
+    prices = market.prices
+    assert prices["AKRN"].tolist() == [1, 1, 2, 2]
+    assert np.isnan(prices.iloc[0, 1])
+    assert prices["GMKN"].iloc[1:].tolist() == [5, 5, 6]
+    assert market.turnovers.to_numpy().tolist() == [[1, 0], [2, 3], [0, 4], [5, 6]]
+    div = market.dividends
+    assert div.sum().tolist() == [AFTER_TAX, 2 * AFTER_TAX]
+    assert div.loc["2018-10-16", "AKRN"] == AFTER_TAX
+    assert div.loc["2018-10-18", "GMKN"] == 2 * AFTER_TAX
+    assert market.values(panel.PRICES).flags.c_contiguous
+
+    info = panel.panel_cache_info()
+    sliced = panel.market_panel(tickers, pd.Timestamp("2018-10-16"))
+    assert sliced.last_date == pd.Timestamp("2018-10-16")
+    assert np.shares_memory(sliced.values(panel.PRICES), market.values(panel.PRICES))
+    assert panel.panel_cache_info()["hits"] == info["hits"] + 1
+    assert len(fake_service) == 3
+
+
+def test_t2_ex_dates():
+    index = pd.bdate_range("2018-10-01", "2018-10-17").drop(pd.Timestamp("2018-10-11"))
+    dates = pd.DatetimeIndex(
+        [
+            "2018-10-01",
+            "2018-10-02",
+            "2018-10-11",
+            "2018-10-13",
+            "2018-10-17",
+            "2018-10-18",
+            "2018-10-20",
+            "2018-10-22",
+        ],
+        name=DATE,
+    )
+    ex_dates = panel.t2_ex_dates(dates, index)
+    expected = pd.DatetimeIndex(
+        [
+            pd.NaT,
+            "2018-10-01",
+            "2018-10-09",
+            "2018-10-10",
+            "2018-10-16",
+            "2018-10-17",
+            "2018-10-18",
+            "2018-10-19",
+        ],
+        name=DATE,
+    )
+    assert ex_dates.equals(expected)
+    for date, ex_date in zip(dates[1:], expected[1:]):
+        assert panel.t2_shift(date, index) == ex_date
+
+
+def test_t2_ex_dates_with_calendar():
+    index = pd.bdate_range("2019-05-01", "2019-06-07")
+    # 12 июня торги не проводятся, что выводится из истории для прогноза
+    history = pd.bdate_range("2016-01-01", "2019-06-07")
+    calendar = TradingCalendar(history[~((history.month == 6) & (history.day == 12))])
+    dates = pd.DatetimeIndex(["2019-06-05", "2019-06-13", "2019-06-15"], name=DATE)
+    expected = pd.DatetimeIndex(["2019-06-04", "2019-06-11", "2019-06-13"], name=DATE)
+    assert panel.t2_ex_dates(dates, index, calendar).equals(expected)
+    assert panel.t2_shift(pd.Timestamp("2019-06-13"), index, calendar) == expected[1]
+    bday_ex_date = pd.Timestamp("2019-06-12")
+    assert panel.t2_shift(pd.Timestamp("2019-06-13"), index) == bday_ex_date
+
+
+def test_log_total_returns_cached(fake_service):
+    tickers = ("AKRN", "GMKN")
+    date = pd.Timestamp("2018-10-17")
+    returns = div.log_total_returns(tickers, date)
+    assert returns.index[-1] == date
+    info = panel.panel_cache_info()
+    other = div.log_total_returns(tickers, pd.Timestamp("2018-10-18"))
+    assert np.shares_memory(returns.to_numpy(), other.to_numpy())
+    assert panel.panel_cache_info()["hits"] == info["hits"] + 1
+    assert len(fake_service) == 3
+
+    # noinspection PyProtectedMember
+    service.get_service().client._store.put("test", 42)
+    div.log_total_returns(tickers, date)
+    assert len(fake_service) == 6
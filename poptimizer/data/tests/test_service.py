@@ -0,0 +1,71 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from poptimizer import config, store
+from poptimizer.config import POptimizerError
+from poptimizer.data import service
+from poptimizer.store import manager, utils
+
+
+@pytest.fixture(name="data_service")
+def make_data_service(tmp_path, monkeypatch):
+    # Сессия MOEX ISS одна на процесс, поэтому общий сервис закрывается
+    service.close_service()
+    monkeypatch.setattr(config, "DATA_PATH", tmp_path)
+    with service.DataService(offline=True) as data_service:
+        yield data_service
+
+
+def test_one_loop_and_store(data_service):
+    loop = data_service.run(_running_loop())
+    client = data_service.client
+    assert data_service.run(_running_loop()) is loop
+    assert data_service.client is client
+    assert data_service.data_age is None
+
+
+async def _running_loop():
+    return asyncio.get_event_loop()
+
+
+def test_offline_without_local_data(data_service):
+    with pytest.raises(POptimizerError) as error:
+        data_service.load("securities")
+    assert "Нет локальных данных" in str(error.value)
+
+
+def test_reset_after_end_of_trading_day(data_service, monkeypatch):
+    data_service.run(asyncio.sleep(0))
+    manager.AbstractManager.SESSION_MEMO["test"] = 42
+    data_service.run(asyncio.sleep(0))
+    assert manager.AbstractManager.SESSION_MEMO == {"test": 42}
+
+    next_day = utils.end_of_trading_day() + pd.DateOffset(days=1)
+    monkeypatch.setattr(utils, "end_of_trading_day", lambda: next_day)
+    data_service.run(asyncio.sleep(0))
+    assert manager.AbstractManager.SESSION_MEMO == {}
+    assert manager.AbstractManager.OFFLINE
+
+
+def test_second_client_refused(data_service):
+    data_service.run(asyncio.sleep(0))
+    with pytest.raises(POptimizerError) as error:
+        store.Client()
+    assert "close_service" in str(error.value)
+
+
+def test_close_and_reopen(data_service):
+    data_service.run(asyncio.sleep(0))
+    data_service.close()
+    data_service.close()
+    assert data_service.run(asyncio.sleep(0, 42)) == 42
+
+
+def test_shared_service():
+    data_service = service.get_service()
+    assert service.get_service() is data_service
+    service.close_service()
+    assert service.get_service() is not data_service
+    service.close_service()
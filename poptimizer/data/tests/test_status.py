@@ -76,3 +76,15 @@ def test_dividends_status_no_web_data():
     result = status.dividends_status("VRSB")
 
     assert isinstance(result[0], Exception)
+
+
+def test_dividends_status_portfolio(capsys):
+    result = status.dividends_status(("ENRU", "VRSB"))
+    captured = capsys.readouterr()
+
+    assert isinstance(result, list)
+    assert len(result) == 2
+    assert len(result[0]) == 3
+    assert isinstance(result[1][0], Exception)
+    assert "ТИКЕР ENRU" in captured.out
+    assert "ТИКЕР VRSB" in captured.out
@@ -5,7 +5,7 @@ import catboost
 import numpy as np
 import pandas as pd
 
-from poptimizer import data, store, config
+from poptimizer import data, config
 from poptimizer.ml import examples, ledoit_wolf, cv
 from poptimizer.ml.feature import YEAR_IN_TRADING_DAYS
 from poptimizer.portfolio import Forecast
@@ -49,15 +49,20 @@ def ledoit_wolf_cov(tickers, date, predict_pool_params, valid_result):
     return cov, average_cor, shrinkage
 
 
-def validate_cache(forecast_cache, tickers, date, params):
-    """Проверяет, что кэш создан для тех же параметров."""
+def validate_cache(forecast_cache, tickers, date, params, data_age=None):
+    """Проверяет, что кэш создан для тех же параметров.
+
+    Прогноз, составленный на основе устаревших данных, не используется, если возраст текущих данных
+    data_age нулевой.
+    """
     if (
         forecast_cache is not None
         and tickers == forecast_cache.tickers
         and date == forecast_cache.date
         and params == forecast_cache.params
     ):
-        return True
+        fresh = pd.Timedelta(0)
+        return data_age != fresh or forecast_cache.data_age == fresh
     return False
 
 
@@ -100,6 +105,7 @@ def make_forecast(tickers, date, params):
         average_cor=average_cor,
         shrinkage=shrinkage,
         params=params,
+        data_age=data.data_age(),
     )
     return forecast
 
@@ -117,10 +123,11 @@ def get_forecast(tickers: Tuple[str, ...], date: pd.Timestamp, params=None) -> F
         Прогнозная доходность, ковариация и дополнительная информация.
     """
     params = params or config.ML_PARAMS
-    with store.open_store() as db:
-        forecast_cache = db[FORECAST_KEY]
-        if validate_cache(forecast_cache, tickers, date, params):
-            return forecast_cache
-        forecast = make_forecast(tickers, date, params)
-        db[FORECAST_KEY] = forecast
-        return forecast
+    # Хранилище открыто сервисом данных и не может быть повторно открыто в том же процессе
+    db = data.get_service().store
+    forecast_cache = db[FORECAST_KEY]
+    if validate_cache(forecast_cache, tickers, date, params, data.data_age()):
+        return forecast_cache
+    forecast = make_forecast(tickers, date, params)
+    db[FORECAST_KEY] = forecast
+    return forecast
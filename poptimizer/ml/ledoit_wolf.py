@@ -26,7 +26,7 @@ def shrinkage(returns: np.array) -> Tuple[np.array, float, float]:
     """
     t, n = returns.shape
     mean_returns = np.mean(returns, axis=0, keepdims=True)
-    returns -= mean_returns
+    returns = returns - mean_returns
     sample_cov = returns.transpose() @ returns / t
 
     # sample average correlation
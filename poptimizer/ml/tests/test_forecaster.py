@@ -1,11 +1,15 @@
+import asyncio
 import copy
+import dataclasses
 
 import catboost
 import numpy as np
 import pandas as pd
 import pytest
 
+from poptimizer import config
 from poptimizer.config import POptimizerError
+from poptimizer.data import service
 from poptimizer.ml import forecaster, examples, cv
 from poptimizer.portfolio.metrics import Forecast
 
@@ -109,6 +113,20 @@ def test_non_validate_cache():
     )
 
 
+def test_validate_cache_data_age():
+    tickers = ("RTKM", "UPRO", "DSKY")
+    date = pd.Timestamp("2019-03-16")
+    fresh = pd.Timedelta(0)
+    stale = pd.Timedelta(days=1)
+    assert forecaster.validate_cache(FORECAST, tickers, date, PARAMS, stale)
+    assert not forecaster.validate_cache(FORECAST, tickers, date, PARAMS, fresh)
+    stale_forecast = dataclasses.replace(FORECAST, data_age=stale)
+    assert forecaster.validate_cache(stale_forecast, tickers, date, PARAMS, stale)
+    assert not forecaster.validate_cache(stale_forecast, tickers, date, PARAMS, fresh)
+    fresh_forecast = dataclasses.replace(FORECAST, data_age=fresh)
+    assert forecaster.validate_cache(fresh_forecast, tickers, date, PARAMS, fresh)
+
+
 def test_ledoit_wolf_cov(valid_result, train_predict_params):
     _, predict_params = train_predict_params
     cov, average_cor, shrinkage = forecaster.ledoit_wolf_cov(
@@ -143,3 +161,31 @@ def test_get_forecast():
     assert forecast.r2 == pytest.approx(0.0006692668991337136)
     assert forecast.average_cor == pytest.approx(0.10588718234140086)
     assert forecast.shrinkage == pytest.approx(1)
+
+
+@pytest.fixture(name="data_service")
+def make_data_service(tmp_path, monkeypatch):
+    # Сессия MOEX ISS одна на процесс, поэтому общий сервис закрывается
+    service.close_service()
+    monkeypatch.setattr(config, "DATA_PATH", tmp_path)
+    data_service = service.DataService(offline=True)
+    monkeypatch.setattr(service, "_SERVICE", data_service)
+    yield data_service
+    data_service.close()
+
+
+def test_get_forecast_after_service(data_service, monkeypatch):
+    data_service.run(asyncio.sleep(0))
+    calls = []
+
+    def fake_make_forecast(tickers, date, params):
+        calls.append((tickers, date))
+        return FORECAST
+
+    monkeypatch.setattr(forecaster, "make_forecast", fake_make_forecast)
+    forecast = forecaster.get_forecast(FORECAST.tickers, FORECAST.date, PARAMS)
+    assert forecast is FORECAST
+    assert data_service.store[forecaster.FORECAST_KEY].tickers == FORECAST.tickers
+    forecast = forecaster.get_forecast(FORECAST.tickers, FORECAST.date, PARAMS)
+    assert forecast.date == FORECAST.date
+    assert len(calls) == 1
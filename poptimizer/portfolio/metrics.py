@@ -1,5 +1,6 @@
 """Абстрактный класс с метриками портфеля"""
 from dataclasses import dataclass
+from typing import Optional
 
 import numpy as np
 import pandas as pd
@@ -25,6 +26,8 @@ class Forecast:
     average_cor: float
     shrinkage: float
     params: dict
+    # Возраст данных, на основе которых составлен прогноз - нулевой интервал для актуальных данных
+    data_age: Optional[pd.Timedelta] = None
 
     def __str__(self):
         return (
@@ -75,6 +75,14 @@ class Portfolio:
         """Отчетная дата портфеля."""
         return self._date
 
+    @property
+    def data_age(self) -> Optional[pd.Timedelta]:
+        """Возраст локальных данных, на основе которых рассчитываются характеристики портфеля.
+
+        Нулевой интервал для актуальных данных.
+        """
+        return data.data_age()
+
     @property
     def index(self):
         """Общий индекс всех характеристик портфеля - перечень позиций, включая CASH и PORTFOLIO."""
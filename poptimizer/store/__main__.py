@@ -0,0 +1,47 @@
+"""Обслуживание локального хранилища данных из командной строки.
+
+python -m poptimizer.store compact
+python -m poptimizer.store export snapshot.tar.gz
+python -m poptimizer.store import snapshot.tar.gz [--overwrite]
+python -m poptimizer.store prefetch [--once] [TICKER ...]
+"""
+import argparse
+import asyncio
+
+from poptimizer.store import maintenance, prefetch
+
+
+def main(args=None):
+    """Разбирает аргументы командной строки и выполняет команду."""
+    parser = argparse.ArgumentParser(
+        prog="python -m poptimizer.store", description="Обслуживание хранилища данных"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("compact", help="сжать базу, удалив свободные страницы")
+    export = commands.add_parser("export", help="сохранить снимок хранилища в архив")
+    export.add_argument("bundle", help="путь к архиву")
+    restore = commands.add_parser("import", help="развернуть хранилище из снимка")
+    restore.add_argument("bundle", help="путь к архиву")
+    restore.add_argument(
+        "--overwrite", action="store_true", help="заменить существующие файлы"
+    )
+    refresh = commands.add_parser(
+        "prefetch", help="обновлять данные ежедневно после окончания торгов"
+    )
+    refresh.add_argument(
+        "tickers", nargs="*", help="тикеры - по умолчанию все акции с регистрационным номером"
+    )
+    refresh.add_argument("--once", action="store_true", help="обновить данные однократно")
+    args = parser.parse_args(args)
+    if args.command == "compact":
+        maintenance.compact()
+    elif args.command == "export":
+        maintenance.export_snapshot(args.bundle)
+    elif args.command == "import":
+        maintenance.import_snapshot(args.bundle, overwrite=args.overwrite)
+    else:
+        asyncio.run(prefetch.run(tuple(args.tickers), args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Пул страниц браузера для загрузки данных с сайтов, требующих выполнения JavaScript.
+
+Запуск Chromium занимает секунды и сотни мегабайт памяти, поэтому браузер запускается один раз при
+первом обращении и используется всеми загрузками в рамках клиентской сессии. Страницы браузера
+переиспользуются, а количество одновременно загружаемых страниц ограничено - остальные загрузки
+ожидают освобождения страницы.
+"""
+import asyncio
+import contextlib
+import logging
+
+import pyppeteer
+
+
+class BrowserPool:
+    """Пул страниц одного браузера с ограничением на количество одновременно используемых страниц.
+
+    Объекты asyncio создаются при первом обращении к пулу, чтобы они были привязаны к работающему
+    циклу событий.
+    """
+
+    def __init__(self, size: int):
+        """Браузер не запускается до первого обращения к странице.
+
+        :param size:
+            Максимальное количество одновременно используемых страниц.
+        """
+        self._size = size
+        self._browser = None
+        self._free_pages = []
+        self._semaphore = None
+        self._lock = None
+        self._launches = 0
+
+    @property
+    def launches(self) -> int:
+        """Количество запусков браузера."""
+        return self._launches
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        """Предоставляет свободную страницу браузера, при необходимости ожидая ее освобождения.
+
+        Страница, при работе с которой возникла ошибка, закрывается, так как может находиться в
+        некорректном состоянии, а вместо нее при необходимости создается новая.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._size)
+            self._lock = asyncio.Lock()
+        async with self._semaphore:
+            if self._free_pages:
+                page = self._free_pages.pop()
+            else:
+                browser = await self._get_browser()
+                page = await browser.newPage()
+            try:
+                yield page
+            except BaseException:
+                await self._close_page(page)
+                raise
+            else:
+                self._free_pages.append(page)
+
+    async def _get_browser(self):
+        """Запускает браузер при первом обращении."""
+        async with self._lock:
+            if self._browser is None:
+                self._browser = await pyppeteer.launch()
+                self._launches += 1
+        return self._browser
+
+    @staticmethod
+    async def _close_page(page):
+        """Закрывает неисправную страницу - ошибки закрытия не препятствуют продолжению работы."""
+        try:
+            await page.close()
+        except Exception as error:
+            logging.warning(f"Страница браузера не закрыта - {error!r}")
+
+    async def close(self):
+        """Закрывает браузер, если он был запущен."""
+        self._free_pages.clear()
+        if self._browser is not None:
+            browser = self._browser
+            self._browser = None
+            await browser.close()
@@ -0,0 +1,101 @@
+"""Кэш десериализованных значений хранилища."""
+import collections
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Ограниченный по объему кэш с вытеснением давно не использовавшихся значений.
+
+    Объем значений задается при их добавлении - для данных хранилища это объем в памяти после
+    десериализации. Кэш привязан к номеру транзакции LMDB, на момент которой значения актуальны, что
+    позволяет обнаруживать изменения, сделанные другими процессами.
+    """
+
+    def __init__(self, max_size: int):
+        """Кэш создается пустым.
+
+        :param max_size:
+            Максимальный суммарный объем значений в байтах. 0 - кэширование отключено.
+        """
+        self._max_size = max_size
+        self._values = collections.OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._txn_id = None
+
+    @property
+    def max_size(self) -> int:
+        """Максимальный суммарный объем значений в байтах."""
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size: int):
+        self._max_size = max_size
+        self._shrink()
+
+    def validate(self, txn_id: int):
+        """Очищает кэш, если данные изменились после транзакции, на момент которой он актуален."""
+        if txn_id != self._txn_id:
+            self.clear()
+            self._txn_id = txn_id
+
+    def written(self, txn_id: int, keys):
+        """Учитывает собственную запись ключей в транзакции с указанным номером.
+
+        Если перед этой транзакцией кэш был актуален, то удаляются только перезаписанные значения, иначе
+        кэш очищается полностью.
+        """
+        if self._txn_id is not None and txn_id == self._txn_id + 1:
+            for key in keys:
+                self.invalidate(key)
+            self._txn_id = txn_id
+        else:
+            self.clear()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Значение из кэша или None при его отсутствии."""
+        item = self._values.get(key)
+        if item is None:
+            self._misses += 1
+            return None
+        self._values.move_to_end(key)
+        self._hits += 1
+        return item[0]
+
+    def put(self, key: Hashable, value: Any, size: int):
+        """Добавляет значение в кэш, вытесняя при необходимости давно не использовавшиеся."""
+        if size > self._max_size:
+            return
+        self.invalidate(key)
+        self._values[key] = (value, size)
+        self._size += size
+        self._shrink()
+
+    def invalidate(self, key: Hashable):
+        """Удаляет значение из кэша."""
+        item = self._values.pop(key, None)
+        if item is not None:
+            self._size -= item[1]
+
+    def clear(self):
+        """Удаляет все значения из кэша."""
+        self._values.clear()
+        self._size = 0
+        self._txn_id = None
+
+    def info(self) -> dict:
+        """Статистика использования кэша."""
+        return dict(
+            hits=self._hits,
+            misses=self._misses,
+            entries=len(self._values),
+            size=self._size,
+            max_size=self._max_size,
+        )
+
+    def _shrink(self):
+        """Вытесняет давно не использовавшиеся значения до соблюдения ограничения на объем."""
+        while self._size > self._max_size:
+            _, (_, size) = self._values.popitem(last=False)
+            self._size -= size
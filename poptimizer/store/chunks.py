@@ -0,0 +1,184 @@
+"""Хранение длинных историй данных неизменяемыми блоками по годам и изменяемым хвостом.
+
+История с индексом из дат разбивается на блоки за каждый завершенный год, которые сохраняются под
+ключами вида name/year, и хвост за последний год. Под основным ключом name сохраняется Datum с
+перечнем ключей блоков и хвостом. При ежедневном обновлении меняется только хвост, поэтому
+загружается, разбивается и перезаписывается лишь он, а блоки за более ранние годы остаются без
+изменений. Блоки с изменившимся содержимым перезаписываются, а лишние блоки удаляются.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from poptimizer.config import POptimizerError
+from poptimizer.store import codec
+from poptimizer.store.utils import Datum
+
+# Разделитель названия данных и года блока в ключе
+CHUNK_SEP = "/"
+
+
+@dataclass(frozen=True)
+class Chunks:
+    """Ключи неизменяемых блоков данных в хронологическом порядке и изменяемый хвост."""
+
+    keys: Tuple[str, ...]
+    tail: Any
+
+
+def split(
+    name: str,
+    datum: Datum,
+    store,
+    category: Optional[str],
+    kept: Tuple[str, ...] = (),
+) -> Tuple[Dict[str, Datum], List[str]]:
+    """Разбивает данные на блоки по годам и хвост за последний год.
+
+    Блоки, которые уже сохранены в хранилище с тем же содержимым, не возвращаются, чтобы не
+    перезаписывать неизменившуюся часть истории. Блоки, которые были сохранены ранее, но отсутствуют
+    в новой версии данных, например, после сокращения истории, подлежат удалению.
+
+    При обновлении данные могут содержать только историю, начиная с первого затронутого обновлением
+    года, а ключи сохраненных блоков за более ранние годы передаются в kept - такие блоки не
+    разбиваются и не сравниваются с сохраненными.
+
+    :param name:
+        Наименование данных.
+    :param datum:
+        Данные с индексом из дат.
+    :param store:
+        Хранилище данных lmbd.DataStore.
+    :param category:
+        Категория данных.
+    :param kept:
+        Ключи неизменных блоков за годы до начала данных.
+    :return:
+        Словарь с ключами и значениями, которые необходимо сохранить, и ключи блоков, которые
+        необходимо удалить.
+    """
+    df = datum.value
+    chunks = {}
+    tail = df
+    if len(df):
+        years = df.index.year
+        is_tail = years == years.max()
+        tail = df[is_tail]
+        for year, chunk in df[~is_tail].groupby(years[~is_tail]):
+            chunks[f"{name}{CHUNK_SEP}{year}"] = Datum(chunk, datum.timestamp)
+    metas = store.get_meta_many(chunks, category)
+    changed = {
+        key: chunk for key, chunk in chunks.items() if not _is_saved(metas[key], chunk.value)
+    }
+    keys = tuple(kept) + tuple(chunks)
+    changed[name] = Datum(Chunks(keys, tail), datum.timestamp)
+    old = store.get(name, category)
+    stale = []
+    if is_chunked(old):
+        stale = [key for key in old.value.keys if key not in keys]
+    return changed, stale
+
+
+def _is_saved(meta, df: pd.DataFrame) -> bool:
+    """Проверяет, что блок уже сохранен с тем же содержимым."""
+    return (
+        meta is not None
+        and meta.rows == len(df)
+        and meta.last_index == df.index[-1]
+        and meta.content_hash is not None
+        and meta.content_hash == codec.content_hash(df)
+    )
+
+
+def stitch(
+    name: str, datum: Optional[Datum], store, category: Optional[str]
+) -> Optional[Datum]:
+    """Собирает данные из блоков и хвоста, если они хранятся блоками.
+
+    Основной ключ и блоки читаются заново в рамках одной транзакции, чтобы не собрать данные из
+    блоков разных версий.
+
+    :param name:
+        Наименование данных.
+    :param datum:
+        Значение основного ключа.
+    :param store:
+        Хранилище данных lmbd.DataStore.
+    :param category:
+        Категория данных.
+    :return:
+        Данные целиком.
+    """
+    if not is_chunked(datum):
+        return datum
+    with store.view(category, copy=True) as get:
+        return join(name, get(name), get, category)
+
+
+def recent(
+    name: str, store, category: Optional[str], start: Optional[pd.Timestamp] = None
+) -> Tuple[Tuple[str, ...], Optional[Datum]]:
+    """Загружает данные, начиная с года даты start, без блоков за более ранние годы.
+
+    Основной ключ и блоки читаются в рамках одной транзакции. Данные, которые не хранятся блоками,
+    загружаются целиком.
+
+    :param name:
+        Наименование данных.
+    :param store:
+        Хранилище данных lmbd.DataStore.
+    :param category:
+        Категория данных.
+    :param start:
+        Дата, начиная с года которой загружаются данные. По умолчанию - только хвост.
+    :return:
+        Ключи незагруженных блоков за более ранние годы и загруженные данные.
+    """
+    with store.view(category, copy=True) as get:
+        datum = get(name)
+        if not is_chunked(datum):
+            return (), datum
+        keys = datum.value.keys
+        year = start.year if start is not None else None
+        kept = tuple(key for key in keys if year is None or _year(key) < year)
+        head = Chunks(keys[len(kept) :], datum.value.tail)
+        return kept, join(name, Datum(head, datum.timestamp), get, category)
+
+
+def _year(key: str) -> int:
+    """Год блока по его ключу."""
+    return int(key.rsplit(CHUNK_SEP, 1)[1])
+
+
+def is_chunked(value: Any) -> bool:
+    """Является ли значение основным ключом данных, хранящихся блоками."""
+    return isinstance(getattr(value, "value", None), Chunks)
+
+
+def join(
+    name: str, datum: Optional[Datum], get: Callable[[str], Any], category: Optional[str]
+) -> Optional[Datum]:
+    """Собирает данные из хвоста основного ключа и блоков, загружаемых функцией get.
+
+    :param name:
+        Наименование данных.
+    :param datum:
+        Значение основного ключа.
+    :param get:
+        Функция, которая по ключу выдает значение блока из той же транзакции, что и основной ключ.
+    :param category:
+        Категория данных.
+    :return:
+        Данные целиком.
+    """
+    if not is_chunked(datum):
+        return datum
+    blocks = {key: get(key) for key in datum.value.keys}
+    missing = [key for key, block in blocks.items() if block is None]
+    if missing:
+        raise POptimizerError(
+            f"Отсутствуют блоки данных {category} -> {name}: {', '.join(missing)}"
+        )
+    dfs = [block.value for block in blocks.values()] + [datum.value.tail]
+    return Datum(pd.concat(dfs), datum.timestamp)
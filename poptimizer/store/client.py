@@ -1,10 +1,19 @@
 """Асинхронный клиент для доступа к данным."""
 import contextlib
+import os
+import time
+from typing import FrozenSet, Optional, Tuple
 
+import aiohttp
 import aiomoex
+import pandas as pd
 
 from poptimizer import config
+from poptimizer.config import POptimizerError
 from poptimizer.store import (
+    utils,
+    browser,
+    codec,
     manager,
     lmbd,
     moex,
@@ -13,16 +22,57 @@ from poptimizer.store import (
     smart_lab,
     dohod,
     conomy,
+    limits,
+    trading_calendar,
 )
 
-# Максимальный размер хранилища данных и количество вложенных баз
+# Начальный размер хранилища данных, который автоматически увеличивается при заполнении, и количество
+# вложенных баз с запасом для новых категорий и служебной базы метаданных
 MAX_SIZE = 20 * 2 ** 20
-MAX_DBS = 3
+MAX_DBS = 8
+
+# Сжатие значений по категориям - котировки не сжимаются, так как это в разы замедляет их чтение
+COMPRESSION = {None: codec.ZLIB}
+
+# Объем кэша десериализованных значений в процессе
+CACHE_SIZE = 256 * 2 ** 20
+
+# Ограничение на количество одновременных соединений с одним сайтом и время кэширования DNS в секундах
+HTTP_LIMIT_PER_HOST = 8
+DNS_CACHE_TTL = 10 * 60
+
+# Количество одновременно используемых страниц браузера
+BROWSER_PAGES = 2
+
+# Ограничения на количество одновременных загрузок, их частоту и количество попыток для источников
+# данных - загрузка со страниц сайтов существенно тяжелее запросов к API MOEX ISS
+LIMITS = {
+    moex.SOURCE_ISS: limits.Limit(concurrency=16, rate=20, burst=16),
+    dohod.SOURCE_DOHOD: limits.Limit(concurrency=4, rate=5, burst=4),
+    smart_lab.SOURCE_SMART_LAB: limits.Limit(concurrency=1),
+    conomy.SOURCE_CONOMY: limits.Limit(concurrency=BROWSER_PAGES),
+}
+# Ограничения для остальных источников
+DEFAULT_LIMIT = limits.Limit(concurrency=4)
 
 
 def open_store():
     """Открывает key-value хранилище."""
-    return lmbd.DataStore(config.DATA_PATH, MAX_SIZE, MAX_DBS)
+    return lmbd.DataStore(
+        config.DATA_PATH, MAX_SIZE, MAX_DBS, COMPRESSION, CACHE_SIZE
+    )
+
+
+def open_http_session():
+    """Открывает сессию для загрузки данных с сайтов.
+
+    Соединения переиспользуются для последовательных запросов к одному сайту, поэтому не требуется
+    заново устанавливать TCP и TLS соединение для каждого запроса.
+    """
+    connector = aiohttp.TCPConnector(
+        limit_per_host=HTTP_LIMIT_PER_HOST, ttl_dns_cache=DNS_CACHE_TTL
+    )
+    return aiohttp.ClientSession(connector=connector)
 
 
 class Client(contextlib.AbstractAsyncContextManager):
@@ -33,27 +83,116 @@ class Client(contextlib.AbstractAsyncContextManager):
 
     Атрибутами клиента являются менеджеры отдельных категорий данных. Так же можно обращаться к
     менеджерам напрямую внутри контекста, созданного клиентом.
+
+    В режиме работы без обновления предоставляются только локальные данные. При недоступности
+    отдельного источника данных без обновления предоставляются только его данные, пока он не будет
+    запрошен повторно по истечении manager.OFFLINE_COOLDOWN.
+
+    Сессия MOEX ISS в aiomoex одна на процесс, поэтому одновременно может существовать только один
+    клиент. Общий сервис poptimizer.data.service держит свой клиент открытым между обращениями - перед
+    созданием другого клиента его необходимо закрыть с помощью close_service.
     """
 
-    def __init__(self):
-        self._session = aiomoex.ISSClientSession()
+    def __init__(self, offline: Optional[bool] = None):
+        """Клиент не обращается к интернету до входа в контекст.
+
+        :param offline:
+            Предоставлять локальные данные без обновления. По умолчанию - config.OFFLINE.
+        """
+        if offline is None:
+            offline = config.OFFLINE
+        self._offline = offline
+        try:
+            self._session = aiomoex.ISSClientSession()
+        except aiomoex.client.ISSMoexError as error:
+            raise POptimizerError(
+                "Сессия MOEX ISS уже открыта другим клиентом - например, общим сервисом данных, "
+                "который закрывается poptimizer.data.service.close_service"
+            ) from error
+        self._http_session = None
+        self._browser = browser.BrowserPool(BROWSER_PAGES)
         self._store = open_store()
 
     async def __aenter__(self):
+        # Сессия aiohttp должна создаваться внутри цикла событий
+        self._http_session = open_http_session()
         manager.AbstractManager.ISS_SESSION = self._session
+        manager.AbstractManager.HTTP_SESSION = self._http_session
+        manager.AbstractManager.BROWSER = self._browser
+        manager.AbstractManager.LIMITERS = limits.Limiters(LIMITS, DEFAULT_LIMIT)
         manager.AbstractManager.STORE = self._store
+        self.reset()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self._session.__aexit__(exc_type, exc_val, exc_tb)
+        await self._http_session.close()
+        await self._browser.close()
         self._store.__exit__(exc_type, exc_val, exc_tb)
 
+    def reset(self):
+        """Сбрасывает общие для менеджеров результаты загрузок и перечень недоступных источников.
+
+        Используется долгоживущими клиентами, чтобы после окончания торгового дня перечень торгуемых
+        бумаг загружался заново, а недоступные ранее источники данных запрашивались повторно.
+        """
+        manager.AbstractManager.SESSION_MEMO = {}
+        manager.AbstractManager.OFFLINE = self._offline
+        manager.AbstractManager.OFFLINE_SOURCES = {}
+
+    @property
+    def offline(self) -> bool:
+        """Задан ли при создании клиента режим работы без обновления данных."""
+        return self._offline
+
+    @property
+    def offline_sources(self) -> FrozenSet[Optional[str]]:
+        """Источники данных, которые отмечены недоступными в рамках клиентской сессии."""
+        sources = manager.AbstractManager.OFFLINE_SOURCES or {}
+        now = time.monotonic()
+        return frozenset(source for source, until in sources.items() if until > now)
+
+    @property
+    def store(self) -> lmbd.DataStore:
+        """Открытое хранилище клиента.
+
+        Хранилище нельзя повторно открыть в том же процессе, поэтому значения, которые сохраняются
+        рядом с данными клиента, записываются через него.
+        """
+        return self._store
+
+    @property
+    def data_age(self) -> Optional[pd.Timedelta]:
+        """Возраст локальных данных - нулевой интервал для актуальных данных.
+
+        None, если актуальность данных ни разу не проверялась.
+        """
+        return utils.data_age(self._store)
+
+    @property
+    def data_version(self) -> Tuple:
+        """Версия локальных данных для кэширования производных от них значений.
+
+        Изменяется при записи в хранилище, после окончания торгового дня, когда данные требуют
+        обновления, и при изменении базы дивидендов.
+        """
+        try:
+            dividends_mtime = os.stat(dividends.SQLITE).st_mtime_ns
+        except FileNotFoundError:
+            dividends_mtime = None
+        end_of_trading = utils.end_of_trading_day(
+            calendar=trading_calendar.load(self._store)
+        )
+        return self._store.version, end_of_trading, dividends_mtime
+
     securities = moex.Securities
 
     quotes = moex.Quotes
 
     index = moex.Index
 
+    calendar = moex.Calendar
+
     dividends = dividends.Dividends
 
     smart_lab = smart_lab.SmartLab
@@ -0,0 +1,301 @@
+"""Сериализация значений для хранилища.
+
+pd.Series и pd.DataFrame с числовыми данными, в том числе обернутые в Datum, сохраняются в колоночном
+формате: флаг формата, длина заголовка, небольшой JSON-заголовок с описанием структуры и следующие за
+ним непрерывные буферы для индекса и каждого столбца. Такой формат позволяет восстанавливать данные
+без разбора и копирования каждого значения, а при необходимости напрямую ссылаться на память LMDB.
+
+Остальные объекты сохраняются с помощью pickle. Данные pickle всегда начинаются с байта 0x80, поэтому
+значения, сохраненные до появления колоночного формата, читаются без преобразования.
+
+Сериализованные значения могут дополнительно сжиматься - в этом случае они начинаются с байта-флага
+алгоритма сжатия.
+"""
+import functools
+import hashlib
+import json
+import lzma
+import pickle
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from poptimizer.store.utils import Datum, Meta
+
+# Флаг колоночного формата - не может совпасть с первым байтом pickle
+FLAG_COLUMNAR = b"C"
+# Длина JSON-заголовка
+HEADER_LENGTH = struct.Struct("<I")
+# Выравнивание начала буферов с данными
+ALIGNMENT = 8
+
+# Допустимые типы данных индекса и столбцов
+INDEX_KINDS = "Mi"
+COLUMN_KINDS = "fiu"
+
+SERIES = "series"
+FRAME = "frame"
+
+# Значения меньшего размера не сжимаются
+MIN_COMPRESS_SIZE = 4 * 2 ** 10
+
+
+@dataclass(frozen=True)
+class Compressor:
+    """Алгоритм сжатия сериализованных значений."""
+
+    # Флаг в начале сжатого значения - не должен совпадать с флагами форматов и других алгоритмов
+    flag: bytes
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+ZLIB = Compressor(b"Z", functools.partial(zlib.compress, level=1), zlib.decompress)
+LZMA = Compressor(b"X", functools.partial(lzma.compress, preset=1), lzma.decompress)
+
+COMPRESSORS = {}
+
+
+def register(compressor: Compressor):
+    """Регистрирует алгоритм сжатия для распаковки значений по флагу."""
+    if compressor.flag in (FLAG_COLUMNAR, pickle.PROTO):
+        raise ValueError(f"Флаг {compressor.flag!r} совпадает с флагом формата")
+    registered = COMPRESSORS.get(compressor.flag)
+    if registered is not None and registered != compressor:
+        raise ValueError(f"Флаг {compressor.flag!r} уже используется")
+    COMPRESSORS[compressor.flag] = compressor
+
+
+register(ZLIB)
+register(LZMA)
+
+
+def compress(
+    raw: bytes, compressor: Optional[Compressor], min_size: int = MIN_COMPRESS_SIZE
+) -> bytes:
+    """Сжимает сериализованное значение, если оно достаточно большое и сжатие уменьшает его размер.
+
+    :param raw:
+        Сериализованное значение.
+    :param compressor:
+        Алгоритм сжатия - None, если сжатие не нужно.
+    :param min_size:
+        Минимальный размер значения для сжатия.
+    :return:
+        Сжатое значение с флагом алгоритма или исходное значение.
+    """
+    if compressor is None or len(raw) < min_size:
+        return raw
+    compressed = compressor.flag + compressor.compress(raw)
+    if len(compressed) < len(raw):
+        return compressed
+    return raw
+
+
+def dumps(value: Any) -> bytes:
+    """Сериализует значение в колоночном формате, а при невозможности - с помощью pickle."""
+    datum = None
+    if isinstance(value, Datum):
+        datum = value
+        value = value.value
+    if _is_columnar(value):
+        return _dumps_columnar(value, datum)
+    if datum is not None:
+        value = datum
+    return pickle.dumps(value)
+
+
+def loads(raw: Union[bytes, memoryview], buffers: bool = False) -> Any:
+    """Восстанавливает значение из сериализованного представления.
+
+    :param raw:
+        Сериализованное значение.
+    :param buffers:
+        Если True, то массивы NumPy ссылаются напрямую на память raw без копирования. Такие массивы
+        доступны только для чтения и действительны, пока действителен raw - для значений LMDB только
+        внутри транзакции. Иначе данные копируются один раз целиком в собственный буфер. Сжатые значения
+        всегда распаковываются в собственный буфер.
+    :return:
+        Восстановленное значение.
+    """
+    compressor = COMPRESSORS.get(bytes(raw[:1]))
+    if compressor is not None:
+        return loads(compressor.decompress(raw[1:]))
+    if raw[:1] != FLAG_COLUMNAR:
+        return pickle.loads(raw)
+    if not buffers:
+        raw = bytearray(raw)
+    return _loads_columnar(memoryview(raw))
+
+
+def describe(value: Any, size: int) -> Optional[Meta]:
+    """Метаданные для Datum - для остальных значений None.
+
+    :param value:
+        Сохраняемое значение.
+    :param size:
+        Размер сериализованного значения в байтах.
+    """
+    if not isinstance(value, Datum):
+        return None
+    rows = None
+    last_index = None
+    index = getattr(value.value, "index", None)
+    if isinstance(index, pd.Index):
+        rows = len(index)
+        if rows:
+            last_index = index[-1]
+    return Meta(value.timestamp, rows, last_index, size, content_hash(value.value))
+
+
+def content_hash(value: Any) -> Optional[str]:
+    """Хэш значений, индекса и названий столбцов pd.Series и pd.DataFrame - для остальных None."""
+    if not isinstance(value, (pd.Series, pd.DataFrame)):
+        return None
+    digest = hashlib.sha1()
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode())
+    else:
+        digest.update(repr(value.name).encode())
+    try:
+        hashes = pd.util.hash_pandas_object(value, index=True)
+    except TypeError:
+        # Нехэшируемые значения в ячейках
+        return None
+    digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def nbytes(value: Any, raw_size: int) -> int:
+    """Объем десериализованного значения в памяти.
+
+    Для pd.Series и pd.DataFrame, в том числе внутри Datum, учитываются данные и индекс, а для
+    остальных значений используется размер их сериализованного представления raw_size.
+    """
+    if isinstance(value, Datum):
+        value = value.value
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    return raw_size
+
+
+def _is_names(names) -> bool:
+    """Наименования индекса и столбцов должны без потерь сохраняться в JSON."""
+    return all(name is None or isinstance(name, (str, int)) for name in names)
+
+
+def _is_columnar(value) -> bool:
+    """Проверяет возможность сохранения в колоночном формате."""
+    if isinstance(value, pd.Series):
+        columns = [value]
+        names = [value.name]
+    elif isinstance(value, pd.DataFrame):
+        columns = [value.iloc[:, i] for i in range(value.shape[1])]
+        if isinstance(value.columns, pd.MultiIndex) or not value.columns.is_unique:
+            return False
+        names = list(value.columns) + [value.columns.name]
+    else:
+        return False
+    index = value.index
+    if isinstance(index, pd.MultiIndex) or not isinstance(index.dtype, np.dtype):
+        return False
+    if index.dtype.kind not in INDEX_KINDS:
+        return False
+    if getattr(index, "tz", None) is not None or getattr(index, "freq", None) is not None:
+        return False
+    if not _is_names(names + [index.name]):
+        return False
+    return all(
+        isinstance(column.dtype, np.dtype) and column.dtype.kind in COLUMN_KINDS
+        for column in columns
+    )
+
+
+def _dumps_columnar(value: Union[pd.Series, pd.DataFrame], datum) -> bytes:
+    """Сериализует значение в колоночном формате."""
+    index = value.index
+    if isinstance(value, pd.Series):
+        kind = SERIES
+        arrays = [value.values]
+        names = [value.name]
+        columns_name = None
+    else:
+        kind = FRAME
+        arrays = [value.iloc[:, i].values for i in range(value.shape[1])]
+        names = list(value.columns)
+        columns_name = value.columns.name
+    index_values = index.values
+    header = dict(
+        kind=kind,
+        rows=len(index),
+        index=dict(name=index.name, dtype=index_values.dtype.str),
+        columns=[
+            dict(name=name, dtype=array.dtype.str) for name, array in zip(names, arrays)
+        ],
+        columns_name=columns_name,
+    )
+    if datum is not None:
+        timestamp = datum.timestamp
+        tz = timestamp.tz and str(timestamp.tz)
+        header["timestamp"] = dict(value=timestamp.value, tz=tz)
+    header = json.dumps(header).encode()
+    prefix = FLAG_COLUMNAR + HEADER_LENGTH.pack(len(header)) + header
+    padding = b"\0" * (-len(prefix) % ALIGNMENT)
+    buffers = [np.ascontiguousarray(array).tobytes() for array in [index_values] + arrays]
+    return b"".join([prefix, padding] + buffers)
+
+
+@functools.lru_cache(maxsize=128)
+def _columns(names: tuple, name) -> pd.Index:
+    """Неизменяемый индекс столбцов - набор столбцов обычно одинаковый для всех значений категории."""
+    return pd.Index(names, name=name)
+
+
+def _loads_columnar(raw: memoryview):
+    """Восстанавливает значение из колоночного формата."""
+    (length,) = HEADER_LENGTH.unpack_from(raw, len(FLAG_COLUMNAR))
+    start = len(FLAG_COLUMNAR) + HEADER_LENGTH.size
+    header = json.loads(bytes(raw[start : start + length]))
+    offset = start + length
+    offset += -offset % ALIGNMENT
+    rows = header["rows"]
+
+    index_dtype = np.dtype(header["index"]["dtype"])
+    index_values = np.frombuffer(raw, index_dtype, rows, offset)
+    offset += index_dtype.itemsize * rows
+    if index_dtype.kind == "M":
+        index = pd.DatetimeIndex(index_values, name=header["index"]["name"], copy=False)
+    else:
+        index = pd.Index(index_values, name=header["index"]["name"], copy=False)
+
+    columns = header["columns"]
+    dtypes = [np.dtype(column["dtype"]) for column in columns]
+    names = tuple(column["name"] for column in columns)
+    if header["kind"] == SERIES:
+        values = np.frombuffer(raw, dtypes[0], rows, offset)
+        value = pd.Series(values, index=index, name=names[0], copy=False)
+    elif dtypes and all(dtype == dtypes[0] for dtype in dtypes):
+        # Столбцы одного типа лежат подряд и образуют единый блок DataFrame без копирования
+        values = np.frombuffer(raw, dtypes[0], rows * len(dtypes), offset)
+        values = values.reshape(len(dtypes), rows).T
+        columns = _columns(names, header["columns_name"])
+        value = pd.DataFrame(values, index=index, columns=columns, copy=False)
+    else:
+        data = {}
+        for name, dtype in zip(names, dtypes):
+            data[name] = np.frombuffer(raw, dtype, rows, offset)
+            offset += dtype.itemsize * rows
+        columns = _columns(names, header["columns_name"])
+        value = pd.DataFrame(data, index=index, columns=columns)
+
+    timestamp = header.get("timestamp")
+    if timestamp is None:
+        return value
+    timestamp = pd.Timestamp(timestamp["value"], tz=timestamp["tz"])
+    return Datum(value, timestamp)
@@ -1,16 +1,16 @@
 """Менеджер данных по дивидендам с https://www.conomy.ru/"""
 from typing import Union, Tuple
 
-import pyppeteer
-
 from poptimizer.config import POptimizerError
-from poptimizer.store import parser
+from poptimizer.store import parser, browser
 from poptimizer.store.manager import AbstractManager
 from poptimizer.store.utils import DATE
 
 # Данные  хранятся в отдельной базе
 CATEGORY_CONOMY = "conomy"
 
+SOURCE_CONOMY = "conomy.ru"
+
 # Параметры поиска страницы эмитента
 SEARCH_URL = "https://www.conomy.ru/search"
 SEARCH_FIELD = '//*[@id="issuer_search"]'
@@ -26,16 +26,23 @@ HEADER_SIZE = 3
 DATE_COLUMN = parser.DataColumn(
     5,
     {1: "Дата закрытия реестра акционеров", 2: "Под выплату дивидендов"},
-    parser.date_parser,
+    parser.date_column_parser,
+    vectorized=True,
 )
 
 COMMON_TICKER_LENGTH = 4
 COMMON_COLUMN = parser.DataColumn(
-    7, {1: "Размер дивидендов", 2: "АОИ"}, parser.div_parser
+    7,
+    {1: "Размер дивидендов", 2: "АОИ"},
+    parser.div_column_parser,
+    vectorized=True,
 )
 PREFERRED_TICKER_ENDING = "P"
 PREFERRED_COLUMN = parser.DataColumn(
-    8, {1: "Размер дивидендов", 2: "АПИ"}, parser.div_parser
+    8,
+    {1: "Размер дивидендов", 2: "АПИ"},
+    parser.div_column_parser,
+    vectorized=True,
 )
 
 
@@ -56,18 +63,15 @@ async def load_dividends_table(page):
     await page.waitForXPath(DIVIDENDS_TABLE)
 
 
-async def get_html(ticker: str):
-    """Возвращает html-код страницы с данными по дивидендам с сайта https://www.conomy.ru/"""
+async def get_html(ticker: str, pool: browser.BrowserPool):
+    """Возвращает html-код страницы с данными по дивидендам с сайта https://www.conomy.ru/
 
-    try:
-        browser = await pyppeteer.launch()
-        page = await browser.newPage()
+    Загрузка осуществляется на странице из пула общего браузера клиентской сессии.
+    """
+    async with pool.page() as page:
         await load_ticker_page(page, ticker)
         await load_dividends_table(page)
-        html = await page.content()
-    finally:
-        await browser.close()
-    return html
+        return await page.content()
 
 
 def is_common(ticker: str):
@@ -89,12 +93,13 @@ class Conomy(AbstractManager):
     """
 
     CREATE_FROM_SCRATCH = True
+    SOURCE = SOURCE_CONOMY
 
     def __init__(self, ticker: Union[str, Tuple[str, ...]]):
         super().__init__(ticker, CATEGORY_CONOMY)
 
     async def _download(self, name: str):
-        html = await get_html(name)
+        html = await get_html(name, self.BROWSER)
         table = parser.HTMLTableParser(html, TABLE_INDEX)
         columns = [DATE_COLUMN]
         if is_common(name):
@@ -1,13 +1,17 @@
 """Менеджер данных для дивидендов."""
+import asyncio
+import hashlib
+import os
 import sqlite3
-from typing import Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
 
 import pandas as pd
 from pandas.io.sql import DatabaseError
 
 from poptimizer.config import DATA_PATH
 from poptimizer.store.manager import AbstractManager
-from poptimizer.store.utils import DATE
+from poptimizer.store.utils import DATE, SOURCE_ISS
 
 # Данные по дивидендам хранятся во вложенной базе
 CATEGORY_DIVIDENDS = "dividends"
@@ -17,30 +21,153 @@ DIVIDENDS_START = pd.Timestamp("2010-01-01")
 
 SQLITE = str(DATA_PATH / "dividends.db")
 
+# Состояние базы SQLite, на основе которого созданы локальные данные, хранится в основной базе
+SQLITE_STATE = "dividends_sqlite_state"
+
+
+@dataclass(frozen=True)
+class SQLiteState:
+    """Состояние файла базы SQLite и хэши его содержимого, на основе которых созданы данные тикеров.
+
+    Хэш содержимого пересчитывается, только если изменилось время модификации или размер файла.
+    """
+
+    mtime: Optional[int] = None
+    size: Optional[int] = None
+    hash: Optional[str] = None
+    tickers: Dict[str, str] = field(default_factory=dict)
+
+
+def sqlite_state(path: str, old: SQLiteState) -> SQLiteState:
+    """Текущее состояние файла базы SQLite с сохранением хэшей для тикеров из старого состояния."""
+    if not os.path.exists(path):
+        return SQLiteState(tickers=old.tickers)
+    stat = os.stat(path)
+    if (stat.st_mtime_ns, stat.st_size) == (old.mtime, old.size):
+        return old
+    file_hash = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(2 ** 20), b""):
+            file_hash.update(chunk)
+    return SQLiteState(stat.st_mtime_ns, stat.st_size, file_hash.hexdigest(), old.tickers)
+
+
+def read_dividends(path: str, tickers: Iterable[str]) -> Dict[str, pd.Series]:
+    """Загружает дивиденды для нескольких тикеров через одно соединение с базой SQLite.
+
+    Для тикеров, отсутствующих в базе, возвращаются пустые данные.
+    """
+    con = sqlite3.connect(path)
+    try:
+        return {ticker: _read_one(con, ticker) for ticker in tickers}
+    finally:
+        con.close()
+
+
+def _read_one(con: sqlite3.Connection, ticker: str) -> pd.Series:
+    """Загружает дивиденды для тикера."""
+    query = f"SELECT DATE, DIVIDENDS FROM {ticker}"
+    try:
+        df = pd.read_sql_query(query, con, index_col=DATE, parse_dates=[DATE])
+    except DatabaseError:
+        return pd.Series(name=ticker, index=pd.DatetimeIndex([], name=DATE))
+    df = df[df.index >= DIVIDENDS_START]
+    # Несколько выплат в одну дату объединяются
+    df = df.groupby(DATE).sum()
+    df.columns = [ticker]
+    return df[ticker]
+
 
 class Dividends(AbstractManager):
-    """Дивиденды и время закрытия реестра для акций."""
+    """Дивиденды и время закрытия реестра для акций.
+
+    Данные создаются с нуля из обновляемой в ручную базы SQLite, но только для тикеров, данные которых
+    созданы на основе другой версии базы. Загрузка всех необходимых тикеров осуществляется через одно
+    соединение в отдельном потоке, чтобы не блокировать цикл событий.
+    """
 
     CREATE_FROM_SCRATCH = True
 
     def __init__(self, tickers: Tuple[str, ...]):
         super().__init__(tickers, CATEGORY_DIVIDENDS)
+        self._state = None
+        self._batch = None
+        self._batch_names = ()
+
+    async def get(self):
+        """Загружает одним пакетом данные, созданные на основе другой версии базы SQLite."""
+        loop = asyncio.get_event_loop()
+        old_state = await self._load_state()
+        self._batch_names = tuple(
+            name
+            for name in self.names
+            if self._timestamps[name] is None or self._is_changed(name)
+        )
+        self._batch = None
+        if self._batch_names and not (self.OFFLINE or self._is_offline(SOURCE_ISS)):
+            self._batch = loop.run_in_executor(
+                None, read_dividends, SQLITE, self._batch_names
+            )
+        timestamps = dict(self._timestamps)
+        try:
+            return await super().get()
+        finally:
+            self._finish_batch()
+            saved = [
+                name
+                for name in self._batch_names
+                if self._timestamps[name] != timestamps[name]
+            ]
+            self._save_state(old_state, saved)
+
+    async def create(self, name: str):
+        """Создает данные с нуля и запоминает версию базы SQLite, на основе которой они созданы."""
+        old_state = await self._load_state()
+        await super().create(name)
+        self._save_state(old_state, [name])
+
+    async def _load_state(self) -> SQLiteState:
+        """Определяет текущее состояние базы SQLite и возвращает сохраненное."""
+        old_state = self.STORE.get(SQLITE_STATE) or SQLiteState()
+        loop = asyncio.get_event_loop()
+        self._state = await loop.run_in_executor(None, sqlite_state, SQLITE, old_state)
+        return old_state
+
+    def _finish_batch(self):
+        """Отменяет пакетную загрузку, результат которой не понадобился."""
+        batch = self._batch
+        if batch is None:
+            return
+        if not batch.done():
+            batch.cancel()
+        elif not batch.cancelled():
+            batch.exception()
+
+    def _is_changed(self, name: str) -> bool:
+        """Созданы ли данные на основе другой версии базы SQLite."""
+        return self._state.tickers.get(name) != self._state.hash
+
+    def _is_stale(
+        self, name: str, timestamp: pd.Timestamp, update_timestamp: pd.Timestamp
+    ) -> bool:
+        """Данные устаревают только при изменении содержимого базы SQLite."""
+        return self._is_changed(name)
+
+    def _save_state(self, old_state: SQLiteState, saved):
+        """Сохраняет состояние базы SQLite и ее хэш для сохраненных данных."""
+        tickers = dict(self._state.tickers)
+        tickers.update((name, self._state.hash) for name in saved)
+        state = SQLiteState(self._state.mtime, self._state.size, self._state.hash, tickers)
+        if state != old_state:
+            self.STORE.put(SQLITE_STATE, state)
 
     async def _download(self, name: str):
         """Загружает полностью данные по дивидендам.
 
         Загрузка осуществляется из обновляемой в ручную SQLite базы данных по дивидендам."""
-        con = sqlite3.connect(SQLITE)
-        query = f"SELECT DATE, DIVIDENDS FROM {name}"
-        try:
-            df = pd.read_sql_query(query, con, index_col=DATE, parse_dates=[DATE])
-        except DatabaseError:
-            con.close()
-            return pd.Series(name=name, index=pd.DatetimeIndex([], name=DATE))
+        if self._batch is not None and name in self._batch_names:
+            dfs = await self._batch
         else:
-            con.close()
-            df = df[df.index >= DIVIDENDS_START]
-            # Несколько выплат в одну дату объединяются
-            df = df.groupby(DATE).sum()
-            df.columns = [name]
-            return df[name]
+            loop = asyncio.get_event_loop()
+            dfs = await loop.run_in_executor(None, read_dividends, SQLITE, (name,))
+        return dfs[name]
@@ -0,0 +1,187 @@
+"""Ограничение нагрузки на источники данных и повторная загрузка при временных ошибках.
+
+Для каждого источника ограничивается количество одновременных загрузок и их средняя частота с помощью
+алгоритма маркерной корзины. Загрузки, завершившиеся временной ошибкой сети или сервера, повторяются
+с экспоненциально растущей случайной задержкой.
+
+Объекты asyncio в Python 3.7 привязываются к циклу событий при создании, поэтому ограничители должны
+создаваться внутри работающего цикла событий.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiohttp
+
+from poptimizer.config import POptimizerError
+
+# Ошибки сети, после которых загрузку имеет смысл повторить
+TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)
+# Коды ответа сервера, после которых загрузку имеет смысл повторить
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Ограничения для источника данных."""
+
+    # Максимальное количество одновременных загрузок - 0 без ограничения
+    concurrency: int = 0
+    # Средняя частота загрузок в секунду - 0 без ограничения, и допустимое количество загрузок подряд
+    rate: float = 0
+    burst: int = 1
+    # Количество попыток загрузки и базовая задержка перед повтором в секундах
+    attempts: int = 3
+    backoff: float = 0.5
+
+
+def is_transient(error: BaseException) -> bool:
+    """Является ли ошибка временной."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in TRANSIENT_STATUSES
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def raise_for_status(resp: aiohttp.ClientResponse, url: str):
+    """Проверяет статус ответа сервера.
+
+    Временные ошибки сервера возбуждаются без изменений, чтобы их повторил ограничитель загрузок, а
+    остальные преобразуются в POptimizerError.
+    """
+    try:
+        resp.raise_for_status()
+    except aiohttp.ClientResponseError as error:
+        if is_transient(error):
+            raise
+        raise POptimizerError(f"Данные {url} не загружены")
+
+
+def backoff_delay(backoff: float, attempt: int) -> float:
+    """Задержка перед повтором - удваивается с каждой попыткой и случайно сдвигается на ±50%.
+
+    Случайный сдвиг не дает одновременно завершившимся с ошибкой загрузкам повторяться синхронно.
+    """
+    return backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+class TokenBucket:
+    """Маркерная корзина - ограничивает среднюю частоту событий, допуская небольшие всплески."""
+
+    def __init__(self, rate: float, capacity: int):
+        """Корзина создается заполненной.
+
+        :param rate:
+            Количество маркеров, добавляемых в корзину в секунду.
+        :param capacity:
+            Вместимость корзины.
+        """
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Забирает маркер из корзины, при необходимости ожидая его появления."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class Limiter:
+    """Ограничитель загрузок из одного источника.
+
+    Поддерживает протокол асинхронного контекстного менеджера для ограничения отдельной загрузки и
+    запуск загрузки с повторами при временных ошибках.
+    """
+
+    def __init__(self, limit: Limit):
+        self._limit = limit
+        self._semaphore = None
+        if limit.concurrency:
+            self._semaphore = asyncio.Semaphore(limit.concurrency)
+        self._bucket = None
+        if limit.rate:
+            self._bucket = TokenBucket(limit.rate, limit.burst)
+
+    @property
+    def limit(self) -> Limit:
+        """Ограничения для источника."""
+        return self._limit
+
+    async def __aenter__(self):
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        if self._bucket is not None:
+            try:
+                await self._bucket.acquire()
+            except BaseException:
+                self._release()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._release()
+
+    def _release(self):
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    async def run(self, func, description: str):
+        """Выполняет загрузку с ограничениями и повторяет ее при временных ошибках.
+
+        :param func:
+            Функция без аргументов, возвращающая корутину загрузки.
+        :param description:
+            Описание загрузки для логов.
+        :return:
+            Результат загрузки.
+        """
+        attempts = self._limit.attempts
+        for attempt in range(1, attempts + 1):
+            try:
+                async with self:
+                    return await func()
+            except Exception as error:
+                if attempt == attempts or not is_transient(error):
+                    raise
+                delay = backoff_delay(self._limit.backoff, attempt)
+                logging.warning(
+                    f"Ошибка загрузки {description} - {error!r}, "
+                    f"попытка {attempt + 1} из {attempts} через {delay:.1f}с"
+                )
+                await asyncio.sleep(delay)
+
+
+class Limiters:
+    """Ограничители для источников данных, создаваемые при первом обращении к ним."""
+
+    def __init__(self, limits: Dict[str, Limit], default: Limit = Limit()):
+        """Ограничители создаются при первом обращении к источнику внутри цикла событий.
+
+        :param limits:
+            Ограничения для источников данных.
+        :param default:
+            Ограничения для остальных источников.
+        """
+        self._limits = limits
+        self._default = default
+        self._limiters = {}
+
+    def __getitem__(self, source: Optional[str]) -> Limiter:
+        limiter = self._limiters.get(source)
+        if limiter is None:
+            limiter = Limiter(self._limits.get(source, self._default))
+            self._limiters[source] = limiter
+        return limiter
@@ -1,11 +1,29 @@
 """Хранилище локальных данных."""
+import contextlib
+import logging
 import pathlib
-import pickle
 from contextlib import AbstractContextManager
-from typing import Any, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import lmdb
 
+from poptimizer.store import cache, chunks, codec, utils
+
+# Служебная категория для метаданных значений из всех категорий
+META_CATEGORY = "__meta"
+
+# Начало служебных ключей вложенных баз в основной базе
+DB_PREFIX = b"__db_"
+
+# Статистика базы для отсутствующей категории
+EMPTY_STAT = ("depth", "branch_pages", "leaf_pages", "overflow_pages", "entries")
+
+# Во сколько раз увеличивается размер базы при ее заполнении
+GROWTH_FACTOR = 2
+
+# Кэши десериализованных значений, общие для всех экземпляров хранилища с одним путем в процессе
+CACHES = {}
+
 
 class DataStore(AbstractContextManager):
     """Сохраняет/загружает значение для указанного ключа и категории.
@@ -20,28 +38,57 @@ class DataStore(AbstractContextManager):
     """
 
     def __init__(
-        self, path: Union[str, pathlib.Path], max_size=10 * 2 ** 20, categories=0
+        self,
+        path: Union[str, pathlib.Path],
+        max_size=10 * 2 ** 20,
+        categories=0,
+        compression: Optional[Dict[Optional[str], codec.Compressor]] = None,
+        cache_size: int = 0,
     ):
         """Создается база в указанном каталоге (два файла: база и лок-файл).
 
         Размер по умолчанию небольшой, обычно требуется больший. Кроме того при множестве обращений база
-        может временно вырастать до размеров, существенно превышающих объем хранимых данных, поэтому
-        максимальный размер должен выбираться с запасом.
+        может временно вырастать до размеров, существенно превышающих объем хранимых данных. При
+        заполнении базы ее максимальный размер автоматически увеличивается в GROWTH_FACTOR раз, а
+        транзакция на запись повторяется, поэтому вручную подбирать размер не требуется.
 
         При использовании более 0 категорий в основной базе создаются вложенные базы, для каждой из
         которых в основной базе формируется специальный ключ с названием категории, который не должен
         дублироваться с обычными ключами в основной базе. Если категорий 0, то будет использоваться одна
         основная база для категории по умолчанию.
 
+        Если категорий больше 0, то одна вложенная база используется для хранения метаданных значений
+        (время создания, количество строк, последнее значение индекса и размер), что позволяет
+        проверять актуальность данных без их загрузки.
+
         :param path:
             Путь к каталогу с базой - если база отсутствует, то она будет создана, а путь полностью
             проложен.
         :param max_size:
-            Максимальный размер базы. По умолчанию 10МБ.
+            Начальный максимальный размер базы. По умолчанию 10МБ.
         :param categories:
             Количество вложенных баз для категорий.
+        :param compression:
+            Словарь с алгоритмами сжатия значений для категорий. None - категория по умолчанию. Значения
+            сжимаются, только если их размер превышает codec.MIN_COMPRESS_SIZE. Ранее сохраненные
+            значения читаются независимо от настроек сжатия.
+        :param cache_size:
+            Объем кэша десериализованных значений в байтах. Кэш общий для всех экземпляров хранилища с
+            одним путем в процессе, а значения из него не должны изменяться. Используется объем,
+            заданный первым экземпляром с ненулевым объемом, - последующие экземпляры его не меняют.
+            По умолчанию кэш отключен.
         """
         self._env = lmdb.open(str(path), map_size=max_size, max_dbs=categories)
+        with self._begin() as txn:
+            self._main_db = self._env.open_db(txn=txn, create=False)
+        self._dbs = {}
+        self._with_meta = categories > 0
+        self._compression = compression or {}
+        self._cache = CACHES.setdefault(
+            str(pathlib.Path(path).resolve()), cache.LRUCache(cache_size)
+        )
+        if not self._cache.max_size:
+            self._cache.max_size = cache_size
 
     def __enter__(self):
         return self
@@ -64,12 +111,67 @@ class DataStore(AbstractContextManager):
         """Закрывает хранилище данных"""
         self._env.close()
 
-    def _category_db(self, category, txn: lmdb.Transaction):
-        """Возвращает базу данных для категории"""
+    def _category_db(self, category: Optional[str]):
+        """Возвращает базу данных для категории или None, если она еще не создана.
+
+        Дескрипторы баз открываются один раз для окружения и в дальнейшем используются повторно, поэтому
+        для чтения достаточно транзакции только на чтение, которые не блокируют друг друга.
+        """
         if category is None:
-            return self._env.open_db(txn=txn, dupsort=False)
-        db_name = f"__db_{category}"
-        return self._env.open_db(db_name.encode(), txn=txn, dupsort=False)
+            return self._main_db
+        db = self._dbs.get(category)
+        if db is None:
+            db_name = _db_name(category)
+            with self._begin() as txn:
+                if txn.get(db_name, db=self._main_db) is None:
+                    return None
+            # LMDB сохраняет дескриптор в окружении только после фиксации транзакции на запись
+            db = self._env.open_db(db_name, create=False)
+            self._dbs[category] = db
+        return db
+
+    def create_category(self, category: Optional[str]):
+        """Создает базу данных для категории, если она отсутствует, и возвращает ее.
+
+        Требует транзакции на запись, поэтому вынесено в отдельный шаг и не используется при чтении.
+
+        :param category:
+            Категория. None - категория по умолчанию.
+        """
+        db = self._category_db(category)
+        if db is None:
+            db = self._write(
+                lambda txn: self._env.open_db(_db_name(category), txn=txn, dupsort=False)
+            )
+            self._dbs[category] = db
+        return db
+
+    def _begin(self, write: bool = False):
+        """Начинает транзакцию с учетом возможного увеличения размера базы другим процессом."""
+        try:
+            return self._env.begin(write=write, buffers=True)
+        except lmdb.MapResizedError:
+            # Размер базы увеличен другим процессом - нужно перейти на новый размер
+            self._env.set_mapsize(0)
+            return self._env.begin(write=write, buffers=True)
+
+    def _write(self, func):
+        """Выполняет функцию в транзакции на запись и возвращает ее результат.
+
+        При заполнении базы увеличивает ее размер и повторяет транзакцию.
+        """
+        while True:
+            try:
+                with self._begin(write=True) as txn:
+                    return func(txn)
+            except lmdb.MapFullError:
+                self._grow()
+
+    def _grow(self):
+        """Увеличивает максимальный размер базы."""
+        map_size = self._env.info()["map_size"] * GROWTH_FACTOR
+        logging.info(f"Размер хранилища данных увеличен до {map_size / 2 ** 20:.0f}МБ")
+        self._env.set_mapsize(map_size)
 
     def get(self, key: str, category: Optional[str] = None):
         """Получить данные из хранилища
@@ -81,14 +183,203 @@ class DataStore(AbstractContextManager):
         :return:
             Значение
         """
-        # Нужна трансакция на запись при получении значения из несуществующей категории - буде создана
-        # база для этой категории
-        with self._env.begin(write=True, buffers=True) as txn:
-            db = self._category_db(category, txn)
+        return self.get_many((key,), category)[key]
+
+    def get_many(
+        self, keys: Iterable[str], category: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Получить данные для нескольких ключей в рамках одной транзакции на чтение
+
+        :param keys:
+            Ключи
+        :param category:
+            Необязательная категория
+        :return:
+            Словарь со значениями для всех ключей - None для отсутствующих
+        """
+        db = self._category_db(category)
+        if db is None:
+            return {key: None for key in keys}
+        values = {}
+        with self._begin() as txn:
+            self._cache.validate(txn.id())
+            for key in keys:
+                values[key] = self._load(txn, db, category, key)
+        return values
+
+    def _load(self, txn: lmdb.Transaction, db, category: Optional[str], key: str):
+        """Значение для ключа из кэша или базы - None для отсутствующих."""
+        value = self._cache.get((category, key))
+        if value is None:
             raw_value = txn.get(key.encode(), db=db)
-        if raw_value is not None:
-            return pickle.loads(raw_value)
-        return None
+            if raw_value is not None:
+                value = codec.loads(raw_value)
+                size = codec.nbytes(value, len(raw_value))
+                self._cache.put((category, key), value, size)
+        return value
+
+    def keys(self, category: Optional[str] = None, prefix: str = "") -> List[str]:
+        """Ключи, сохраненные в категории, в порядке возрастания
+
+        Для данных, хранящихся блоками, возвращаются только основные ключи без ключей блоков.
+
+        :param category:
+            Необязательная категория
+        :param prefix:
+            Начало ключей - по умолчанию все ключи
+        :return:
+            Список ключей
+        """
+        db = self._category_db(category)
+        if db is None:
+            return []
+        raw_prefix = prefix.encode()
+        keys = []
+        with self._begin() as txn:
+            self._cache.validate(txn.id())
+            heads = {}
+            cursor = txn.cursor(db)
+            if cursor.set_range(raw_prefix):
+                for raw_key in cursor.iternext(values=False):
+                    raw_key = bytes(raw_key)
+                    if not raw_key.startswith(raw_prefix):
+                        break
+                    if category is None and raw_key.startswith(DB_PREFIX):
+                        continue
+                    key = raw_key.decode()
+                    if not self._is_chunk_key(txn, db, category, key, heads):
+                        keys.append(key)
+        return keys
+
+    def _is_chunk_key(
+        self,
+        txn: lmdb.Transaction,
+        db,
+        category: Optional[str],
+        key: str,
+        heads: Dict[str, Tuple[str, ...]],
+    ) -> bool:
+        """Является ли ключ ключом блока данных, хранящихся блоками.
+
+        Ключи блоков основных ключей запоминаются в heads, чтобы не загружать их повторно.
+        """
+        if chunks.CHUNK_SEP not in key:
+            return False
+        name = key.rsplit(chunks.CHUNK_SEP, 1)[0]
+        if name not in heads:
+            head = self._load(txn, db, category, name)
+            heads[name] = head.value.keys if chunks.is_chunked(head) else ()
+        return key in heads[name]
+
+    def iter_items(
+        self, category: Optional[str] = None, prefix: str = ""
+    ) -> Iterator[Tuple[str, Any]]:
+        """Последовательно выдает пары ключ-значение за один проход курсора по категории
+
+        Значения загружаются по мере перебора, поэтому категория целиком не размещается в памяти. Все
+        значения относятся к одной транзакции на чтение, которая открыта до завершения перебора.
+        Данные, хранящиеся блоками, выдаются целиком под основным ключом, а ключи блоков пропускаются.
+
+        :param category:
+            Необязательная категория
+        :param prefix:
+            Начало ключей - по умолчанию все ключи
+        :return:
+            Итератор пар ключ-значение в порядке возрастания ключей
+        """
+        db = self._category_db(category)
+        if db is None:
+            return
+        raw_prefix = prefix.encode()
+        with self._begin() as txn:
+            self._cache.validate(txn.id())
+            heads = {}
+            cursor = txn.cursor(db)
+            if not cursor.set_range(raw_prefix):
+                return
+            for raw_key, raw_value in cursor:
+                raw_key = bytes(raw_key)
+                if not raw_key.startswith(raw_prefix):
+                    break
+                if category is None and raw_key.startswith(DB_PREFIX):
+                    continue
+                key = raw_key.decode()
+                if self._is_chunk_key(txn, db, category, key, heads):
+                    continue
+                value = self._cache.get((category, key))
+                if value is None:
+                    value = codec.loads(raw_value)
+                    size = codec.nbytes(value, len(raw_value))
+                    self._cache.put((category, key), value, size)
+                if chunks.is_chunked(value):
+                    heads[key] = value.value.keys
+                    value = chunks.join(
+                        key, value, lambda name: self._load(txn, db, category, name), category
+                    )
+                yield key, value
+
+    def items(self, category: Optional[str] = None, prefix: str = "") -> Dict[str, Any]:
+        """Все данные категории за один проход курсора
+
+        :param category:
+            Необязательная категория
+        :param prefix:
+            Начало ключей - по умолчанию все ключи
+        :return:
+            Словарь со значениями для всех ключей с указанным началом
+        """
+        return dict(self.iter_items(category, prefix))
+
+    @property
+    def version(self) -> int:
+        """Номер последней транзакции на запись - изменяется при любой записи в хранилище."""
+        return self._env.info()["last_txnid"]
+
+    def cache_info(self) -> dict:
+        """Статистика кэша десериализованных значений
+
+        :return:
+            Статистика в виде словаря:
+
+            * hits - количество попаданий в кэш.
+            * misses - количество промахов.
+            * entries - количество значений в кэше.
+            * size - объем значений в кэше в байтах.
+            * max_size - максимальный объем кэша в байтах.
+        """
+        return self._cache.info()
+
+    @contextlib.contextmanager
+    def view(self, category: Optional[str] = None, copy: bool = False):
+        """Открывает транзакцию на чтение для согласованного получения нескольких значений.
+
+        Возвращает функцию, которая по ключу выдает значение. По умолчанию данные не копируются -
+        массивы NumPy в pd.Series и pd.DataFrame ссылаются напрямую на память LMDB, поэтому доступны
+        только для чтения и действительны лишь внутри блока with.
+
+        :param category:
+            Необязательная категория
+        :param copy:
+            Копировать данные из памяти LMDB с использованием кэша десериализованных значений -
+            значения действительны и после выхода из блока with.
+        """
+        db = self._category_db(category)
+        with self._begin() as txn:
+            if copy:
+                self._cache.validate(txn.id())
+
+            def get(key: str):
+                """Значение для ключа."""
+                if db is None:
+                    return None
+                if copy:
+                    return self._load(txn, db, category, key)
+                raw_value = txn.get(key.encode(), db=db)
+                if raw_value is not None:
+                    raw_value = codec.loads(raw_value, buffers=True)
+                return raw_value
+
+            yield get
 
     def put(self, key: str, value: Any, category: Optional[str] = None):
         """Поместить данные в хранилище
@@ -100,10 +391,103 @@ class DataStore(AbstractContextManager):
         :param value:
             Данные
         """
-        raw_value = pickle.dumps(value)
-        with self._env.begin(write=True, buffers=True) as txn:
-            db = self._category_db(category, txn)
-            txn.put(key.encode(), raw_value, db=db)
+        self.put_many({key: value}, category)
+
+    def put_many(
+        self,
+        mapping: Dict[str, Any],
+        category: Optional[str] = None,
+        delete: Iterable[str] = (),
+    ):
+        """Поместить данные для нескольких ключей в рамках одной транзакции на запись
+
+        Все значения сохраняются одной фиксацией транзакции, что существенно быстрее отдельной записи
+        каждого значения.
+
+        :param mapping:
+            Словарь с ключами и данными
+        :param category:
+            Необязательная категория
+        :param delete:
+            Ключи, которые удаляются вместе с метаданными в той же транзакции
+        """
+        delete = [key for key in delete if key not in mapping]
+        compressor = self._compression.get(category)
+        raw_values = {
+            key: codec.compress(codec.dumps(value), compressor)
+            for key, value in mapping.items()
+        }
+        metas = {
+            key: codec.describe(mapping[key], len(raw_value))
+            for key, raw_value in raw_values.items()
+        }
+        db = self.create_category(category)
+        meta_db = self._meta_db(any(meta is not None for meta in metas.values()))
+
+        def put_all(txn: lmdb.Transaction):
+            """Сохраняет значения и метаданные."""
+            for key, raw_value in raw_values.items():
+                txn.put(key.encode(), raw_value, db=db)
+                if meta_db is None:
+                    continue
+                meta = metas[key]
+                if meta is not None:
+                    txn.put(_meta_key(key, category), codec.dumps(meta), db=meta_db)
+                else:
+                    txn.delete(_meta_key(key, category), db=meta_db)
+            for key in delete:
+                txn.delete(key.encode(), db=db)
+                if meta_db is not None:
+                    txn.delete(_meta_key(key, category), db=meta_db)
+            return txn.id()
+
+        txn_id = self._write(put_all)
+        written = list(raw_values) + delete
+        self._cache.written(txn_id, [(category, key) for key in written])
+
+    def _meta_db(self, create: bool = False):
+        """База метаданных или None, если она не используется или еще не создана."""
+        if not self._with_meta:
+            return None
+        if create:
+            return self.create_category(META_CATEGORY)
+        return self._category_db(META_CATEGORY)
+
+    def get_meta(self, key: str, category: Optional[str] = None):
+        """Получить метаданные значения без загрузки самого значения
+
+        :param key:
+            Ключ
+        :param category:
+            Необязательная категория
+        :return:
+            Метаданные или None, если значение отсутствует или сохранено без метаданных
+        """
+        return self.get_meta_many((key,), category)[key]
+
+    def get_meta_many(
+        self, keys: Iterable[str], category: Optional[str] = None
+    ) -> Dict[str, Optional[utils.Meta]]:
+        """Получить метаданные для нескольких ключей в рамках одной транзакции на чтение
+
+        :param keys:
+            Ключи
+        :param category:
+            Необязательная категория
+        :return:
+            Словарь с метаданными для всех ключей - None для отсутствующих
+        """
+        meta_db = self._meta_db()
+        if meta_db is None:
+            return {key: None for key in keys}
+        metas = {}
+        with self._begin() as txn:
+            for key in keys:
+                raw_meta = txn.get(_meta_key(key, category), db=meta_db)
+                if raw_meta is not None:
+                    raw_meta = codec.loads(raw_meta)
+                metas[key] = raw_meta
+        return metas
 
     def stat(self, category: Optional[str] = None):
         """Статистические данные базы для категории
@@ -119,8 +503,41 @@ class DataStore(AbstractContextManager):
             * leaf_pages - количество листовых страниц.
             * overflow_pages - количество страниц с переполнением.
             * entries - количество сохраненных данных.
+            * map_size - текущий максимальный размер всего хранилища в байтах.
+            * used_size - занятый размер всего хранилища в байтах.
+
+            Для отсутствующей категории статистика базы нулевая, а сама категория не создается.
+        """
+        db = self._category_db(category)
+        if db is None:
+            stat = dict.fromkeys(EMPTY_STAT, 0)
+            stat["psize"] = self._env.stat()["psize"]
+        else:
+            with self._begin() as txn:
+                stat = txn.stat(db)
+        info = self._env.info()
+        stat["map_size"] = info["map_size"]
+        stat["used_size"] = (info["last_pgno"] + 1) * stat["psize"]
+        return stat
+
+    def copy(self, path: Union[str, pathlib.Path], compact: bool = True):
+        """Сохраняет согласованную копию хранилища в указанный каталог
 
+        Копия создается в рамках транзакции на чтение, поэтому не блокирует работу с хранилищем.
+
+        :param path:
+            Путь к существующему пустому каталогу для копии.
+        :param compact:
+            Пропускать свободные страницы - размер копии соответствует объему хранимых данных.
         """
-        with self._env.begin() as txn:
-            db = self._category_db(category, txn)
-            return txn.stat(db)
+        self._env.copy(str(path), compact=compact)
+
+
+def _db_name(category: str) -> bytes:
+    """Название вложенной базы для категории в основной базе."""
+    return DB_PREFIX + category.encode()
+
+
+def _meta_key(key: str, category: Optional[str]) -> bytes:
+    """Ключ метаданных значения в служебной базе."""
+    return f"{category or ''}/{key}".encode()
@@ -0,0 +1,115 @@
+"""Обслуживание локального хранилища данных.
+
+LMDB не уменьшает файл базы при перезаписи значений, поэтому после множества обновлений он существенно
+превышает объем хранимых данных - сжатие сохраняет копию базы без свободных страниц и заменяет ей
+исходную.
+
+Снимок - архив со сжатой копией базы и базой дивидендов, который позволяет развернуть хранилище на
+новой машине без повторной загрузки всех данных. Операции сжатия и восстановления из снимка заменяют
+файлы базы, поэтому во время их выполнения хранилище не должно использоваться другими процессами.
+"""
+import logging
+import os
+import pathlib
+import tarfile
+import tempfile
+from typing import Union
+
+from poptimizer import config
+from poptimizer.config import POptimizerError
+from poptimizer.store import lmbd
+
+# Файл с данными LMDB
+DB_FILE = "data.mdb"
+# Файл базы дивидендов
+DIVIDENDS_FILE = "dividends.db"
+# Файлы в архиве снимка
+BUNDLE_FILES = (DB_FILE, DIVIDENDS_FILE)
+
+
+def _check_store(path: pathlib.Path):
+    """Проверяет наличие базы, чтобы не создавать пустую при открытии."""
+    if not (path / DB_FILE).exists():
+        raise POptimizerError(f"Хранилище {path} отсутствует")
+
+
+def _size(path: pathlib.Path) -> str:
+    """Размер файла в МБ для логов."""
+    return f"{path.stat().st_size / 2 ** 20:.1f}МБ"
+
+
+def compact(path: Union[str, pathlib.Path] = config.DATA_PATH):
+    """Заменяет базу ее копией без свободных страниц.
+
+    :param path:
+        Каталог с хранилищем.
+    """
+    path = pathlib.Path(path)
+    _check_store(path)
+    db_file = path / DB_FILE
+    before = _size(db_file)
+    with tempfile.TemporaryDirectory(dir=path) as temp_dir:
+        with lmbd.DataStore(path) as db:
+            db.copy(temp_dir)
+        os.replace(pathlib.Path(temp_dir) / DB_FILE, db_file)
+    # Номера транзакций в новой базе не связаны со старыми, поэтому кэш значений сбрасывается
+    lmbd.CACHES.pop(str(path.resolve()), None)
+    logging.info(f"Хранилище {path} сжато с {before} до {_size(db_file)}")
+
+
+def export_snapshot(
+    bundle: Union[str, pathlib.Path], path: Union[str, pathlib.Path] = config.DATA_PATH
+):
+    """Сохраняет снимок хранилища и базы дивидендов в архив.
+
+    :param bundle:
+        Путь к создаваемому архиву.
+    :param path:
+        Каталог с хранилищем.
+    """
+    path = pathlib.Path(path)
+    _check_store(path)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with lmbd.DataStore(path) as db:
+            db.copy(temp_dir)
+        with tarfile.open(bundle, "w:gz") as tar:
+            tar.add(pathlib.Path(temp_dir) / DB_FILE, DB_FILE)
+            dividends = path / DIVIDENDS_FILE
+            if dividends.exists():
+                tar.add(dividends, DIVIDENDS_FILE)
+    size = _size(pathlib.Path(bundle))
+    logging.info(f"Снимок хранилища {path} сохранен в {bundle} - {size}")
+
+
+def import_snapshot(
+    bundle: Union[str, pathlib.Path],
+    path: Union[str, pathlib.Path] = config.DATA_PATH,
+    overwrite: bool = False,
+):
+    """Разворачивает хранилище и базу дивидендов из снимка.
+
+    :param bundle:
+        Путь к архиву со снимком.
+    :param path:
+        Каталог для хранилища - создается при отсутствии.
+    :param overwrite:
+        Заменять существующие файлы. Иначе при их наличии возбуждается исключение.
+    """
+    path = pathlib.Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(bundle, "r:*") as tar:
+        members = tar.getmembers()
+        names = [member.name for member in members]
+        is_files = all(member.isfile() for member in members)
+        if DB_FILE not in names or not set(names) <= set(BUNDLE_FILES) or not is_files:
+            raise POptimizerError(f"Архив {bundle} не является снимком хранилища")
+        existing = [name for name in names if (path / name).exists()]
+        if existing and not overwrite:
+            existing = ", ".join(existing)
+            raise POptimizerError(f"Файлы {existing} уже существуют в {path}")
+        with tempfile.TemporaryDirectory(dir=path) as temp_dir:
+            tar.extractall(temp_dir, members)
+            for name in names:
+                os.replace(pathlib.Path(temp_dir) / name, path / name)
+    lmbd.CACHES.pop(str(path.resolve()), None)
+    logging.info(f"Хранилище {path} восстановлено из снимка {bundle}")
@@ -1,14 +1,44 @@
 """Абстрактный менеджер данных - предоставляет локальные данные и следит за их обновлением."""
 import asyncio
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Union, Optional, Tuple
+from typing import Union, Optional, Tuple, Dict
 
 import numpy as np
 import pandas as pd
 
 from poptimizer.config import POptimizerError
-from poptimizer.store import utils
+from poptimizer.store import utils, chunks, limits
+
+# Время в секундах, в течение которого к недоступному источнику данных не обращаются повторно
+OFFLINE_COOLDOWN = 5 * 60
+
+
+class LazyData(dict):
+    """Словарь с данными, которые загружаются из хранилища при первом обращении к ним."""
+
+    def __init__(self, store, category: Optional[str]):
+        super().__init__()
+        self._store = store
+        self._category = category
+
+    def __missing__(self, name: str):
+        value = self._store.get(name, self._category)
+        value = chunks.stitch(name, value, self._store, self._category)
+        self[name] = value
+        return value
+
+    def load(self, names: Tuple[str, ...]):
+        """Загружает в рамках одной транзакции данные, к которым еще не было обращений.
+
+        Данные, хранящиеся блоками, собираются в единое целое.
+        """
+        missing = [name for name in names if name not in self]
+        if missing:
+            values = self._store.get_many(missing, self._category)
+            for name, value in values.items():
+                self[name] = chunks.stitch(name, value, self._store, self._category)
 
 
 class AbstractManager(ABC):
@@ -18,13 +48,28 @@ class AbstractManager(ABC):
     """
 
     ISS_SESSION = None
+    HTTP_SESSION = None
+    BROWSER = None
     STORE = None
+    LIMITERS = None
+    # Результаты загрузок, общие для всех менеджеров в рамках клиентской сессии
+    SESSION_MEMO = None
+    # Предоставлять локальные данные без обновления
+    OFFLINE = False
+    # Недоступные источники данных и моменты time.monotonic(), до которых к ним не обращаются
+    OFFLINE_SOURCES = None
+
+    # Источник данных, для которого действуют общие ограничения на нагрузку
+    SOURCE = None
 
     # Создавать данные с нуля не сопоставляя с имеющейся версией
     CREATE_FROM_SCRATCH = False
     # Требования к индексу у данных
     IS_UNIQUE = True
     IS_MONOTONIC = True
+    # Хранить данные с индексом из дат блоками по годам, чтобы при обновлении перезаписывать только
+    # данные за последний год
+    CHUNKED = False
 
     def __init__(
         self, names: Union[str, Tuple[str, ...]], category: Optional[str] = None
@@ -43,7 +88,10 @@ class AbstractManager(ABC):
             self._names = names
         self._category = category
         self._last_history_date = None
-        self._data = self._load()
+        self._data = LazyData(self.STORE, category)
+        # Ключи блоков за годы до начала обновляемой части данных, хранящихся блоками
+        self._kept_chunks = {}
+        self._timestamps = self._load()
 
     @property
     def names(self):
@@ -56,27 +104,139 @@ class AbstractManager(ABC):
         return self._category
 
     def _load(self):
-        """Загрузка локальных данных без обновления."""
-        return {name: self.STORE[name, self.category] for name in self.names}
+        """Загрузка времени создания локальных данных без обновления.
+
+        Время создания берется из метаданных, а сами данные загружаются при первом обращении к ним. Для
+        данных без метаданных, сохраненных до их появления, загружаются сами данные.
+        """
+        metas = self.STORE.get_meta_many(self.names, self.category)
+        timestamps = {name: meta and meta.timestamp for name, meta in metas.items()}
+        without_meta = tuple(name for name, meta in metas.items() if meta is None)
+        self._data.load(without_meta)
+        for name in without_meta:
+            datum = self._data[name]
+            timestamps[name] = datum and datum.timestamp
+        return timestamps
 
     async def get(self):
-        """Запускает асинхронное обновление данных и возвращает их."""
-        update_timestamp = await utils.update_timestamp(self.STORE)
+        """Запускает асинхронное обновление данных и возвращает их.
+
+        Ошибка загрузки или проверки отдельных данных не прерывает обновление остальных - успешно
+        обновленные данные сохраняются, после чего возбуждается исключение первой из ошибок.
+
+        При временной ошибке сети или источника данных вместо исключения предоставляются имеющиеся
+        локальные данные, а источник считается недоступным в течение OFFLINE_COOLDOWN, чтобы не
+        обращаться к нему повторно. Данные остальных источников продолжают обновляться. Без MOEX ISS
+        нельзя определить необходимость обновления, поэтому при его недоступности предоставляются
+        локальные данные всех источников. Возраст локальных данных можно узнать с помощью
+        Client.data_age.
+        """
+        if self.OFFLINE or self._is_offline(utils.SOURCE_ISS):
+            return self._local_values()
+        try:
+            update_timestamp = await utils.update_timestamp(self.STORE)
+        except Exception as error:
+            if not limits.is_transient(error):
+                raise
+            self._go_offline(utils.SOURCE_ISS, self.names, error)
+            return self._local_values()
         self._last_history_date = update_timestamp.strftime("%Y-%m-%d")
-        aws = []
-        for name, value in self._data.items():
-            if value is None:
-                aws.append(self.create(name))
-            elif value.timestamp < update_timestamp:
+        aws = {}
+        for name, timestamp in self._timestamps.items():
+            if timestamp is None:
+                aws[name] = self._create(name)
+            elif self._is_stale(name, timestamp, update_timestamp):
                 if self.CREATE_FROM_SCRATCH:
-                    aws.append(self.create(name))
+                    aws[name] = self._create(name)
                 else:
-                    aws.append(self.update(name))
-        await asyncio.gather(*aws)
+                    aws[name] = self._update(name)
+        results = await asyncio.gather(*aws.values(), return_exceptions=True)
+        dfs = {}
+        errors = {}
+        for name, result in zip(aws, results):
+            if not isinstance(result, BaseException):
+                dfs[name] = result
+            elif limits.is_transient(result) and self._timestamps[name] is not None:
+                # Используются устаревшие данные, которые удалены из памяти при загрузке с нуля или
+                # загружены лишь частично при обновлении данных, хранящихся блоками
+                self._data.pop(name, None)
+                self._go_offline(self.SOURCE, (name,), result)
+            else:
+                errors[name] = result
+        self._check_index_and_save(dfs, errors)
+        return self._values()
+
+    def _is_stale(
+        self, name: str, timestamp: pd.Timestamp, update_timestamp: pd.Timestamp
+    ) -> bool:
+        """Требуют ли имеющиеся локальные данные обновления.
+
+        По умолчанию обновляются данные, созданные до окончания последнего торгового дня с историей.
+        """
+        return timestamp < update_timestamp
+
+    def _local_values(self):
+        """Локальные данные без обновления."""
+        missing = [name for name, timestamp in self._timestamps.items() if timestamp is None]
+        if missing:
+            raise POptimizerError(
+                f"Нет локальных данных {self.category} -> {', '.join(missing)}"
+            )
+        return self._values()
+
+    def _values(self):
+        """Значения данных - одно значение или список для нескольких наименований."""
+        self._data.load(self.names)
         if len(self.names) == 1:
             return self._data[self.names[0]].value
         return [self._data[name].value for name in self.names]
 
+    def _go_offline(
+        self, source: Optional[str], names: Tuple[str, ...], error: BaseException
+    ):
+        """Отмечает источник данных недоступным в течение OFFLINE_COOLDOWN."""
+        logging.warning(
+            f"Данные {self.category} -> {', '.join(names)} не обновлены - {error!r}. "
+            f"Используются локальные данные без обновления"
+        )
+        if AbstractManager.OFFLINE_SOURCES is not None:
+            AbstractManager.OFFLINE_SOURCES[source] = time.monotonic() + OFFLINE_COOLDOWN
+
+    @classmethod
+    def _is_offline(cls, source: Optional[str]) -> bool:
+        """Отмечен ли источник данных недоступным - отметки старше OFFLINE_COOLDOWN снимаются."""
+        sources = cls.OFFLINE_SOURCES
+        if not sources or source not in sources:
+            return False
+        if sources[source] > time.monotonic():
+            return True
+        del sources[source]
+        return False
+
+    @classmethod
+    def _memoize(cls, key, func):
+        """Запускает загрузку однократно в рамках клиентской сессии.
+
+        Одновременные и последующие обращения с тем же ключом ожидают результата той же загрузки.
+        Загрузка, завершившаяся ошибкой, повторяется при следующем обращении. Вне клиентской сессии
+        загрузка запускается при каждом обращении.
+
+        :param key:
+            Ключ загрузки.
+        :param func:
+            Функция без аргументов, возвращающая корутину загрузки.
+        :return:
+            Задача с результатом загрузки.
+        """
+        memo = cls.SESSION_MEMO
+        if memo is None:
+            return asyncio.ensure_future(func())
+        task = memo.get(key)
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            task = asyncio.ensure_future(func())
+            memo[key] = task
+        return task
+
     async def create(self, name: str):
         """Создает локальные данные с нуля или перезаписывает существующие.
 
@@ -85,19 +245,106 @@ class AbstractManager(ABC):
         :param name:
             Наименование данных.
         """
+        df = await self._create(name)
+        self._check_index_and_save({name: df})
+
+    async def _create(self, name: str):
+        """Загружает данные с нуля без сохранения."""
         logging.info(f"Создание локальных данных {self.category} -> {name}")
         # Данные удаляются, чтобы загрузчик загрузил их полностью, а не обновил
         self._data[name] = None
-        df = await self._download(name)
-        self._check_index_and_save(name, df)
+        self._kept_chunks.pop(name, None)
+        return await self._fetch(name)
+
+    async def _fetch(self, name: str):
+        """Загружает данные с учетом ограничений на нагрузку на источник и повторами при временных
+        ошибках.
+
+        Вспомогательные данные подготавливаются до занятия места в ограничителе, так как их загрузка
+        может требовать места в ограничителе того же источника. К источнику, отмеченному недоступным,
+        повторно не обращается - возбуждается временная ошибка, поэтому предоставляются имеющиеся
+        локальные данные.
+        """
+        if self._is_offline(self.SOURCE):
+            raise ConnectionError(f"Источник данных {self.SOURCE} недоступен")
+        await self._prepare(name)
+        return await self._limiter().run(
+            lambda: self._download(name), f"{self.category} -> {name}"
+        )
+
+    @classmethod
+    def _limiter(cls) -> limits.Limiter:
+        """Ограничитель загрузок для источника данных менеджера."""
+        if cls.LIMITERS is None:
+            return limits.Limiter(limits.Limit())
+        return cls.LIMITERS[cls.SOURCE]
+
+    async def _prepare(self, name: str):
+        """Загружает вспомогательные данные, необходимые для загрузки данных.
+
+        Вызывается вне ограничителя загрузок, поэтому может обращаться к другим менеджерам. По
+        умолчанию вспомогательные данные не нужны.
+        """
+
+    def _check_index_and_save(
+        self,
+        dfs: Dict[str, Union[pd.DataFrame, pd.Series]],
+        errors: Optional[Dict[str, BaseException]] = None,
+    ):
+        """Проверяет индексы данных, сохраняет их в локальное хранилище и данные класса.
+
+        Все данные с корректными индексами сохраняются в рамках одной транзакции. Если индексы
+        некоторых данных некорректны или переданы ошибки их загрузки, то после сохранения остальных
+        данных возбуждается исключение первой из ошибок.
+        """
+        errors = dict(errors or {})
+        valid = {}
+        for name, df in dfs.items():
+            try:
+                self._validate_index(name, df)
+            except POptimizerError as error:
+                errors[name] = error
+            else:
+                valid[name] = df
+        self._save(valid)
+        self._raise_errors(errors)
 
-    def _check_index_and_save(self, name, df):
-        """Проверяет индекс данных, сохраняет их в локальное хранилище и данные класса."""
-        self._validate_index(name, df)
-        data = utils.Datum(df)
-        self.STORE[name, self.category] = data
-        logging.info(f"Данные обновлены {self.category} -> {name}")
-        self._data[name] = data
+    def _save(self, dfs: Dict[str, Union[pd.DataFrame, pd.Series]]):
+        """Сохраняет данные в локальное хранилище и данные класса в рамках одной транзакции."""
+        if not dfs:
+            return
+        data = {name: utils.Datum(df) for name, df in dfs.items()}
+        to_delete = []
+        partial = []
+        if self.CHUNKED:
+            to_save = {}
+            for name, datum in data.items():
+                kept = self._kept_chunks.pop(name, ())
+                changed, stale = chunks.split(
+                    name, datum, self.STORE, self.category, kept
+                )
+                to_save.update(changed)
+                to_delete.extend(stale)
+                if kept:
+                    partial.append(name)
+        else:
+            to_save = data
+        self.STORE.put_many(to_save, self.category, delete=to_delete)
+        for name in data:
+            logging.info(f"Данные обновлены {self.category} -> {name}")
+        self._data.update(data)
+        # Обновлена только часть истории, поэтому данные целиком загружаются при обращении к ним
+        for name in partial:
+            del self._data[name]
+        self._timestamps.update({name: datum.timestamp for name, datum in data.items()})
+
+    def _raise_errors(self, errors: Dict[str, BaseException]):
+        """Логирует ошибки обновления и возбуждает исключение первой из них."""
+        if not errors:
+            return
+        for name, error in errors.items():
+            logging.error(f"Данные не обновлены {self.category} -> {name}: {error!r}")
+        raise next(iter(errors.values()))
 
     def _validate_index(self, name: str, df):
         """Проверяет индекс данных с учетом настроек."""
@@ -112,13 +359,33 @@ class AbstractManager(ABC):
         Во время обновления проверяется стыковку новых данных с существующими, а индекс всех данных при
         необходимости проверяется на уникальность и монотонность.
         """
+        df = await self._update(name)
+        self._check_index_and_save({name: df})
+
+    async def _update(self, name: str):
+        """Загружает обновление и стыкует его с существующими данными без сохранения.
+
+        Для данных, хранящихся блоками, загрузчику доступен только хвост за последний год, а с
+        обновлением стыкуется история, начиная с первого затронутого им года. Блоки за более ранние
+        годы не загружаются и при сохранении не перезаписываются.
+        """
         logging.info(f"Обновление локальных данных {self.category} -> {name}")
+        if self.CHUNKED:
+            self._load_recent(name)
         df_old = self._data[name].value
-        df_new = await self._download(name)
+        df_new = await self._fetch(name)
+        if self.CHUNKED and len(df_new):
+            if df_old.empty or df_new.index[0] < df_old.index[0]:
+                self._load_recent(name, df_new.index[0])
+                df_old = self._data[name].value
         self._validate_new(name, df_old, df_new)
         old_elements = df_old.index.difference(df_new.index)
-        df = df_old.loc[old_elements].append(df_new)
-        self._check_index_and_save(name, df)
+        return pd.concat([df_old.loc[old_elements], df_new])
+
+    def _load_recent(self, name: str, start: Optional[pd.Timestamp] = None):
+        """Загружает данные, хранящиеся блоками, начиная с года даты start - по умолчанию хвост."""
+        kept, self._data[name] = chunks.recent(name, self.STORE, self.category, start)
+        self._kept_chunks[name] = kept
 
     def _validate_new(
         self,
@@ -1,11 +1,13 @@
 """Менеджеры данных для котировок, индекса и перечня торгуемых бумаг с MOEX."""
 import asyncio
 import functools
-from typing import Tuple
+import itertools
+from typing import Dict, List, Tuple
 
 import aiomoex
 import pandas as pd
 
+from poptimizer.store import trading_calendar, utils
 from poptimizer.store.manager import AbstractManager
 
 # noinspection PyProtectedMember
@@ -17,13 +19,47 @@ NAME_SECURITIES = "securities"
 # Данные по котировкам хранятся во вложенной базе
 CATEGORY_QUOTES = "quotes"
 
+# Тикеры для регистрационных номеров хранятся во вложенной базе
+CATEGORY_ALIASES = "aliases"
+
 # Данные об индексе хранятся в основной базе
 NAME_INDEX = "MCFTRR"
 
-# Функции для переобразования типов
-FUNC_UNSIGNED = functools.partial(pd.to_numeric, downcast="unsigned")
-FUNC_FLOAT = functools.partial(pd.to_numeric, downcast="float")
-FUNC_DATE = functools.partial(pd.to_datetime, yearfirst=True, format="%Y-%m-%d")
+SOURCE_ISS = utils.SOURCE_ISS
+
+# Функции для переобразования типов целых столбцов
+FUNC_NUMERIC = pd.to_numeric
+# Свечи содержат время начала периода после даты
+FUNC_DATE = functools.partial(pd.to_datetime, format="%Y-%m-%d", exact=False)
+
+# Функции и целевые типы для столбцов
+CONVERTERS = {
+    DATE: (FUNC_DATE, "datetime64[ns]"),
+    CLOSE: (FUNC_NUMERIC, "float64"),
+    TURNOVER: (FUNC_NUMERIC, "float64"),
+    LOT_SIZE: (FUNC_NUMERIC, "int64"),
+}
+
+
+def make_df(data: List[Dict], columns: Dict[str, str]) -> pd.DataFrame:
+    """Формирует DataFrame из записей aiomoex с целевыми типами столбцов.
+
+    Каждый столбец преобразуется целиком, а не отдельными значениями.
+
+    :param data:
+        Записи aiomoex.
+    :param columns:
+        Соответствие полей записей и названий столбцов DataFrame.
+    :return:
+        DataFrame с выбранными столбцами.
+    """
+    df = pd.DataFrame.from_records(data, columns=list(columns))
+    df.columns = list(columns.values())
+    for column in df.columns:
+        if column in CONVERTERS:
+            func, dtype = CONVERTERS[column]
+            df[column] = func(df[column]).astype(dtype)
+    return df
 
 
 class Securities(AbstractManager):
@@ -35,26 +71,27 @@ class Securities(AbstractManager):
     """
 
     CREATE_FROM_SCRATCH = True
+    SOURCE = SOURCE_ISS
 
     def __init__(self):
         super().__init__(NAME_SECURITIES)
 
     async def _download(self, name: str):
-        columns = ("SECID", "REGNUMBER", "LOTSIZE")
-        data = await aiomoex.get_board_securities(columns=columns)
-        df = pd.DataFrame(data)[list(columns)]
-        df.columns = [TICKER, REG_NUMBER, LOT_SIZE]
-        df = df.set_index(TICKER)
-        df.loc[:, LOT_SIZE] = df[LOT_SIZE].apply(FUNC_UNSIGNED)
-        return df
+        columns = dict(SECID=TICKER, REGNUMBER=REG_NUMBER, LOTSIZE=LOT_SIZE)
+        data = await aiomoex.get_board_securities(columns=tuple(columns))
+        df = make_df(data, columns)
+        return df.set_index(TICKER)
 
 
 class Index(AbstractManager):
     """Котировки индекса полной доходности с учетом российских налогов - MCFTRR.
 
-    Поддерживается частичная загрузка данных для обновления.
+    Поддерживается частичная загрузка данных для обновления. История хранится блоками по годам.
     """
 
+    CHUNKED = True
+    SOURCE = SOURCE_ISS
+
     REQUEST_PARAMS = dict(columns=("TRADEDATE", "CLOSE"), board="RTSI", market="index")
 
     def __init__(self):
@@ -68,15 +105,12 @@ class Index(AbstractManager):
     async def _download_all(self, name):
         """Загрузка всех данных."""
         data = await aiomoex.get_board_history(name, **self.REQUEST_PARAMS)
-        df = pd.DataFrame(data)
-        return self._clean_df(df)
+        return self._clean_df(data)
 
     @staticmethod
-    def _clean_df(df):
-        df = df.reindex(columns=["TRADEDATE", "CLOSE"])
-        df.columns = [DATE, CLOSE]
-        df.loc[:, DATE] = df[DATE].apply(FUNC_DATE)
-        df.loc[:, CLOSE] = df[CLOSE].apply(FUNC_FLOAT)
+    def _clean_df(data: List[Dict]) -> pd.Series:
+        """Формирует ряд цен закрытия из записей aiomoex."""
+        df = make_df(data, dict(TRADEDATE=DATE, CLOSE=CLOSE))
         df.set_index(DATE, inplace=True)
         return df[CLOSE]
 
@@ -85,19 +119,64 @@ class Index(AbstractManager):
         old_df = self._data[name].value
         start = str(old_df.index[-1].date())
         data = await aiomoex.get_board_history(name, start=start, **self.REQUEST_PARAMS)
-        df = pd.DataFrame(data)
-        return self._clean_df(df)
+        return self._clean_df(data)
+
+
+class Calendar(AbstractManager):
+    """Торговый календарь MOEX.
+
+    Строится с нуля по датам торгов индекса MCFTRR и последней дате с историей на MOEX. Предоставляется
+    в виде trading_calendar.TradingCalendar, праздники для прогноза которого выводятся из истории
+    торгов. В режиме работы без обновления при отсутствии локальных данных предоставляется None.
+    """
+
+    CREATE_FROM_SCRATCH = True
+    SOURCE = SOURCE_ISS
+
+    def __init__(self):
+        super().__init__(trading_calendar.NAME_CALENDAR)
+        self._index = None
+
+    async def get(self) -> trading_calendar.TradingCalendar:
+        await super().get()
+        return trading_calendar.load(self.STORE)
+
+    def _local_values(self):
+        """Календарь загружается непосредственно из хранилища."""
+        return None
+
+    async def _prepare(self, name: str):
+        """Индекс загружается вне ограничителя, так как его загрузка требует места в нем."""
+        self._index = await Index().get()
+
+    async def _download(self, name: str):
+        index = self._index
+        last_history = await utils.update_timestamp(self.STORE)
+        last_day = pd.DatetimeIndex([last_history.tz_localize(None).normalize()])
+        days = index.index.union(last_day)
+        days.name = DATE
+        return pd.Series(True, index=days, name=name)
 
 
 class Quotes(AbstractManager):
     """Информация о котировках.
 
     Если у акции менялся тикер, но сохранялся регистрационный номер, то собирается полная история
-    котировок для всех тикеров.
+    котировок для всех тикеров. История хранится блоками по годам.
     """
 
+    CHUNKED = True
+    SOURCE = SOURCE_ISS
+
     def __init__(self, tickers: Tuple[str, ...]):
         super().__init__(tickers, CATEGORY_QUOTES)
+        self._aliases = {}
+
+    async def _prepare(self, name: str):
+        """Тикеры с эквивалентным регистрационным номером ищутся вне ограничителя, так как загрузка
+        перечня торгуемых акций требует места в нем."""
+        if self._data[name] is None:
+            self._aliases[name] = await self._find_aliases(name)
 
     async def _download(self, name: str):
         """Загружает полностью или только обновление по ценам закрытия и оборотам в рублях."""
@@ -107,38 +186,46 @@ class Quotes(AbstractManager):
 
     async def _download_all(self, name):
         """Загружает данные с учетом всех старых тикеров и изменения режима торгов."""
-        aliases = await self._find_aliases(name)
-        aws = [self._download_one_ticker(ticker) for ticker in aliases]
-        dfs = await asyncio.gather(*aws)
-        df = pd.concat(dfs, axis=0)
-        df = self._clean_df(df)
+        aws = [self._download_one_ticker(ticker) for ticker in self._aliases[name]]
+        data = await asyncio.gather(*aws)
+        df = self._clean_df(list(itertools.chain.from_iterable(data)))
         return df.sort_index()
 
-    @staticmethod
-    async def _find_aliases(ticker):
-        """Ищет все тикеры с эквивалентным регистрационным номером."""
-        securities = await Securities().get()
+    @classmethod
+    async def _find_aliases(cls, ticker):
+        """Ищет все тикеры с эквивалентным регистрационным номером.
+
+        Перечень торгуемых акций загружается однократно в рамках клиентской сессии. Найденные тикеры
+        сохраняются в хранилище, и поиск повторяется, только если для регистрационного номера нет
+        сохраненных тикеров или среди них отсутствует искомый тикер, например, после смены тикера.
+        """
+        securities = await cls._memoize(NAME_SECURITIES, lambda: Securities().get())
         number = securities.at[ticker, REG_NUMBER]
-        results = await aiomoex.find_securities(number)
-        return [result["secid"] for result in results if result["regnumber"] == number]
+        aliases = cls.STORE.get(number, CATEGORY_ALIASES)
+        if aliases is None or ticker not in aliases:
+            aliases = await cls._memoize(
+                (CATEGORY_ALIASES, number), lambda: cls._download_aliases(number)
+            )
+        return aliases
+
+    @classmethod
+    async def _download_aliases(cls, number):
+        """Загружает и сохраняет все тикеры с указанным регистрационным номером."""
+        results = await cls._limiter().run(
+            lambda: aiomoex.find_securities(number), f"{CATEGORY_ALIASES} -> {number}"
+        )
+        aliases = [result["secid"] for result in results if result["regnumber"] == number]
+        cls.STORE.put(number, aliases, CATEGORY_ALIASES)
+        return aliases
 
     async def _download_one_ticker(self, ticker):
         """Загружает котировки для одного тикера во всех режимах торгов."""
-        data = await aiomoex.get_market_candles(ticker, end=self._last_history_date)
-        return pd.DataFrame(data)
+        return await aiomoex.get_market_candles(ticker, end=self._last_history_date)
 
     @staticmethod
-    def _clean_df(df):
-        """Оставляет столбцы с ценами закрытия и объемами торгов, сортирует и приводит к корректному
-        формату."""
-        if not df.empty:
-            df = df.loc[:, ["begin", "close", "value"]]
-        else:
-            df = df.reindex(columns=["begin", "close", "value"])
-        df.columns = [DATE, CLOSE, TURNOVER]
-        df.loc[:, DATE] = df[DATE].apply(FUNC_DATE)
-        df.loc[:, CLOSE] = df[CLOSE].apply(FUNC_FLOAT)
-        df.loc[:, TURNOVER] = df[TURNOVER].apply(FUNC_FLOAT)
+    def _clean_df(data: List[Dict]) -> pd.DataFrame:
+        """Оставляет столбцы с ценами закрытия и объемами торгов и приводит к корректному формату."""
+        df = make_df(data, dict(begin=DATE, close=CLOSE, value=TURNOVER))
         df = df.set_index(DATE)
         # Для старых котировок иногда бывали параллельны торги для нескольких тикеров одной бумаги
         if df.index.is_unique:
@@ -158,5 +245,4 @@ class Quotes(AbstractManager):
         data = await aiomoex.get_market_candles(
             name, start=start, end=self._last_history_date
         )
-        df = pd.DataFrame(data)
-        return self._clean_df(df)
+        return self._clean_df(data)
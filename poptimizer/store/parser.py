@@ -1,16 +1,33 @@
-"""Парсер html-таблиц."""
+"""Парсер html-таблиц.
+
+Поддерживается два способа разбора страницы:
+
+* SOUP - построение полного дерева страницы с помощью BeautifulSoup;
+* STREAM - потоковый разбор с помощью lxml, который прекращается после окончания нужной таблицы и не
+  создает объектов для элементов вне ее.
+"""
 import re
 from dataclasses import dataclass
-from typing import Callable, List
+from typing import Callable, List, Optional
 
 import bs4
 import pandas as pd
+from lxml import etree
 
 from poptimizer.config import POptimizerError
 
 DIV_PATTERN = r".*\d"
 DATE_PATTERN = r"\d{2}\.\d{2}\.\d{4}"
 
+# Способы разбора страницы
+SOUP = "soup"
+STREAM = "stream"
+
+# Размер порции страницы, передаваемой потоковому парсеру
+STREAM_CHUNK = 2 ** 16
+# Элементы, текст которых не входит в значение ячейки
+SKIP_TEXT = frozenset(["script", "style"])
+
 
 @dataclass(frozen=True)
 class DataColumn:
@@ -27,6 +44,8 @@ class DataColumn:
     validation_dict: dict
     # Функция для преобразования текстового значения из html в нужный формат pd.DataFrame
     parser_func: Callable
+    # Функция преобразует сразу весь столбец в виде pd.Series со строковыми значениями
+    vectorized: bool = False
 
 
 def date_parser(data: str):
@@ -46,6 +65,147 @@ def div_parser(data: str):
         return float(result)
 
 
+def date_column_parser(data: pd.Series) -> pd.Series:
+    """Функция парсинга столбца с датами закрытия реестра целиком.
+
+    Значения без даты преобразуются в NaT.
+    """
+    dates = data.str.extract(f"({DATE_PATTERN})", expand=False)
+    return pd.to_datetime(dates, format="%d.%m.%Y")
+
+
+def div_column_parser(data: pd.Series) -> pd.Series:
+    """Функция парсинга столбца с дивидендами целиком.
+
+    Значения без цифр преобразуются в NaN.
+    """
+    divs = data.str.extract(f"({DIV_PATTERN})", expand=False)
+    divs = divs.str.replace(",", ".", regex=False)
+    divs = divs.str.replace(" ", "", regex=False)
+    return divs.astype(float)
+
+
+def stream_table(html: str, table_index: int) -> Optional[List[List[Optional[str]]]]:
+    """Потоково разбирает страницу до окончания таблицы с заданным номером.
+
+    Элементы до таблицы очищаются сразу после окончания, а разбор оставшейся части страницы не
+    производится. Ячейки сначала размещаются с учетом rowspan и colspan, после чего заполняется
+    заранее созданная таблица нужного размера.
+
+    :return:
+        Таблица в виде списка списков ячеек или None, если на странице нет таблицы с таким номером.
+    """
+    cells = _stream_cells(html, table_index)
+    if cells is None:
+        return None
+    return _fill_grid(*_place_cells(cells))
+
+
+def _stream_cells(html: str, table_index: int):
+    """Ячейки таблицы в виде списка рядов с текстом, rowspan и colspan ячеек."""
+    tables = 0
+    target = None
+    # Глубина вложенности таблиц внутри искомой
+    nested = 0
+    rows = []
+    for event, element in _events(html):
+        tag = element.tag
+        if event == "start":
+            if tag == "table":
+                if target is not None:
+                    nested += 1
+                elif tables == table_index:
+                    target = element
+                tables += 1
+            elif tag == "tr" and target is not None and not nested:
+                rows.append([])
+        elif target is None:
+            element.clear(keep_tail=True)
+        elif element is target:
+            return rows
+        elif tag == "table":
+            nested -= 1
+        elif tag in ("td", "th") and not nested and rows:
+            rows[-1].append(
+                (
+                    _cell_text(element),
+                    int(element.get("rowspan", 1)),
+                    int(element.get("colspan", 1)),
+                )
+            )
+    if target is None:
+        return None
+    return rows
+
+
+def _events(html: str):
+    """События начала и окончания элементов страницы, разбираемой по частям."""
+    html_parser = etree.HTMLPullParser(events=("start", "end"))
+    for start in range(0, len(html), STREAM_CHUNK):
+        html_parser.feed(html[start : start + STREAM_CHUNK])
+        yield from html_parser.read_events()
+    try:
+        html_parser.close()
+    except etree.XMLSyntaxError:
+        # Пустая страница
+        return
+    yield from html_parser.read_events()
+
+
+def _cell_text(element) -> str:
+    """Текст элемента без комментариев, скриптов и стилей."""
+    parts = [element.text or ""]
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in SKIP_TEXT:
+            parts.append(_cell_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def _place_cells(rows):
+    """Определяет положение ячеек и размер таблицы.
+
+    Ячейка занимает первое свободное от ячеек предыдущих рядов с rowspan место правее предыдущей
+    ячейки ряда.
+    """
+    # Номер ряда, до которого занята колонка
+    busy = []
+    placed = []
+    # Количество колонок в рядах
+    width = [1] * len(rows)
+    for row_pos, row in enumerate(rows):
+        col_pos = 0
+        for value, row_span, col_span in row:
+            while col_pos < len(busy) and busy[col_pos] > row_pos:
+                col_pos += 1
+            if row_span <= 0 or col_span <= 0:
+                continue
+            placed.append((value, row_pos, col_pos, row_span, col_span))
+            end_row = row_pos + row_span
+            end_col = col_pos + col_span
+            if end_col > len(busy):
+                busy.extend([0] * (end_col - len(busy)))
+            if end_row > len(width):
+                width.extend([1] * (end_row - len(width)))
+            for col in range(col_pos, end_col):
+                busy[col] = max(busy[col], end_row)
+            for row_end in range(row_pos, end_row):
+                width[row_end] = max(width[row_end], end_col)
+    height = max((row + row_span for _, row, _, row_span, _ in placed), default=0)
+    return placed, width[:height]
+
+
+def _fill_grid(placed, width):
+    """Заполняет заранее созданную таблицу значениями ячеек."""
+    grid = [[None] * row_width for row_width in width]
+    for value, row, col, row_span, col_span in placed:
+        for row_pos in range(row, row + row_span):
+            grid_row = grid[row_pos]
+            for col_pos in range(col, col + col_span):
+                grid_row[col_pos] = value
+    return grid
+
+
 class HTMLTableParser:
     """Парсер html-таблиц.
 
@@ -53,18 +213,36 @@ class HTMLTableParser:
     rowspan и colspan представляются в виде набора атомарных ячеек с одинаковыми значениями.
     """
 
-    def __init__(self, html: str, table_index: int):
-        soup = bs4.BeautifulSoup(html, "lxml")
-        try:
-            self._table = soup.find_all("table")[table_index]
-        except IndexError:
-            raise POptimizerError(f"На странице нет таблицы {table_index}")
+    def __init__(self, html: str, table_index: int, method: str = STREAM):
+        """Таблица ищется на странице при создании парсера.
+
+        :param html:
+            Страница.
+        :param table_index:
+            Номер таблицы на странице с учетом вложенных таблиц.
+        :param method:
+            Способ разбора страницы - STREAM или SOUP. При потоковом разборе вложенные в ячейки таблицы
+            учитываются только в тексте ячеек.
+        """
+        self._table = None
         self._parsed_table = []
+        if method == STREAM:
+            self._parsed_table = stream_table(html, table_index)
+            if self._parsed_table is None:
+                raise POptimizerError(f"На странице нет таблицы {table_index}")
+        elif method == SOUP:
+            soup = bs4.BeautifulSoup(html, "lxml")
+            try:
+                self._table = soup.find_all("table")[table_index]
+            except IndexError:
+                raise POptimizerError(f"На странице нет таблицы {table_index}")
+        else:
+            raise POptimizerError(f"Неизвестный способ разбора страницы {method}")
 
     @property
     def parsed_table(self):
         """html-таблица в виде списка списков ячеек."""
-        if self._parsed_table:
+        if self._parsed_table or self._table is None:
             return self._parsed_table
         table = self._table
         row_pos = 0
@@ -110,7 +288,8 @@ class HTMLTableParser:
     ) -> pd.DataFrame:
         """Преобразует таблицу в DataFrame.
 
-        Выбирает, проверяет и преобразует данные на основе описания колонок.
+        Выбирает, проверяет и преобразует данные на основе описания колонок. Колонки с
+        векторизованными функциями преобразуются целиком, а с остальными - поячеечно.
 
         :param columns:
             Список колонок, которые нужно проверить и оставить в DataFrame.
@@ -122,8 +301,12 @@ class HTMLTableParser:
             Данные преобразованные в соответствии с описание.
         """
         self._validate_columns(columns)
-        parsed_rows = self._yield_rows(columns, drop_header, drop_footer)
-        return pd.DataFrame(parsed_rows)
+        table = self._crop_table(drop_header, drop_footer)
+        data = {
+            number: self._parse_column(table, column)
+            for number, column in enumerate(columns)
+        }
+        return pd.DataFrame(data, index=pd.RangeIndex(len(table)))
 
     def _validate_columns(self, columns):
         """Проверка значений в колонках."""
@@ -135,11 +318,13 @@ class HTMLTableParser:
                         f"Значение в таблице {table[row][column.index]!r} - должно быть {value!r}"
                     )
 
-    def _yield_rows(self, columns, drop_header, drop_footer):
-        """Генерирует строки с избранными колонками со значениями после парсинга."""
-        table = self._crop_table(drop_header, drop_footer)
-        for row in table:
-            yield [column.parser_func(row[column.index]) for column in columns]
+    @staticmethod
+    def _parse_column(table, column: DataColumn):
+        """Преобразует значения колонки целиком или поячеечно."""
+        values = [row[column.index] for row in table]
+        if column.vectorized:
+            return column.parser_func(pd.Series(values, dtype=object)).values
+        return [column.parser_func(value) for value in values]
 
     def _crop_table(self, drop_header, drop_footer):
         """Отбрасывает строки в начале и конце таблицы."""
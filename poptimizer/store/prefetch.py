@@ -0,0 +1,109 @@
+"""Фоновое обновление локальных данных после окончания торгового дня.
+
+Данные обновляются при первом обращении к устаревшим данным, поэтому без фонового обновления первый
+после окончания торгов расчет ожидает загрузки всех данных. Служба обновления ежедневно через
+небольшое время после END_OF_TRADING обновляет перечень торгуемых бумаг, индекс, торговый календарь,
+котировки и данные о дивидендах, чтобы интерактивные расчеты использовали актуальные локальные данные.
+
+Данные conomy.ru не обновляются, так как их загрузка требует запуска браузера и используется только
+при ручной проверке дивидендов.
+"""
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from poptimizer.store import utils
+from poptimizer.store.client import Client
+from poptimizer.store.utils import REG_NUMBER
+
+# Задержка обновления относительно окончания торгового дня для публикации всех данных
+PREFETCH_DELAY = pd.Timedelta(minutes=5)
+
+
+def next_run(now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """Ближайший момент обновления - PREFETCH_DELAY после окончания торгового дня.
+
+    :param now:
+        Текущий момент времени в часовом поясе MOEX. По умолчанию - текущее время.
+    :return:
+        Момент следующего обновления.
+    """
+    if now is None:
+        now = pd.Timestamp.now(utils.MOEX_TZ)
+    start = utils.end_of_trading_day(now) + PREFETCH_DELAY
+    if start <= now:
+        start += pd.DateOffset(days=1)
+    return start
+
+
+async def _refresh_group(name: str, aws):
+    """Обновляет группу данных - ошибка не прерывает обновление остальных групп."""
+    try:
+        await aws
+    except Exception as error:
+        logging.error(f"Данные {name} не обновлены - {error!r}")
+        return False
+    logging.info(f"Данные {name} обновлены")
+    return True
+
+
+async def _refresh_index(client: Client):
+    """Обновляет индекс и построенный по его датам торговый календарь."""
+    await client.index().get()
+    await client.calendar().get()
+
+
+async def refresh(tickers: Optional[Tuple[str, ...]] = None) -> bool:
+    """Однократно обновляет все данные в рамках одной клиентской сессии.
+
+    :param tickers:
+        Тикеры, для которых обновляются котировки и дивиденды. По умолчанию - все торгуемые акции с
+        регистрационным номером.
+    :return:
+        Обновлены ли все данные без ошибок.
+    """
+    async with Client(offline=False) as client:
+        securities = await client.securities().get()
+        if not tickers:
+            tickers = tuple(securities[REG_NUMBER].dropna().index)
+        groups = dict(
+            index=_refresh_index(client),
+            quotes=client.quotes(tickers).get(),
+            dividends=client.dividends(tickers).get(),
+            dohod=client.dohod(tickers).get(),
+            smart_lab=client.smart_lab().get(),
+        )
+        results = await asyncio.gather(
+            *[_refresh_group(name, aws) for name, aws in groups.items()]
+        )
+        if client.offline_sources:
+            sources = ", ".join(str(source) for source in sorted(client.offline_sources, key=str))
+            logging.warning(
+                f"Источники данных {sources} недоступны - возраст данных {client.data_age}"
+            )
+            return False
+    return all(results)
+
+
+async def run(tickers: Optional[Tuple[str, ...]] = None, once: bool = False):
+    """Обновляет данные сразу и далее ежедневно после окончания торгового дня.
+
+    :param tickers:
+        Тикеры, для которых обновляются котировки и дивиденды. По умолчанию - все торгуемые акции с
+        регистрационным номером.
+    :param once:
+        Обновить данные однократно.
+    """
+    while True:
+        try:
+            await refresh(tickers)
+        except Exception as error:
+            logging.error(f"Обновление данных не выполнено - {error!r}")
+        if once:
+            return
+        start = next_run()
+        logging.info(f"Следующее обновление данных {start}")
+        delay = start - pd.Timestamp.now(utils.MOEX_TZ)
+        await asyncio.sleep(max(delay.total_seconds(), 0))
@@ -1,15 +1,13 @@
 """Менеджер данных по предстоящим дивидендам с https://www.smart-lab.ru"""
-import aiohttp
-from aiohttp import ClientResponseError
-
-from poptimizer.config import POptimizerError
-from poptimizer.store import parser
+from poptimizer.store import limits, parser
 from poptimizer.store.manager import AbstractManager
 from poptimizer.store.utils import DIVIDENDS, TICKER, DATE
 
 # Данные об ожидаемым дивидендам хранятся в основной базе
 NAME_SMART_LAB = "smart-lab"
 
+SOURCE_SMART_LAB = "smart-lab.ru"
+
 URL = "https://smart-lab.ru/dividends/index/order_by_yield/desc/"
 TABLE_INDEX = 1
 HEADER_SIZE = 1
@@ -24,13 +22,15 @@ TICKER_COLUMN = parser.DataColumn(
 DATE_COLUMN = parser.DataColumn(
     4,
     {0: "дата отсечки", -1: "\n+добавить дивиденды\nИстория выплаченных дивидендов\n"},
-    parser.date_parser,
+    parser.date_column_parser,
+    vectorized=True,
 )
 
 DIVIDENDS_COLUMN = parser.DataColumn(
     7,
     {0: "дивиденд,руб", -1: "\n+добавить дивиденды\nИстория выплаченных дивидендов\n"},
-    parser.div_parser,
+    parser.div_column_parser,
+    vectorized=True,
 )
 
 
@@ -43,19 +43,15 @@ class SmartLab(AbstractManager):
     CREATE_FROM_SCRATCH = True
     IS_UNIQUE = False
     IS_MONOTONIC = False
+    SOURCE = SOURCE_SMART_LAB
 
     def __init__(self):
         super().__init__(NAME_SMART_LAB)
 
     async def _download(self, name: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(URL) as resp:
-                try:
-                    resp.raise_for_status()
-                except ClientResponseError:
-                    raise POptimizerError(f"Данные {URL} не загружены")
-                else:
-                    html = await resp.text()
+        async with self.HTTP_SESSION.get(URL) as resp:
+            limits.raise_for_status(resp, URL)
+            html = await resp.text()
         table = parser.HTMLTableParser(html, TABLE_INDEX)
         columns = [TICKER_COLUMN, DATE_COLUMN, DIVIDENDS_COLUMN]
         df = table.make_df(columns, HEADER_SIZE, FOOTER_SIZE)
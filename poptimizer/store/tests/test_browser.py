@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from poptimizer.store import browser
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+
+    async def newPage(self):
+        await asyncio.sleep(0.001)
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(name="browsers")
+def fake_launch(monkeypatch):
+    browsers = []
+
+    async def launch():
+        await asyncio.sleep(0.001)
+        browsers.append(FakeBrowser())
+        return browsers[-1]
+
+    monkeypatch.setattr(browser.pyppeteer, "launch", launch)
+    return browsers
+
+
+@pytest.mark.asyncio
+async def test_single_launch_and_bounded_pages(browsers):
+    pool = browser.BrowserPool(2)
+    assert pool.launches == 0
+    running = []
+    max_running = []
+
+    async def job():
+        async with pool.page() as page:
+            running.append(page)
+            max_running.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(page)
+
+    await asyncio.gather(*[job() for _ in range(10)])
+    assert pool.launches == 1
+    assert len(browsers) == 1
+    assert len(browsers[0].pages) == 2
+    assert max(max_running) == 2
+
+    await pool.close()
+    assert browsers[0].closed
+
+
+@pytest.mark.asyncio
+async def test_broken_page_replaced(browsers):
+    pool = browser.BrowserPool(1)
+    with pytest.raises(ValueError):
+        async with pool.page():
+            raise ValueError
+    async with pool.page() as page:
+        pass
+    assert browsers[0].pages[0].closed
+    assert page is browsers[0].pages[1]
+    assert not page.closed
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_close_without_launch(browsers):
+    pool = browser.BrowserPool(1)
+    await pool.close()
+    assert browsers == []
@@ -0,0 +1,49 @@
+from poptimizer.store import cache
+
+
+def test_get_put():
+    lru = cache.LRUCache(100)
+    assert lru.get("a") is None
+    lru.put("a", 1, 10)
+    assert lru.get("a") == 1
+    assert lru.info() == dict(hits=1, misses=1, entries=1, size=10, max_size=100)
+
+
+def test_eviction():
+    lru = cache.LRUCache(100)
+    lru.put("a", 1, 40)
+    lru.put("b", 2, 40)
+    assert lru.get("a") == 1
+    lru.put("c", 3, 40)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    lru.put("d", 4, 101)
+    assert lru.get("d") is None
+    lru.max_size = 50
+    assert lru.info()["entries"] == 1
+    assert lru.get("c") == 3
+
+
+def test_validate():
+    lru = cache.LRUCache(100)
+    lru.validate(1)
+    lru.put("a", 1, 10)
+    lru.validate(1)
+    assert lru.get("a") == 1
+    lru.validate(2)
+    assert lru.get("a") is None
+
+
+def test_written():
+    lru = cache.LRUCache(100)
+    lru.validate(1)
+    lru.put("a", 1, 10)
+    lru.put("b", 2, 10)
+    lru.written(2, ["a"])
+    assert lru.get("a") is None
+    assert lru.get("b") == 2
+    lru.validate(2)
+    assert lru.get("b") == 2
+    lru.written(4, ["a"])
+    assert lru.get("b") is None
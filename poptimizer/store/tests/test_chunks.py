@@ -0,0 +1,150 @@
+import pandas as pd
+import pytest
+
+from poptimizer.config import POptimizerError
+from poptimizer.store import chunks, lmbd, utils
+
+
+@pytest.fixture(name="db")
+def make_db(tmpdir):
+    with lmbd.DataStore(tmpdir, categories=10) as db:
+        yield db
+
+
+def make_df(start, end):
+    index = pd.DatetimeIndex(pd.bdate_range(start, end).values, name="DATE")
+    return pd.DataFrame({"CLOSE": range(len(index))}, index=index, dtype=float)
+
+
+def test_split_and_stitch(db):
+    df = make_df("2016-12-01", "2019-05-10")
+    datum = utils.Datum(df)
+    to_save, to_delete = chunks.split("AKRN", datum, db, "quotes")
+    assert to_delete == []
+    assert set(to_save) == {"AKRN", "AKRN/2016", "AKRN/2017", "AKRN/2018"}
+    head = to_save["AKRN"].value
+    assert head.keys == ("AKRN/2016", "AKRN/2017", "AKRN/2018")
+    assert head.tail.index[0] == pd.Timestamp("2019-01-01")
+    db.put_many(to_save, "quotes")
+
+    result = chunks.stitch("AKRN", db["AKRN", "quotes"], db, "quotes")
+    assert result.timestamp == datum.timestamp
+    pd.testing.assert_frame_equal(result.value, df)
+
+
+def test_update_rewrites_only_tail(db):
+    df = make_df("2016-12-01", "2019-05-10")
+    db.put_many(chunks.split("AKRN", utils.Datum(df), db, "quotes")[0], "quotes")
+
+    df = make_df("2016-12-01", "2019-05-13")
+    to_save, _ = chunks.split("AKRN", utils.Datum(df), db, "quotes")
+    assert list(to_save) == ["AKRN"]
+    db.put_many(to_save, "quotes")
+    pd.testing.assert_frame_equal(
+        chunks.stitch("AKRN", db["AKRN", "quotes"], db, "quotes").value, df
+    )
+
+
+def test_new_year_closes_chunk(db):
+    df = make_df("2018-12-01", "2018-12-28")
+    db.put_many(chunks.split("AKRN", utils.Datum(df), db, "quotes")[0], "quotes")
+
+    df = make_df("2018-12-01", "2019-01-03")
+    to_save, _ = chunks.split("AKRN", utils.Datum(df), db, "quotes")
+    assert set(to_save) == {"AKRN", "AKRN/2018"}
+
+
+def test_empty(db):
+    df = pd.DataFrame(columns=["CLOSE"], index=pd.DatetimeIndex([], name="DATE"))
+    to_save, _ = chunks.split("AKRN", utils.Datum(df), db, "quotes")
+    assert list(to_save) == ["AKRN"]
+    db.put_many(to_save, "quotes")
+    assert chunks.stitch("AKRN", db["AKRN", "quotes"], db, "quotes").value.empty
+
+
+def test_stitch_not_chunked():
+    datum = utils.Datum(1)
+    assert chunks.stitch("AKRN", datum, None, None) is datum
+    assert chunks.stitch("AKRN", None, None, None) is None
+
+
+def test_changed_chunk_rewritten(db):
+    df = make_df("2016-12-01", "2019-05-10")
+    db.put_many(chunks.split("AKRN", utils.Datum(df), db, "quotes")[0], "quotes")
+
+    df = df.copy()
+    df.loc["2017-06-01", "CLOSE"] = -1
+    to_save, _ = chunks.split("AKRN", utils.Datum(df), db, "quotes")
+    assert set(to_save) == {"AKRN", "AKRN/2017"}
+    db.put_many(to_save, "quotes")
+    pd.testing.assert_frame_equal(
+        chunks.stitch("AKRN", db["AKRN", "quotes"], db, "quotes").value, df
+    )
+
+
+def test_stale_chunks_deleted(db):
+    df = make_df("2016-12-01", "2019-05-10")
+    db.put_many(chunks.split("AKRN", utils.Datum(df), db, "quotes")[0], "quotes")
+
+    df = df.loc["2018-01-01":]
+    to_save, to_delete = chunks.split("AKRN", utils.Datum(df), db, "quotes")
+    assert set(to_save) == {"AKRN"}
+    assert to_delete == ["AKRN/2016", "AKRN/2017"]
+    db.put_many(to_save, "quotes", delete=to_delete)
+    assert db["AKRN/2016", "quotes"] is None
+    assert db["AKRN/2018", "quotes"] is not None
+    assert db.get_meta("AKRN/2016", "quotes") is None
+    pd.testing.assert_frame_equal(
+        chunks.stitch("AKRN", db["AKRN", "quotes"], db, "quotes").value, df
+    )
+
+
+def test_stitch_missing_chunk(db):
+    df = make_df("2016-12-01", "2019-05-10")
+    db.put_many(chunks.split("AKRN", utils.Datum(df), db, "quotes")[0], "quotes")
+    db.put_many({}, "quotes", delete=["AKRN/2017"])
+    with pytest.raises(POptimizerError, match="AKRN/2017"):
+        chunks.stitch("AKRN", db["AKRN", "quotes"], db, "quotes")
+
+
+def test_recent(db):
+    df = make_df("2016-12-01", "2019-05-10")
+    db.put_many(chunks.split("AKRN", utils.Datum(df), db, "quotes")[0], "quotes")
+
+    kept, datum = chunks.recent("AKRN", db, "quotes")
+    assert kept == ("AKRN/2016", "AKRN/2017", "AKRN/2018")
+    pd.testing.assert_frame_equal(datum.value, df.loc["2019-01-01":])
+
+    kept, datum = chunks.recent("AKRN", db, "quotes", pd.Timestamp("2018-12-28"))
+    assert kept == ("AKRN/2016", "AKRN/2017")
+    pd.testing.assert_frame_equal(datum.value, df.loc["2018-01-01":])
+
+    assert chunks.recent("GMKN", db, "quotes") == ((), None)
+
+
+def test_split_kept(db, monkeypatch):
+    df = make_df("2016-12-01", "2019-05-10")
+    db.put_many(chunks.split("AKRN", utils.Datum(df), db, "quotes")[0], "quotes")
+    hashes = []
+    content_hash = chunks.codec.content_hash
+
+    def spy(value):
+        hashes.append(value.index[0].year)
+        return content_hash(value)
+
+    monkeypatch.setattr(chunks.codec, "content_hash", spy)
+    df = make_df("2016-12-01", "2020-01-10")
+    kept = ("AKRN/2016", "AKRN/2017")
+    to_save, to_delete = chunks.split(
+        "AKRN", utils.Datum(df.loc["2018-01-01":]), db, "quotes", kept
+    )
+    assert hashes == [2018]
+    assert set(to_save) == {"AKRN", "AKRN/2019"}
+    assert to_delete == []
+    head = to_save["AKRN"].value
+    assert head.keys == ("AKRN/2016", "AKRN/2017", "AKRN/2018", "AKRN/2019")
+    monkeypatch.undo()
+    db.put_many(to_save, "quotes")
+    pd.testing.assert_frame_equal(
+        chunks.stitch("AKRN", db["AKRN", "quotes"], db, "quotes").value, df
+    )
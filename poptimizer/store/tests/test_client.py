@@ -34,6 +34,7 @@ async def test_client():
         df = await data.get()
     assert df.equals(RESULT)
     assert db._session.closed
+    assert db._http_session.closed
     with pytest.raises(lmdb.Error) as error:
         db._store._env.info()
     assert str(error.value) == "Attempt to operate on closed/deleted/dropped object."
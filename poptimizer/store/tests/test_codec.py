@@ -0,0 +1,135 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from poptimizer.store import codec, utils
+
+
+@pytest.fixture(name="df")
+def make_df():
+    index = pd.DatetimeIndex(["2019-05-06", "2019-05-07", "2019-05-08"], name="DATE")
+    return pd.DataFrame(
+        {"CLOSE": [10.5, 11.0, 10.75], "TURNOVER": [1e6, 2e6, 3e6]}, index=index
+    )
+
+
+def test_frame(df):
+    raw = codec.dumps(df)
+    assert raw[:1] == codec.FLAG_COLUMNAR
+    pd.testing.assert_frame_equal(codec.loads(raw), df)
+
+
+def test_series(df):
+    series = df["CLOSE"]
+    raw = codec.dumps(series)
+    assert raw[:1] == codec.FLAG_COLUMNAR
+    pd.testing.assert_series_equal(codec.loads(raw), series)
+
+
+def test_mixed_dtypes():
+    df = pd.DataFrame({"A": [1, 2], "B": [1.5, 2.5]}, index=[3, 7])
+    pd.testing.assert_frame_equal(codec.loads(codec.dumps(df)), df)
+
+
+def test_datum(df):
+    datum = utils.Datum(df)
+    raw = codec.dumps(datum)
+    assert raw[:1] == codec.FLAG_COLUMNAR
+    result = codec.loads(raw)
+    assert isinstance(result, utils.Datum)
+    assert result.timestamp == datum.timestamp
+    assert str(result.timestamp.tz) == utils.MOEX_TZ
+    pd.testing.assert_frame_equal(result.value, df)
+
+
+def test_buffers(df):
+    raw = codec.dumps(df)
+    result = codec.loads(memoryview(raw), buffers=True)
+    pd.testing.assert_frame_equal(result, df)
+    assert np.shares_memory(result.values, np.frombuffer(raw, np.uint8))
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        42,
+        {"a": 1},
+        pd.DataFrame({"TICKER": ["AKRN", "GAZP"]}),
+        pd.DataFrame(columns=["A", "B"]),
+        utils.Datum(pd.Timestamp("2019-05-08")),
+    ],
+)
+def test_pickle_fallback(value):
+    raw = codec.dumps(value)
+    assert raw[:1] == b"\x80"
+    assert raw == pickle.dumps(value)
+
+
+def test_old_pickle(df):
+    datum = utils.Datum(df)
+    result = codec.loads(pickle.dumps(datum))
+    assert result.timestamp == datum.timestamp
+    pd.testing.assert_frame_equal(result.value, df)
+
+
+def test_describe(df):
+    datum = utils.Datum(df)
+    meta = codec.describe(datum, 100)
+    assert meta == utils.Meta(
+        datum.timestamp, 3, pd.Timestamp("2019-05-08"), 100, codec.content_hash(df)
+    )
+    meta = codec.describe(utils.Datum(42), 10)
+    assert (meta.rows, meta.last_index, meta.size) == (None, None, 10)
+    assert meta.content_hash is None
+    assert codec.describe(utils.Datum(df.iloc[:0]), 10).last_index is None
+    assert codec.describe(df, 100) is None
+
+
+def test_content_hash(df):
+    content_hash = codec.content_hash(df)
+    assert content_hash == codec.content_hash(df.copy())
+    changed = df.copy()
+    changed.iloc[0, 0] += 1
+    assert codec.content_hash(changed) != content_hash
+    assert codec.content_hash(df.rename(columns=str.lower)) != content_hash
+    assert codec.content_hash(42) is None
+
+
+def test_nbytes(df):
+    size = df.memory_usage(index=True, deep=True).sum()
+    assert codec.nbytes(df, 1) == size
+    assert codec.nbytes(utils.Datum(df), 1) == size
+    series = df["CLOSE"]
+    assert codec.nbytes(series, 1) == series.memory_usage(index=True, deep=True)
+    assert codec.nbytes([1, 2], 10) == 10
+
+
+@pytest.mark.parametrize("compressor", [codec.ZLIB, codec.LZMA])
+def test_compress(compressor):
+    df = pd.DataFrame({"A": np.zeros(10000)})
+    raw = codec.dumps(df)
+    compressed = codec.compress(raw, compressor)
+    assert compressed[:1] == compressor.flag
+    assert len(compressed) < len(raw)
+    pd.testing.assert_frame_equal(codec.loads(compressed), df)
+    pd.testing.assert_frame_equal(codec.loads(memoryview(compressed), buffers=True), df)
+
+
+def test_compress_skipped():
+    raw = codec.dumps(pd.DataFrame({"A": np.zeros(10)}))
+    assert codec.compress(raw, codec.ZLIB) is raw
+    assert codec.compress(raw, None, 0) is raw
+    random = codec.dumps(np.random.bytes(10000))
+    assert codec.compress(random, codec.ZLIB) is random
+
+
+def test_register():
+    codec.register(codec.ZLIB)
+    with pytest.raises(ValueError) as error:
+        codec.register(codec.Compressor(codec.ZLIB.flag, bytes, bytes))
+    assert "уже используется" in str(error.value)
+    with pytest.raises(ValueError) as error:
+        codec.register(codec.Compressor(codec.FLAG_COLUMNAR, bytes, bytes))
+    assert "совпадает с флагом формата" in str(error.value)
@@ -2,7 +2,7 @@ import pandas as pd
 import pytest
 
 from poptimizer import config
-from poptimizer.store import client
+from poptimizer.store import client, dividends
 from poptimizer.store.dividends import Dividends
 
 
@@ -46,3 +46,59 @@ async def test_no_data_in_data_base():
     assert df.name == "TEST"
     assert len(df) == 0
     assert isinstance(df.index, pd.DatetimeIndex)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_sqlite_not_reloaded(monkeypatch):
+    await Dividends(("CHMF", "GMKN")).get()
+    calls = []
+    read_dividends = dividends.read_dividends
+
+    def spy(path, tickers):
+        calls.append(tuple(tickers))
+        return read_dividends(path, tickers)
+
+    monkeypatch.setattr(dividends, "read_dividends", spy)
+    # noinspection PyTypeChecker
+    data = await Dividends(("CHMF", "GMKN", "AKRN")).get()
+    assert calls == [("AKRN",)]
+    assert data[0]["2017-12-05"] == pytest.approx(35.61)
+
+
+@pytest.mark.asyncio
+async def test_create_saves_state(monkeypatch):
+    await Dividends(("CHMF",)).create("CHMF")
+    calls = []
+    read_dividends = dividends.read_dividends
+
+    def spy(path, tickers):
+        calls.append(tuple(tickers))
+        return read_dividends(path, tickers)
+
+    monkeypatch.setattr(dividends, "read_dividends", spy)
+    # noinspection PyTypeChecker
+    df = await Dividends(("CHMF",)).get()
+    assert calls == []
+    assert df["2017-12-05"] == pytest.approx(35.61)
+
+
+def test_read_dividends():
+    dfs = dividends.read_dividends(dividends.SQLITE, ("CHMF", "TEST"))
+    assert list(dfs) == ["CHMF", "TEST"]
+    assert dfs["CHMF"]["2018-06-19"] == pytest.approx(38.32 + 27.72)
+    assert len(dfs["TEST"]) == 0
+
+
+def test_sqlite_state(tmp_path):
+    path = str(tmp_path / "test.db")
+    with open(path, "wb") as file:
+        file.write(b"data")
+    state = dividends.sqlite_state(path, dividends.SQLiteState(tickers=dict(CHMF="0")))
+    assert state.hash is not None
+    assert state.tickers == dict(CHMF="0")
+    assert dividends.sqlite_state(path, state) is state
+    with open(path, "ab") as file:
+        file.write(b"new")
+    new_state = dividends.sqlite_state(path, state)
+    assert new_state.hash != state.hash
+    assert new_state.tickers == state.tickers
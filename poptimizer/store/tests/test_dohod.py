@@ -48,3 +48,4 @@ async def test_no_dividends_table_in_html():
     with pytest.raises(POptimizerError) as error:
         await dohod.Dohod(("MSRS",)).get()
     assert "На странице нет таблицы 2" == str(error.value)
+
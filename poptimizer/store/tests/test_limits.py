@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from poptimizer.config import POptimizerError
+from poptimizer.store import dohod, limits, lmbd, manager, smart_lab
+from poptimizer.store.client import MAX_SIZE, MAX_DBS
+
+
+def test_is_transient():
+    assert limits.is_transient(aiohttp.ClientConnectionError())
+    assert limits.is_transient(asyncio.TimeoutError())
+    error = aiohttp.ClientResponseError(None, (), status=503)
+    assert limits.is_transient(error)
+    error = aiohttp.ClientResponseError(None, (), status=404)
+    assert not limits.is_transient(error)
+    assert not limits.is_transient(ValueError())
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def raise_for_status(self):
+        raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+
+class FakeSession:
+    def __init__(self, status):
+        self.status = status
+
+    def get(self, url):
+        return FakeResponse(self.status)
+
+
+@pytest.fixture(name="store")
+def make_store(tmp_path, monkeypatch):
+    with lmbd.DataStore(tmp_path, MAX_SIZE, MAX_DBS) as db:
+        monkeypatch.setattr(manager.AbstractManager, "STORE", db)
+        yield db
+
+
+# noinspection PyProtectedMember
+@pytest.mark.usefixtures("store")
+@pytest.mark.parametrize(
+    "manager_class, args", [(dohod.Dohod, ("VSMO",)), (smart_lab.SmartLab, ())]
+)
+@pytest.mark.asyncio
+async def test_transient_status_not_wrapped(monkeypatch, manager_class, args):
+    data_manager = manager_class(*args)
+    name = data_manager.names[0]
+    monkeypatch.setattr(manager_class, "HTTP_SESSION", FakeSession(503))
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        await data_manager._download(name)
+    assert limits.is_transient(error.value)
+    monkeypatch.setattr(manager_class, "HTTP_SESSION", FakeSession(404))
+    with pytest.raises(POptimizerError) as error:
+        await data_manager._download(name)
+    assert "не загружены" in str(error.value)
+
+
+def test_backoff_delay():
+    for attempt in range(1, 4):
+        delay = limits.backoff_delay(0.5, attempt)
+        assert 0.25 * 2 ** (attempt - 1) <= delay <= 0.75 * 2 ** (attempt - 1)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket():
+    bucket = limits.TokenBucket(50, 5)
+    start = time.monotonic()
+    for _ in range(10):
+        await bucket.acquire()
+    assert 0.09 < time.monotonic() - start < 0.3
+
+
+@pytest.mark.asyncio
+async def test_concurrency():
+    limiter = limits.Limiter(limits.Limit(concurrency=2))
+    running = []
+    max_running = []
+
+    async def download():
+        running.append(1)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return 1
+
+    results = await asyncio.gather(
+        *[limiter.run(download, "test") for _ in range(10)]
+    )
+    assert results == [1] * 10
+    assert max(max_running) == 2
+
+
+@pytest.mark.asyncio
+async def test_retry():
+    limiter = limits.Limiter(limits.Limit(attempts=3, backoff=0.001))
+    calls = []
+
+    async def download():
+        calls.append(1)
+        if len(calls) < 3:
+            raise aiohttp.ClientConnectionError()
+        return 42
+
+    assert await limiter.run(download, "test") == 42
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_no_retry():
+    limiter = limits.Limiter(limits.Limit(attempts=3, backoff=0.001))
+    calls = []
+
+    async def download():
+        calls.append(1)
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        await limiter.run(download, "test")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_exhausted():
+    limiter = limits.Limiter(limits.Limit(attempts=2, backoff=0.001))
+    calls = []
+
+    async def download():
+        calls.append(1)
+        raise asyncio.TimeoutError
+
+    with pytest.raises(asyncio.TimeoutError):
+        await limiter.run(download, "test")
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_limiters():
+    limiters = limits.Limiters(
+        {"a": limits.Limit(concurrency=1)}, limits.Limit(concurrency=2)
+    )
+    assert limiters["a"] is limiters["a"]
+    assert limiters["a"].limit.concurrency == 1
+    assert limiters["b"].limit.concurrency == 2
+    assert limiters[None] is not limiters["b"]
@@ -1,9 +1,10 @@
 from contextlib import AbstractContextManager
 
 import lmdb
+import pandas as pd
 import pytest
 
-from poptimizer.store import lmbd
+from poptimizer.store import chunks, codec, lmbd, utils
 
 
 @pytest.fixture(scope="module", name="path")
@@ -55,3 +56,172 @@ def test_get(path):
 def test_get_no_value(path):
     with lmbd.DataStore(path, categories=10) as db:
         assert db["dd"] is None
+
+
+def test_get_no_category(path):
+    with lmbd.DataStore(path, categories=10) as db:
+        assert db["aa", "second"] is None
+        # noinspection PyProtectedMember
+        assert db._category_db("second") is None
+        version = db.version
+        stat = db.stat("second")
+        assert stat["entries"] == 0
+        assert stat["psize"] > 0
+        assert db.version == version
+        # noinspection PyProtectedMember
+        assert db._category_db("second") is None
+
+
+def test_create_category(path):
+    with lmbd.DataStore(path, categories=10) as db:
+        category_db = db.create_category("second")
+        assert db.create_category("second") is category_db
+        assert db.stat("second")["entries"] == 0
+        db["aa", "second"] = 5
+    with lmbd.DataStore(path, categories=10) as db:
+        assert db["aa", "second"] == 5
+
+
+def test_put_many_get_many(path):
+    with lmbd.DataStore(path, categories=10) as db:
+        db.put_many({"x": 1, "y": [2, 3]}, "many")
+        assert db.stat("many")["entries"] == 2
+        assert db.get_many(("x", "y", "z"), "many") == {"x": 1, "y": [2, 3], "z": None}
+        assert db.get_many(("x", "y"), "no_category") == {"x": None, "y": None}
+
+
+def test_view(path):
+    df = pd.DataFrame({"A": [1.0, 2.0], "B": [3.0, 4.0]})
+    with lmbd.DataStore(path, categories=10) as db:
+        db["df", "view"] = df
+        with db.view("view") as get:
+            pd.testing.assert_frame_equal(get("df"), df)
+            assert get("no_key") is None
+        with db.view("no_category") as get:
+            assert get("df") is None
+
+
+def test_meta(path):
+    df = pd.DataFrame({"A": [1.0, 2.0]}, index=pd.DatetimeIndex(["2019-05-06", "2019-05-07"]))
+    datum = utils.Datum(df)
+    with lmbd.DataStore(path, categories=10) as db:
+        db["df", "meta"] = datum
+        db["int", "meta"] = 1
+        meta = db.get_meta("df", "meta")
+        assert meta.timestamp == datum.timestamp
+        assert meta.rows == 2
+        assert meta.last_index == pd.Timestamp("2019-05-07")
+        assert meta.size > 0
+        assert db.get_meta("df") is None
+        assert db.get_meta_many(("int", "no_key"), "meta") == {"int": None, "no_key": None}
+
+
+def test_no_meta_without_categories(tmpdir):
+    with lmbd.DataStore(tmpdir) as db:
+        db["df"] = utils.Datum(1)
+        assert db.get_meta("df") is None
+        assert db["df"].value == 1
+
+
+def test_grow(tmpdir):
+    with lmbd.DataStore(tmpdir, max_size=2 ** 16, categories=10) as db:
+        assert db.stat()["map_size"] == 2 ** 16
+        db.put_many({str(i): bytes(2 ** 14) for i in range(16)}, "big")
+        stat = db.stat("big")
+        assert stat["entries"] == 16
+        assert stat["map_size"] >= 2 ** 18
+        assert 2 ** 18 <= stat["used_size"] <= stat["map_size"]
+        assert db["15", "big"] == bytes(2 ** 14)
+
+
+def test_compression(tmpdir):
+    df = pd.DataFrame({"A": [1.0] * 10000})
+    with lmbd.DataStore(tmpdir, categories=10) as db:
+        db["plain", "plain"] = df
+    with lmbd.DataStore(tmpdir, categories=10, compression={"zip": codec.ZLIB}) as db:
+        db["df", "zip"] = utils.Datum(df)
+        db["df", "plain"] = utils.Datum(df)
+        assert db.get_meta("df", "zip").size < db.get_meta("df", "plain").size
+        pd.testing.assert_frame_equal(db["df", "zip"].value, df)
+        pd.testing.assert_frame_equal(db["plain", "plain"], df)
+
+
+def test_cache(tmpdir):
+    with lmbd.DataStore(tmpdir, categories=10, cache_size=2 ** 20) as db:
+        db["a", "cache"] = [1]
+        value = db["a", "cache"]
+        assert db["a", "cache"] is value
+        assert db.cache_info()["hits"] == 1
+
+        db["a", "cache"] = [2]
+        assert db["a", "cache"] == [2]
+
+    with lmbd.DataStore(tmpdir, categories=10, cache_size=2 ** 20) as db:
+        value = db["a", "cache"]
+        assert db["a", "cache"] is value
+        # Запись в обход хранилища, как из другого процесса
+        # noinspection PyProtectedMember
+        with db._env.begin(write=True) as txn:
+            # noinspection PyProtectedMember
+            txn.put(b"a", codec.dumps([3]), db=db._category_db("cache"))
+        assert db["a", "cache"] == [3]
+
+
+def test_cache_size_shared(tmpdir):
+    df = pd.DataFrame({"A": range(1000)}, dtype=float)
+    with lmbd.DataStore(tmpdir, categories=10, cache_size=2 ** 20) as db:
+        db["df", "cache"] = utils.Datum(df)
+        value = db["df", "cache"].value
+        info = db.cache_info()
+        assert info["entries"] == 1
+        assert info["size"] == value.memory_usage(index=True, deep=True).sum()
+    with lmbd.DataStore(tmpdir, categories=10) as db:
+        assert db.cache_info()["max_size"] == 2 ** 20
+        assert db.cache_info()["entries"] == 1
+    with lmbd.DataStore(tmpdir, categories=10, cache_size=2 ** 10) as db:
+        assert db.cache_info()["max_size"] == 2 ** 20
+        assert db.cache_info()["entries"] == 1
+
+
+def test_keys_and_items(tmpdir):
+    with lmbd.DataStore(tmpdir, categories=10) as db:
+        assert db.keys("quotes") == []
+        assert db.items("quotes") == {}
+        db.put_many({"GAZP": 1, "AKRN": 2, "GMKN": 3, "GAZP/2018": 4}, "quotes")
+        db["main"] = 5
+        assert db.keys("quotes") == ["AKRN", "GAZP", "GAZP/2018", "GMKN"]
+        assert db.keys("quotes", "GAZP") == ["GAZP", "GAZP/2018"]
+        assert db.keys("quotes", "Z") == []
+        assert db.keys() == ["main"]
+        assert db.items("quotes", "G") == {"GAZP": 1, "GAZP/2018": 4, "GMKN": 3}
+        assert db.items() == {"main": 5}
+
+        items = db.iter_items("quotes")
+        assert next(items) == ("AKRN", 2)
+        assert list(items) == [("GAZP", 1), ("GAZP/2018", 4), ("GMKN", 3)]
+
+
+def test_keys_and_items_chunked(tmpdir):
+    index = pd.DatetimeIndex(pd.bdate_range("2017-12-01", "2019-05-10").values, name="DATE")
+    df = pd.DataFrame({"CLOSE": range(len(index))}, index=index, dtype=float)
+    with lmbd.DataStore(tmpdir, categories=10) as db:
+        to_save, _ = chunks.split("GAZP", utils.Datum(df), db, "quotes")
+        to_save["AKRN"] = utils.Datum(1)
+        db.put_many(to_save, "quotes")
+        assert db.keys("quotes") == ["AKRN", "GAZP"]
+        assert db.keys("quotes", "GAZP/") == []
+
+        items = db.items("quotes")
+        assert list(items) == ["AKRN", "GAZP"]
+        assert items["AKRN"].value == 1
+        pd.testing.assert_frame_equal(items["GAZP"].value, df)
+        pd.testing.assert_frame_equal(dict(db.iter_items("quotes", "G"))["GAZP"].value, df)
+
+
+def test_version(tmpdir):
+    with lmbd.DataStore(tmpdir) as db:
+        version = db.version
+        assert db["a"] is None
+        assert db.version == version
+        db["a"] = 1
+        assert db.version > version
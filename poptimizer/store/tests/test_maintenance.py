@@ -0,0 +1,59 @@
+import tarfile
+
+import pytest
+
+from poptimizer.config import POptimizerError
+from poptimizer.store import lmbd, maintenance
+
+
+@pytest.fixture(name="store_path")
+def make_store(tmp_path):
+    path = tmp_path / "store"
+    with lmbd.DataStore(path, categories=2) as db:
+        for i in range(20):
+            db.put_many({f"key{j}": bytes(10_000) for j in range(20)}, "test")
+        db["main"] = 42
+    (path / maintenance.DIVIDENDS_FILE).write_bytes(b"dividends")
+    return path
+
+
+def test_compact(store_path):
+    db_file = store_path / maintenance.DB_FILE
+    before = db_file.stat().st_size
+    maintenance.compact(store_path)
+    assert db_file.stat().st_size < before
+    with lmbd.DataStore(store_path, categories=2) as db:
+        assert db["main"] == 42
+        assert db["key19", "test"] == bytes(10_000)
+
+
+def test_compact_no_store(tmp_path):
+    with pytest.raises(POptimizerError):
+        maintenance.compact(tmp_path)
+    assert not (tmp_path / maintenance.DB_FILE).exists()
+
+
+def test_snapshot(store_path, tmp_path):
+    bundle = tmp_path / "snapshot.tar.gz"
+    maintenance.export_snapshot(bundle, store_path)
+    new_path = tmp_path / "new"
+    maintenance.import_snapshot(bundle, new_path)
+    with lmbd.DataStore(new_path, categories=2) as db:
+        assert db["main"] == 42
+        assert db["key0", "test"] == bytes(10_000)
+    assert (new_path / maintenance.DIVIDENDS_FILE).read_bytes() == b"dividends"
+
+    with pytest.raises(POptimizerError) as error:
+        maintenance.import_snapshot(bundle, new_path)
+    assert "уже существуют" in str(error.value)
+    maintenance.import_snapshot(bundle, new_path, overwrite=True)
+
+
+def test_import_not_snapshot(tmp_path):
+    bundle = tmp_path / "bad.tar.gz"
+    other = tmp_path / "other.txt"
+    other.write_text("other")
+    with tarfile.open(bundle, "w:gz") as tar:
+        tar.add(other, "../other.txt")
+    with pytest.raises(POptimizerError):
+        maintenance.import_snapshot(bundle, tmp_path / "new")
@@ -1,3 +1,6 @@
+import time
+
+import aiohttp
 import aiomoex
 import pandas as pd
 import pytest
@@ -8,7 +11,7 @@ from poptimizer.store import manager, lmbd
 from poptimizer.store.client import MAX_SIZE, MAX_DBS
 
 # noinspection PyProtectedMember
-from poptimizer.store.utils import MOEX_TZ
+from poptimizer.store.utils import MOEX_TZ, SOURCE_ISS
 
 
 @pytest.fixture(scope="module", name="path")
@@ -139,3 +142,209 @@ async def test_data_do_not_stacks(monkeypatch):
         await SimpleManager(("GAZP",), "category").get()
     error_text = "Существующие данные не соответствуют новым:"
     assert error_text in str(error.value)
+
+
+@pytest.mark.asyncio
+async def test_one_commit_for_many_names(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp)
+    monkeypatch.setattr(SimpleManager, "CREATE_FROM_SCRATCH", True)
+    commits = []
+    put_many = manager.AbstractManager.STORE.put_many
+
+    def fake_put_many(mapping, category=None):
+        commits.append(tuple(mapping))
+        put_many(mapping, category)
+
+    monkeypatch.setattr(manager.AbstractManager.STORE, "put_many", fake_put_many)
+    # noinspection PyTypeChecker
+    await SimpleManager(("AKRN", "GAZP", "LKOH"), "category").get()
+    assert commits == [("AKRN", "GAZP", "LKOH")]
+
+
+@pytest.mark.asyncio
+async def test_data_loaded_lazily(monkeypatch):
+    simple_manager = SimpleManager(("AKRN",), "category")
+    # noinspection PyProtectedMember
+    assert "AKRN" not in simple_manager._data
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp)
+    data = await simple_manager.get()
+    assert isinstance(data, pd.DataFrame)
+    # noinspection PyProtectedMember
+    assert "AKRN" in simple_manager._data
+
+
+class FailingManager(SimpleManager):
+    async def _download(self, name):
+        if name == "FAIL":
+            raise poptimizer.config.POptimizerError(f"Данные {name} не загружены")
+        return self.LOAD
+
+
+@pytest.mark.asyncio
+async def test_partial_success(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp)
+    monkeypatch.setattr(FailingManager, "CREATE_FROM_SCRATCH", True)
+    # noinspection PyTypeChecker
+    failing_manager = FailingManager(("FAIL", "SNGS"), "partial")
+    with pytest.raises(poptimizer.config.POptimizerError) as error:
+        await failing_manager.get()
+    assert str(error.value) == "Данные FAIL не загружены"
+    assert manager.AbstractManager.STORE["SNGS", "partial"].value.equals(
+        SimpleManager.LOAD
+    )
+    assert manager.AbstractManager.STORE["FAIL", "partial"] is None
+
+
+@pytest.mark.asyncio
+async def test_memoize(monkeypatch):
+    monkeypatch.setattr(manager.AbstractManager, "SESSION_MEMO", {})
+    calls = []
+
+    async def load():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError
+        return len(calls)
+
+    with pytest.raises(ValueError):
+        await SimpleManager._memoize("key", load)
+    tasks = [SimpleManager._memoize("key", load) for _ in range(3)]
+    assert [await task for task in tasks] == [2, 2, 2]
+    assert await SimpleManager._memoize("key", load) == 2
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def fail_update_timestamp(_):
+    raise aiohttp.ClientConnectionError
+
+
+@pytest.mark.asyncio
+async def test_offline(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fail_update_timestamp)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE", True)
+    data = await SimpleManager(("AKRN",), "category").get()
+    assert data.equals(pd.DataFrame(data={"col1": [1, 2, 5], "col2": [10, 15, 5]}))
+
+    with pytest.raises(poptimizer.config.POptimizerError) as error:
+        await SimpleManager(("NO_DATA",), "category").get()
+    assert str(error.value) == "Нет локальных данных category -> NO_DATA"
+
+
+@pytest.mark.asyncio
+async def test_stale_tolerant(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fail_update_timestamp)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE", False)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE_SOURCES", {})
+    data = await SimpleManager(("AKRN",), "category").get()
+    assert data.equals(pd.DataFrame(data={"col1": [1, 2, 5], "col2": [10, 15, 5]}))
+    assert not manager.AbstractManager.OFFLINE
+    assert set(manager.AbstractManager.OFFLINE_SOURCES) == {SOURCE_ISS}
+
+
+class SourceManager(SimpleManager):
+    SOURCE = "failing.source"
+
+    async def _download(self, name):
+        raise aiohttp.ClientConnectionError
+
+
+class OtherSourceManager(SimpleManager):
+    SOURCE = "other.source"
+
+
+@pytest.mark.asyncio
+async def test_offline_per_source(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE", False)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE_SOURCES", {})
+    monkeypatch.setattr(SourceManager, "CREATE_FROM_SCRATCH", True)
+    monkeypatch.setattr(OtherSourceManager, "CREATE_FROM_SCRATCH", True)
+    local = await SourceManager(("AKRN",), "category").get()
+    assert local.equals(pd.DataFrame(data={"col1": [1, 2, 5], "col2": [10, 15, 5]}))
+    assert set(manager.AbstractManager.OFFLINE_SOURCES) == {"failing.source"}
+
+    with pytest.raises(ConnectionError):
+        # noinspection PyProtectedMember
+        await SourceManager(("AKRN",), "category")._fetch("AKRN")
+    data = await OtherSourceManager(("OTHER",), "category").get()
+    assert data.equals(SimpleManager.LOAD)
+
+
+
+@pytest.mark.asyncio
+async def test_offline_cooldown(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE", False)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE_SOURCES", {})
+    monkeypatch.setattr(SourceManager, "CREATE_FROM_SCRATCH", True)
+    await SourceManager(("AKRN",), "category").get()
+    # noinspection PyProtectedMember
+    assert SourceManager._is_offline("failing.source")
+
+    manager.AbstractManager.OFFLINE_SOURCES["failing.source"] = time.monotonic()
+    # noinspection PyProtectedMember
+    assert not SourceManager._is_offline("failing.source")
+    assert manager.AbstractManager.OFFLINE_SOURCES == {}
+
+
+class ChunkedManager(manager.AbstractManager):
+    CHUNKED = True
+    LOAD = pd.DataFrame(
+        {"CLOSE": [1.0, 2.0, 3.0, 4.0]},
+        index=pd.DatetimeIndex(
+            ["2017-12-29", "2018-12-28", "2019-01-03", "2019-01-04"]
+        ),
+    )
+    UPDATE = pd.DataFrame(
+        {"CLOSE": [4.0, 5.0]}, index=pd.DatetimeIndex(["2019-01-04", "2019-01-08"])
+    )
+
+    async def _download(self, name):
+        if self._data[name] is None:
+            return self.LOAD
+        # Загрузчику доступен только хвост за последний год
+        assert self._data[name].value.index[0] == pd.Timestamp("2019-01-03")
+        return self.UPDATE
+
+
+@pytest.mark.asyncio
+async def test_chunked_update_touches_only_tail(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE", False)
+    await ChunkedManager(("CHUNKED",), "chunked").create("CHUNKED")
+    hashed = []
+    content_hash = manager.chunks.codec.content_hash
+
+    def spy(value):
+        if isinstance(value, pd.DataFrame):
+            hashed.append(value)
+        return content_hash(value)
+
+    monkeypatch.setattr(manager.chunks.codec, "content_hash", spy)
+    data = await ChunkedManager(("CHUNKED",), "chunked").get()
+    assert hashed == []
+    assert data["CLOSE"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    head = manager.AbstractManager.STORE["CHUNKED", "chunked"].value
+    assert head.keys == ("CHUNKED/2017", "CHUNKED/2018")
+    assert head.tail["CLOSE"].tolist() == [3.0, 4.0, 5.0]
+
+
+class EarlyUpdateManager(ChunkedManager):
+    UPDATE = pd.DataFrame(
+        {"CLOSE": [2.0, 3.0, 4.0, 6.0]},
+        index=pd.DatetimeIndex(
+            ["2018-12-28", "2019-01-03", "2019-01-04", "2019-01-09"]
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_chunked_update_from_first_touched_year(monkeypatch):
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp)
+    monkeypatch.setattr(manager.AbstractManager, "OFFLINE", False)
+    await EarlyUpdateManager(("EARLY",), "chunked").create("EARLY")
+    data = await EarlyUpdateManager(("EARLY",), "chunked").get()
+    assert data["CLOSE"].tolist() == [1.0, 2.0, 3.0, 4.0, 6.0]
+    head = manager.AbstractManager.STORE["EARLY", "chunked"].value
+    assert head.keys == ("EARLY/2017", "EARLY/2018")
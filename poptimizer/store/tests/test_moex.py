@@ -1,8 +1,10 @@
+import asyncio
+
 import aiomoex
 import pandas as pd
 import pytest
 
-from poptimizer.store import client, moex, manager, lmbd
+from poptimizer.store import client, moex, manager, lmbd, trading_calendar
 from poptimizer.store.client import MAX_SIZE, MAX_DBS
 from poptimizer.store.utils import (
     REG_NUMBER,
@@ -77,6 +79,19 @@ async def test_index_create():
     assert df["2018-12-24"] == 3492.91
 
 
+@pytest.mark.usefixtures("fake_data_base")
+@pytest.mark.asyncio
+async def test_calendar_create():
+    calendar = await moex.Calendar().get()
+    assert calendar is trading_calendar.load(manager.AbstractManager.STORE)
+    assert calendar.first == pd.Timestamp("2003-02-26")
+    assert calendar.is_trading_day(pd.Timestamp("2018-12-24"))
+    assert not calendar.is_trading_day(pd.Timestamp("2018-06-12"))
+    assert calendar.prev_trading_day(pd.Timestamp("2018-05-10")) == pd.Timestamp(
+        "2018-05-08"
+    )
+
+
 @pytest.mark.usefixtures("fake_data_base")
 @pytest.mark.asyncio
 async def test_index_download_update():
@@ -173,6 +188,28 @@ async def test_quotes_find_aliases():
     assert set(await moex.Quotes._find_aliases("UPRO")) == {"UPRO", "EONR", "OGK4"}
 
 
+# noinspection PyProtectedMember
+@pytest.mark.usefixtures("create_client")
+@pytest.mark.asyncio
+async def test_quotes_aliases_cached(monkeypatch):
+    calls = []
+    find_securities = aiomoex.find_securities
+
+    async def fake_find_securities(number):
+        calls.append(number)
+        return await find_securities(number)
+
+    monkeypatch.setattr(moex.aiomoex, "find_securities", fake_find_securities)
+    aws = [moex.Quotes._find_aliases(ticker) for ticker in ("UPRO", "UPRO", "AKRN")]
+    results = await asyncio.gather(*aws)
+    assert set(results[0]) == {"UPRO", "EONR", "OGK4"}
+    assert results[0] == results[1]
+    assert len(calls) == len(set(calls)) <= 2
+    searches = len(calls)
+    assert await moex.Quotes._find_aliases("AKRN") == results[2]
+    assert len(calls) == searches
+
+
 # noinspection PyTypeChecker
 @pytest.mark.usefixtures("create_client")
 @pytest.mark.asyncio
@@ -315,3 +352,66 @@ async def test_quotes_lsrg():
     assert df.loc["2018-08-10", TURNOVER] == pytest.approx(8626464.5)
     assert df.loc["2018-09-06", CLOSE] == pytest.approx(660)
     assert df.loc["2018-08-28", TURNOVER] == 34666629.5
+
+
+def test_quotes_clean_df():
+    data = [
+        dict(begin="2019-05-08 00:00:00", close=10.5, value=100.0, open=10),
+        dict(begin="2019-05-07 00:00:00", close=11.5, value=200.0, open=11),
+        dict(begin="2019-05-07 00:00:00", close=12.5, value=300.0, open=12),
+    ]
+    # noinspection PyProtectedMember
+    df = moex.Quotes._clean_df(data)
+    assert list(df.columns) == [CLOSE, TURNOVER]
+    assert df.index.dtype == "datetime64[ns]"
+    assert (df.dtypes == "float64").all()
+    assert df.index.is_unique
+    assert df.loc["2019-05-07", CLOSE] == 12.5
+    assert df.loc["2019-05-08", TURNOVER] == 100.0
+
+
+def test_quotes_clean_empty_df():
+    # noinspection PyProtectedMember
+    df = moex.Quotes._clean_df([])
+    assert df.empty
+    assert list(df.columns) == [CLOSE, TURNOVER]
+    assert isinstance(df.index, pd.DatetimeIndex)
+
+
+def test_make_df_lot_size():
+    data = [dict(SECID="AKRN", REGNUMBER="1-02-00207-A", LOTSIZE=1, BOARDID="TQBR")]
+    columns = dict(SECID=TICKER, REGNUMBER=REG_NUMBER, LOTSIZE=LOT_SIZE)
+    df = moex.make_df(data, columns)
+    assert list(df.columns) == [TICKER, REG_NUMBER, LOT_SIZE]
+    assert df[LOT_SIZE].dtype == "int64"
+
+
+@pytest.mark.asyncio
+async def test_quotes_more_tickers_than_limit(tmp_path, monkeypatch):
+    concurrency = client.LIMITS[moex.SOURCE_ISS].concurrency
+    tickers = tuple(f"T{i:03}" for i in range(concurrency + 4))
+
+    async def fake_update_timestamp_now(_):
+        return pd.Timestamp("2019-05-10 19:45", tz=MOEX_TZ)
+
+    async def fake_board_securities(columns):
+        return [dict(SECID=ticker, REGNUMBER=ticker, LOTSIZE=1) for ticker in tickers]
+
+    async def fake_find_securities(number):
+        return [dict(secid=number, regnumber=number)]
+
+    async def fake_market_candles(ticker, start=None, end=None):
+        return [dict(begin="2019-05-08 00:00:00", close=1.0, value=2.0)]
+
+    monkeypatch.setattr(manager.utils, "update_timestamp", fake_update_timestamp_now)
+    monkeypatch.setattr(moex.aiomoex, "get_board_securities", fake_board_securities)
+    monkeypatch.setattr(moex.aiomoex, "find_securities", fake_find_securities)
+    monkeypatch.setattr(moex.aiomoex, "get_market_candles", fake_market_candles)
+    limiters = client.limits.Limiters(client.LIMITS, client.DEFAULT_LIMIT)
+    monkeypatch.setattr(manager.AbstractManager, "LIMITERS", limiters)
+    monkeypatch.setattr(manager.AbstractManager, "SESSION_MEMO", {})
+    with lmbd.DataStore(tmp_path, MAX_SIZE, MAX_DBS) as db:
+        monkeypatch.setattr(manager.AbstractManager, "STORE", db)
+        dfs = await asyncio.wait_for(moex.Quotes(tickers).get(), 10)
+    assert len(dfs) == len(tickers)
+    assert all(df.loc["2019-05-08", CLOSE] == 1.0 for df in dfs)
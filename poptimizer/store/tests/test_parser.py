@@ -132,3 +132,57 @@ def test_make_df_fail_validate():
     with pytest.raises(POptimizerError) as error:
         table.make_df(columns)
         assert error.value == 'Значение в таблице "5.55 (сов)" - должно быть "test"'
+
+
+@pytest.mark.parametrize("table_index, result", [(0, RESULT0), (1, RESULT1)])
+def test_soup_and_stream_equal(table_index, result):
+    soup = parser.HTMLTableParser(HTML, table_index, parser.SOUP)
+    stream = parser.HTMLTableParser(HTML, table_index, parser.STREAM)
+    assert soup.parsed_table == stream.parsed_table == result
+
+
+def test_stream_nested_table():
+    html = (
+        "<table><tr><td>a<table><tr><td>n<b>b</b></td></tr></table>c<!-- x --></td>"
+        "<td rowspan=2>d</td></tr><tr><td>e</td></tr></table>"
+    )
+    assert parser.HTMLTableParser(html, 0).parsed_table == [["anbc", "d"], ["e", "d"]]
+    assert parser.HTMLTableParser(html, 1).parsed_table == [["nb"]]
+
+
+def test_stream_unclosed_table():
+    html = "<table><tr><td>1<td>2<tr><td colspan=2>3"
+    assert parser.HTMLTableParser(html, 0).parsed_table == [["1", "2"], ["3", "3"]]
+
+
+def test_unknown_method():
+    with pytest.raises(POptimizerError) as error:
+        parser.HTMLTableParser(HTML, 0, "test")
+    assert str(error.value) == "Неизвестный способ разбора страницы test"
+
+
+def test_date_column_parser():
+    data = pd.Series(["-", "30.11.2018 (рек.)", "19.07.2017"])
+    df = parser.date_column_parser(data)
+    assert df.isna().tolist() == [True, False, False]
+    assert df[1] == pd.Timestamp("2018-11-30")
+    assert df[2] == pd.Timestamp("2017-07-19")
+
+
+def test_div_column_parser():
+    data = pd.Series(["2.23", "30,4", "4", "66.8 (рек.)", "78,9 (прогноз)", "2 097", "-"])
+    df = parser.div_column_parser(data)
+    assert df[:-1].tolist() == [2.23, 30.4, 4, 66.8, 78.9, 2097.0]
+    assert pd.isna(df.iloc[-1])
+
+
+def test_make_df_vectorized_equals_per_cell():
+    table = parser.HTMLTableParser(HTML, 1)
+    per_cell = [parser.DataColumn(i, {}, parser.div_parser) for i in range(5)]
+    vectorized = [
+        parser.DataColumn(i, {}, parser.div_column_parser, vectorized=True)
+        for i in range(5)
+    ]
+    df = pd.DataFrame(DF_DATA)
+    assert df.equals(table.make_df(per_cell))
+    assert df.equals(table.make_df(vectorized))
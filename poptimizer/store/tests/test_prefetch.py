@@ -0,0 +1,124 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from poptimizer.store import prefetch, utils
+
+
+@pytest.mark.parametrize(
+    "now, start",
+    [
+        ("2019-05-10 12:00", "2019-05-10 19:50"),
+        ("2019-05-10 19:47", "2019-05-10 19:50"),
+        ("2019-05-10 19:50", "2019-05-11 19:50"),
+        ("2019-05-10 23:00", "2019-05-11 19:50"),
+        ("2019-05-11 00:10", "2019-05-11 19:50"),
+    ],
+)
+def test_next_run(now, start):
+    now = pd.Timestamp(now, tz=utils.MOEX_TZ)
+    assert prefetch.next_run(now) == pd.Timestamp(start, tz=utils.MOEX_TZ)
+
+
+def test_next_run_default():
+    now = pd.Timestamp.now(utils.MOEX_TZ)
+    start = prefetch.next_run()
+    assert now < start <= now + pd.DateOffset(days=1)
+
+
+class FakeManager:
+    def __init__(self, calls, failing, name, *args):
+        self._calls = calls
+        self._failing = failing
+        self._name = name
+        self._args = args
+
+    async def get(self):
+        self._calls.append((self._name, *self._args))
+        if self._name in self._failing:
+            raise ValueError(self._name)
+        if self._name == "securities":
+            return pd.DataFrame(
+                {utils.REG_NUMBER: ["1-01", None, "1-02"]},
+                index=["AKRN", "BOND", "GMKN"],
+            )
+        return None
+
+
+class FakeClient:
+    def __init__(self, calls, failing=(), offline_sources=()):
+        self.calls = calls
+        self.failing = failing
+        self.offline_sources = frozenset(offline_sources)
+        self.data_age = pd.Timedelta(0)
+
+    def __call__(self, offline):
+        assert offline is False
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args: FakeManager(self.calls, self.failing, name, *args)
+
+
+@pytest.mark.asyncio
+async def test_refresh(monkeypatch):
+    calls = []
+    monkeypatch.setattr(prefetch, "Client", FakeClient(calls))
+    assert await prefetch.refresh()
+    tickers = ("AKRN", "GMKN")
+    assert calls[0] == ("securities",)
+    assert set(calls[1:]) == {
+        ("index",),
+        ("calendar",),
+        ("quotes", tickers),
+        ("dividends", tickers),
+        ("dohod", tickers),
+        ("smart_lab",),
+    }
+    assert calls.index(("index",)) < calls.index(("calendar",))
+
+
+@pytest.mark.asyncio
+async def test_refresh_errors(monkeypatch):
+    calls = []
+    monkeypatch.setattr(prefetch, "Client", FakeClient(calls, failing=("index",)))
+    assert not await prefetch.refresh(("AKRN",))
+    assert ("calendar",) not in calls
+    assert ("quotes", ("AKRN",)) in calls
+    assert ("smart_lab",) in calls
+
+    calls = []
+    fake_client = FakeClient(calls, offline_sources=("dohod.ru",))
+    monkeypatch.setattr(prefetch, "Client", fake_client)
+    assert not await prefetch.refresh(("AKRN",))
+    assert ("dohod", ("AKRN",)) in calls
+
+
+@pytest.mark.asyncio
+async def test_run_continues_after_failure(monkeypatch):
+    calls = []
+
+    async def fake_refresh(tickers):
+        calls.append(tickers)
+        if len(calls) == 1:
+            raise ValueError
+        if len(calls) == 3:
+            raise asyncio.CancelledError
+        return True
+
+    monkeypatch.setattr(prefetch, "refresh", fake_refresh)
+    monkeypatch.setattr(prefetch, "next_run", lambda: pd.Timestamp.now(utils.MOEX_TZ))
+    with pytest.raises(asyncio.CancelledError):
+        await prefetch.run(("AKRN",))
+    assert calls == [("AKRN",)] * 3
+
+    calls.clear()
+    await prefetch.run(("AKRN",), once=True)
+    assert calls == [("AKRN",)]
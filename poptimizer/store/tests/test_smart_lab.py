@@ -30,3 +30,4 @@ async def test_smart_lab_raise(monkeypatch):
     with pytest.raises(POptimizerError) as error:
         await smart_lab.SmartLab().get()
     assert str(error.value) == "Данные https://smart-lab.ru/dividends12 не загружены"
+
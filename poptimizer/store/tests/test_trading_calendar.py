@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from poptimizer.config import POptimizerError
+from poptimizer.store import lmbd, trading_calendar, utils
+from poptimizer.store.client import MAX_SIZE, MAX_DBS
+from poptimizer.store.utils import DATE
+
+# Ежегодные праздники и разовый выходной день, которые не должны попасть в прогноз
+HOLIDAYS = ((1, 1), (1, 2), (1, 7), (3, 8), (5, 1), (5, 9), (6, 12), (11, 4))
+ONE_OFF = pd.Timestamp("2017-04-28")
+
+
+def make_days(start, end):
+    days = pd.bdate_range(start, end)
+    holidays = [
+        pd.Timestamp(year, month, day)
+        for year in range(days[0].year, days[-1].year + 1)
+        for month, day in HOLIDAYS
+    ]
+    return days[~days.isin(holidays + [ONE_OFF])]
+
+
+DAYS = make_days("2014-01-03", "2019-05-08")
+
+
+@pytest.fixture(name="calendar")
+def make_calendar():
+    return trading_calendar.TradingCalendar(DAYS)
+
+
+def test_holiday_rules():
+    assert trading_calendar.holiday_rules(DAYS) == HOLIDAYS
+    assert trading_calendar.holiday_rules(DAYS[DAYS.year == 2019]) == ()
+    # Праздник, пришедшийся на будний день лишь в одном из лет, не выводится из истории
+    days = make_days("2015-01-01", "2018-12-31")
+    assert (6, 12) not in trading_calendar.holiday_rules(days)
+
+
+def test_days(calendar):
+    assert calendar.first == pd.Timestamp("2014-01-03")
+    assert calendar.end == pd.Timestamp("2022-01-01")
+    days = calendar.days
+    assert days[: len(DAYS)].equals(DAYS)
+    assert days[len(DAYS)] == pd.Timestamp("2019-05-10")
+    assert pd.Timestamp("2019-06-12") not in days
+    assert pd.Timestamp("2020-01-07") not in days
+    assert pd.Timestamp("2020-04-28") in days
+    assert days[-1] == pd.Timestamp("2021-12-31")
+
+
+def test_days_without_history():
+    days = trading_calendar.TradingCalendar(DAYS[DAYS.year == 2019]).days
+    assert pd.Timestamp("2019-06-12") in days
+    assert pd.Timestamp("2019-06-15") not in days
+
+
+def test_is_trading_day(calendar):
+    assert calendar.is_trading_day(pd.Timestamp("2019-03-07"))
+    assert not calendar.is_trading_day(pd.Timestamp("2019-03-08"))
+    assert not calendar.is_trading_day(pd.Timestamp("2019-03-09"))
+    assert not calendar.is_trading_day(pd.Timestamp("2019-01-02"))
+    assert not calendar.is_trading_day(pd.Timestamp("2019-05-09"))
+    assert calendar.is_trading_day(pd.Timestamp("2019-05-10"))
+    assert calendar.covers(pd.Timestamp("2021-12-31"))
+    assert not calendar.covers(pd.Timestamp("2022-01-01"))
+    with pytest.raises(POptimizerError):
+        calendar.is_trading_day(pd.Timestamp("2022-01-01"))
+
+
+def test_prev_trading_day(calendar):
+    assert calendar.prev_trading_day(pd.Timestamp("2019-03-11")) == pd.Timestamp(
+        "2019-03-07"
+    )
+    assert calendar.prev_trading_day(pd.Timestamp("2019-05-10")) == pd.Timestamp(
+        "2019-05-08"
+    )
+    assert calendar.prev_trading_day(pd.Timestamp("2019-01-03")) == pd.Timestamp(
+        "2018-12-31"
+    )
+    assert calendar.prev_trading_day(pd.Timestamp("2014-01-03")) is None
+    assert calendar.last_trading_day(pd.Timestamp("2019-03-10")) == pd.Timestamp(
+        "2019-03-07"
+    )
+
+
+def test_shift(calendar):
+    assert calendar.shift(pd.Timestamp("2019-03-07"), 1) == pd.Timestamp("2019-03-11")
+    assert calendar.shift(pd.Timestamp("2019-03-09"), 1) == pd.Timestamp("2019-03-11")
+    assert calendar.shift(pd.Timestamp("2019-03-09"), -1) == pd.Timestamp("2019-03-06")
+    assert calendar.shift(pd.Timestamp("2019-06-13"), -1) == pd.Timestamp("2019-06-11")
+    assert calendar.shift(pd.Timestamp("2014-01-06"), -2) is None
+    assert calendar.shift(pd.Timestamp("2013-12-31"), 1) is None
+    with pytest.raises(POptimizerError):
+        calendar.shift(pd.Timestamp("2021-12-31"), 1)
+
+
+def test_shift_index(calendar):
+    dates = pd.DatetimeIndex(
+        ["2013-12-31", "2014-01-03", "2019-03-09", "2019-05-11", "2019-06-13"],
+        name=DATE,
+    )
+    expected = pd.DatetimeIndex(
+        [pd.NaT, pd.NaT, "2019-03-06", "2019-05-08", "2019-06-11"], name=DATE
+    )
+    assert calendar.shift_index(dates, -1).equals(expected)
+    for date, shifted in zip(dates[2:], expected[2:]):
+        assert calendar.shift(date, -1) == shifted
+    with pytest.raises(POptimizerError):
+        calendar.shift_index(pd.DatetimeIndex(["2022-01-01"]), 0)
+
+
+def test_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(trading_calendar, "_LOADED", (None, None))
+    with lmbd.DataStore(tmp_path, MAX_SIZE, MAX_DBS) as db:
+        assert trading_calendar.load(db) is None
+        series = pd.Series(True, index=DAYS, name=trading_calendar.NAME_CALENDAR)
+        db[trading_calendar.NAME_CALENDAR] = utils.Datum(series)
+        calendar = trading_calendar.load(db)
+        assert trading_calendar.load(db) is calendar
+        assert np.array_equal(calendar.days[: len(DAYS)], DAYS)
+        db[trading_calendar.NAME_CALENDAR] = utils.Datum(series.iloc[:-1])
+        assert trading_calendar.load(db) is not calendar
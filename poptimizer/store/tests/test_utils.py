@@ -6,7 +6,7 @@ import pandas as pd
 import pytest
 
 from poptimizer import config
-from poptimizer.store import utils, lmbd
+from poptimizer.store import utils, lmbd, trading_calendar
 from poptimizer.store.client import MAX_SIZE, MAX_DBS
 
 
@@ -65,3 +65,44 @@ async def test_update_timestamp_after_end_of_trading_day(path, monkeypatch):
             date = await utils.update_timestamp(db)
             date_store = db[utils.LAST_HISTORY].value
     assert date == date_web == date_store
+
+
+def test_data_age(tmp_path):
+    with lmbd.DataStore(tmp_path, MAX_SIZE, MAX_DBS) as db:
+        assert utils.data_age(db) is None
+        db[utils.LAST_HISTORY] = utils.Datum(utils.end_of_trading_day())
+        assert utils.data_age(db) == pd.Timedelta(0)
+        timestamp = utils.end_of_trading_day() - pd.DateOffset(days=2)
+        db[utils.LAST_HISTORY] = utils.Datum(timestamp, timestamp)
+        assert utils.data_age(db) == pd.Timedelta(days=2)
+
+
+def test_end_of_trading_day():
+    now = pd.Timestamp("2019-05-10 19:00", tz=utils.MOEX_TZ)
+    assert utils.end_of_trading_day(now) == pd.Timestamp(
+        "2019-05-09 19:45", tz=utils.MOEX_TZ
+    )
+    now = pd.Timestamp("2019-05-10 19:45", tz=utils.MOEX_TZ)
+    assert utils.end_of_trading_day(now) == now
+
+
+def test_end_of_trading_day_with_calendar():
+    # 9 мая торги не проводятся, что выводится из истории для прогноза
+    days = pd.bdate_range("2016-01-01", "2019-05-08")
+    days = days[~((days.month == 5) & (days.day == 9))]
+    calendar = trading_calendar.TradingCalendar(days)
+    now = pd.Timestamp("2019-05-10 19:00", tz=utils.MOEX_TZ)
+    assert utils.end_of_trading_day(now, calendar) == pd.Timestamp(
+        "2019-05-08 19:45", tz=utils.MOEX_TZ
+    )
+    assert utils.end_of_trading_day(now) == pd.Timestamp(
+        "2019-05-09 19:45", tz=utils.MOEX_TZ
+    )
+    now = pd.Timestamp("2019-05-13 10:00", tz=utils.MOEX_TZ)
+    assert utils.end_of_trading_day(now, calendar) == pd.Timestamp(
+        "2019-05-10 19:45", tz=utils.MOEX_TZ
+    )
+    now = pd.Timestamp("2015-12-01 20:00", tz=utils.MOEX_TZ)
+    assert utils.end_of_trading_day(now, calendar) == now.normalize() + pd.DateOffset(
+        **utils.END_OF_TRADING
+    )
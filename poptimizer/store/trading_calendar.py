@@ -0,0 +1,202 @@
+"""Торговый календарь MOEX.
+
+Календарь строится по датам торгов индекса MCFTRR и последней дате с историей на MOEX, хранится в
+основной базе и дополняется прогнозом торговых дней на несколько лет вперед. Для прошлых дат
+используются только фактические даты торгов, а для прогноза - праздники, которые выводятся из
+истории как даты, в которые торги не проводились ни в один из последних лет, когда они приходились
+на будний день. Для каждого календарного дня заранее рассчитывается номер последнего торгового дня,
+поэтому поиск предыдущего торгового дня и сдвиг на заданное количество торговых дней не требуют
+поиска или арифметики с бизнес днями.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from poptimizer.config import POptimizerError
+
+# Календарь хранится в основной базе
+NAME_CALENDAR = "trading_calendar"
+
+# За сколько последних полных лет истории определяются праздники для прогноза
+HOLIDAY_YEARS = 5
+# Минимальное количество лет, в которые дата приходилась на будний день без торгов, для праздника
+HOLIDAY_MIN_YEARS = 2
+
+# На сколько полных лет после последнего известного торгового дня строится прогноз
+PROJECTION_YEARS = 2
+
+
+def holiday_rules(days: pd.DatetimeIndex) -> Tuple[Tuple[int, int], ...]:
+    """Праздники в виде (месяц, день), выведенные из истории торгов.
+
+    Праздником считается дата, в которую не было торгов во все последние полные годы истории, когда
+    она приходилась на будний день, если таких лет не меньше HOLIDAY_MIN_YEARS. Разовые выходные
+    дни, например, перенесенные праздники, в прогноз не попадают.
+
+    :param days:
+        Упорядоченные известные торговые дни.
+    :return:
+        Упорядоченные праздники.
+    """
+    last_year = days[-1].year
+    first_year = max(days[0].year + 1, last_year - HOLIDAY_YEARS)
+    if first_year >= last_year:
+        return ()
+    weekdays = pd.bdate_range(f"{first_year}-01-01", f"{last_year - 1}-12-31")
+    is_off = pd.Series(~weekdays.isin(days), index=weekdays)
+    stats = is_off.groupby([weekdays.month, weekdays.day]).agg(["all", "size"])
+    holidays = stats[stats["all"] & (stats["size"] >= HOLIDAY_MIN_YEARS)]
+    return tuple((int(month), int(day)) for month, day in holidays.index)
+
+
+def projected_holidays(
+    rules: Tuple[Tuple[int, int], ...], first_year: int, last_year: int
+) -> np.ndarray:
+    """Праздники для лет с first_year по last_year включительно."""
+    return np.array(
+        [
+            f"{year}-{month:02}-{day:02}"
+            for year in range(first_year, last_year + 1)
+            for month, day in rules
+            if (month, day) != (2, 29) or year % 4 == 0
+        ],
+        dtype="datetime64[D]",
+    )
+
+
+class TradingCalendar:
+    """Торговые дни MOEX с прогнозом на несколько лет вперед.
+
+    Даты принимаются и возвращаются без часового пояса. Для дат до начала календаря результат - None,
+    а для дат после окончания прогноза возбуждается исключение.
+    """
+
+    def __init__(
+        self, days: pd.DatetimeIndex, projection_years: int = PROJECTION_YEARS
+    ):
+        """Прогноз строится для дней после последнего известного торгового дня с учетом праздников,
+        выведенных из истории торгов.
+
+        :param days:
+            Упорядоченные известные торговые дни.
+        :param projection_years:
+            На сколько полных лет после года последнего торгового дня строится прогноз.
+        """
+        known = np.asarray(days.values, dtype="datetime64[D]")
+        self._first = known[0]
+        last_year = days[-1].year + projection_years
+        self._end = np.datetime64(f"{last_year + 1}-01-01", "D")
+        projected = np.arange(known[-1] + 1, self._end, dtype="datetime64[D]")
+        holidays = projected_holidays(holiday_rules(days), days[-1].year, last_year)
+        business_days = np.busdaycalendar(holidays=holidays)
+        projected = projected[np.is_busday(projected, busdaycal=business_days)]
+        self._days = np.concatenate([known, projected])
+        is_trading = np.zeros((self._end - self._first).astype(int), dtype=bool)
+        is_trading[(self._days - self._first).astype(int)] = True
+        self._is_trading = is_trading
+        # Номер последнего торгового дня для каждого календарного дня
+        self._positions = np.cumsum(is_trading) - 1
+
+    @property
+    def days(self) -> pd.DatetimeIndex:
+        """Известные и прогнозные торговые дни."""
+        return pd.DatetimeIndex(self._days.astype("datetime64[ns]"))
+
+    @property
+    def first(self) -> pd.Timestamp:
+        """Первый день календаря."""
+        return pd.Timestamp(self._first)
+
+    @property
+    def end(self) -> pd.Timestamp:
+        """День после окончания прогноза."""
+        return pd.Timestamp(self._end)
+
+    def covers(self, date: pd.Timestamp) -> bool:
+        """Содержится ли дата в календаре."""
+        return self._first <= np.datetime64(date, "D") < self._end
+
+    def is_trading_day(self, date: pd.Timestamp) -> bool:
+        """Является ли дата торговым днем."""
+        offset = self._offset(date)
+        return offset >= 0 and bool(self._is_trading[offset])
+
+    def last_trading_day(self, date: pd.Timestamp) -> Optional[pd.Timestamp]:
+        """Последний торговый день не позже даты."""
+        return self.shift(date, 0)
+
+    def prev_trading_day(self, date: pd.Timestamp) -> Optional[pd.Timestamp]:
+        """Последний торговый день до даты."""
+        return self.last_trading_day(pd.Timestamp(date) - pd.Timedelta(days=1))
+
+    def shift(self, date: pd.Timestamp, n: int) -> Optional[pd.Timestamp]:
+        """Сдвиг на n торговых дней от последнего торгового дня не позже даты.
+
+        Отрицательные значения n соответствуют сдвигу назад.
+        """
+        offset = self._offset(date)
+        if offset < 0:
+            return None
+        position = self._positions[offset] + n
+        if position < 0:
+            return None
+        if position >= len(self._days):
+            raise POptimizerError(
+                f"Сдвиг {date} на {n} за пределами торгового календаря"
+            )
+        return pd.Timestamp(self._days[position])
+
+    def shift_index(self, dates: pd.DatetimeIndex, n: int) -> pd.DatetimeIndex:
+        """Сдвиг сразу для всех дат - NaT для результатов до начала календаря."""
+        days = np.asarray(dates.values, dtype="datetime64[D]")
+        offsets = (days - self._first).astype(int)
+        if len(offsets) and offsets.max() >= len(self._positions):
+            raise POptimizerError(
+                f"Даты после окончания торгового календаря {self.end.date()}"
+            )
+        positions = np.where(offsets >= 0, self._positions[offsets.clip(0)], -1)
+        positions = np.where(positions >= 0, positions + n, -1)
+        if len(positions) and positions.max() >= len(self._days):
+            raise POptimizerError(f"Сдвиг на {n} за пределами торгового календаря")
+        shifted = np.where(
+            positions >= 0, self._days[positions.clip(0)], np.datetime64("NaT")
+        )
+        return pd.DatetimeIndex(shifted.astype("datetime64[ns]"), name=dates.name)
+
+    def _offset(self, date: pd.Timestamp) -> int:
+        """Номер календарного дня - отрицательный для дат до начала календаря."""
+        offset = int((np.datetime64(date, "D") - self._first).astype(int))
+        if offset >= len(self._positions):
+            raise POptimizerError(f"Дата {date} после окончания торгового календаря")
+        return offset
+
+
+# Время создания данных и календарь, загруженный последним
+_LOADED = (None, None)
+
+
+def load(db) -> Optional[TradingCalendar]:
+    """Загружает календарь из хранилища.
+
+    Календарь строится заново только при изменении сохраненных торговых дней, а для хранилища с
+    метаданными неизменные дни не загружаются, поэтому календарь можно загружать при каждом
+    обращении к нему.
+
+    :param db:
+        Хранилище данных lmbd.DataStore.
+    :return:
+        Календарь или None, если он не сохранен в хранилище.
+    """
+    global _LOADED
+    timestamp, calendar = _LOADED
+    meta = db.get_meta(NAME_CALENDAR)
+    if meta is not None and meta.timestamp == timestamp:
+        return calendar
+    datum = db[NAME_CALENDAR]
+    if datum is None:
+        return None
+    if datum.timestamp != timestamp:
+        calendar = TradingCalendar(datum.value.index)
+        _LOADED = datum.timestamp, calendar
+    return calendar
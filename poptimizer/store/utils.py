@@ -1,12 +1,12 @@
 """Вспомогательные функции и класс для организации хранения данных."""
 import logging
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Optional
 
 import aiomoex
 import pandas as pd
 
-from poptimizer.store import lmbd
+from poptimizer.store import trading_calendar
 
 # Часовой пояс MOEX
 MOEX_TZ = "Europe/Moscow"
@@ -17,6 +17,9 @@ END_OF_TRADING = dict(hour=19, minute=45, second=0, microsecond=0, nanosecond=0)
 # Ключ в хранилище с датой последней исторической котировкой на MOEX
 LAST_HISTORY = "last_history"
 
+# Общие ограничения на нагрузку действуют для всех загрузок с MOEX ISS
+SOURCE_ISS = "iss.moex.com"
+
 # Метки столбцов данных
 DATE = "DATE"
 CLOSE = "CLOSE"
@@ -35,6 +38,22 @@ class Datum:
     timestamp: pd.Timestamp = field(default_factory=lambda: pd.Timestamp.now(MOEX_TZ))
 
 
+@dataclass(frozen=True)
+class Meta:
+    """Метаданные сохраненного Datum, позволяющие проверить его актуальность без загрузки данных."""
+
+    # Время создания данных
+    timestamp: pd.Timestamp
+    # Количество строк для данных с индексом
+    rows: Optional[int]
+    # Последнее значение индекса для непустых данных с индексом
+    last_index: Any
+    # Размер сериализованного значения в байтах
+    size: int
+    # Хэш содержимого данных с индексом - отсутствует в метаданных, сохраненных до его появления
+    content_hash: Optional[str] = None
+
+
 async def download_last_history():
     """Последняя дата торгов, которая есть на MOEX ISS."""
     dates = await aiomoex.get_board_dates()
@@ -43,19 +62,59 @@ async def download_last_history():
     return date + pd.DateOffset(**END_OF_TRADING)
 
 
-def end_of_trading_day():
-    """Конец последнего торгового дня."""
-    now = pd.Timestamp.now(MOEX_TZ)
+def end_of_trading_day(
+    now: Optional[pd.Timestamp] = None,
+    calendar: Optional[trading_calendar.TradingCalendar] = None,
+):
+    """Конец последнего торгового дня.
+
+    Если передан торговый календарь, то выходные и праздники пропускаются, а без него торговым
+    считается каждый день.
+
+    :param now:
+        Момент времени в часовом поясе MOEX, для которого определяется конец последнего торгового дня.
+        По умолчанию - текущее время.
+    :param calendar:
+        Торговый календарь.
+    """
+    if now is None:
+        now = pd.Timestamp.now(MOEX_TZ)
     # noinspection PyUnresolvedReferences
     end_of_trading = now.normalize() + pd.DateOffset(**END_OF_TRADING)
     if end_of_trading > now:
         end_of_trading += pd.DateOffset(days=-1)
+    day = end_of_trading.tz_localize(None).normalize()
+    if calendar is not None and calendar.covers(day):
+        day = calendar.last_trading_day(day)
+        if day is not None:
+            end_of_trading = day.tz_localize(MOEX_TZ) + pd.DateOffset(**END_OF_TRADING)
     return end_of_trading
 
 
-async def update_timestamp(db: lmbd.DataStore):
-    """Момент времени после, которого не нужно обновлять исторические данные для хранилища."""
-    end_of_trading = end_of_trading_day()
+def data_age(db) -> Optional[pd.Timedelta]:
+    """Возраст локальных данных - на сколько конец последнего торгового дня позже последней проверки
+    их актуальности.
+
+    :param db:
+        Хранилище данных lmbd.DataStore.
+    :return:
+        Нулевой интервал для актуальных данных или None, если актуальность данных ни разу не
+        проверялась.
+    """
+    last_history = db[LAST_HISTORY]
+    if last_history is None:
+        return None
+    end_of_trading = end_of_trading_day(calendar=trading_calendar.load(db))
+    return max(end_of_trading - last_history.timestamp, pd.Timedelta(0))
+
+
+async def update_timestamp(db):
+    """Момент времени после, которого не нужно обновлять исторические данные для хранилища.
+
+    :param db:
+        Хранилище данных lmbd.DataStore.
+    """
+    end_of_trading = end_of_trading_day(calendar=trading_calendar.load(db))
     last_history = db[LAST_HISTORY]
     if last_history is None or last_history.timestamp < end_of_trading:
         last_history = Datum(await download_last_history())